@@ -1,19 +1,44 @@
 import logging
 
-from cStringIO import StringIO
-
 from ceph_deploy import exc
 from ceph_deploy import conf
+from ceph_deploy import connection
+from ceph_deploy import validate
 from ceph_deploy.cliutil import priority
 from ceph_deploy import hosts
+from ceph_deploy.util import parallel
 
 LOG = logging.getLogger(__name__)
 
 
+def admin_host(args, hostname, cfg, keyring):
+    """
+    Push the configuration and the admin keyring to a single host, safe to be
+    called concurrently for different hosts.
+    """
+    LOG.debug('Pushing admin keys and conf to %s', hostname)
+    distro = hosts.get(hostname, username=args.username)
+
+    written = hosts.common.write_conf(
+        distro.conn,
+        args.cluster,
+        cfg.render(),
+        args.overwrite_conf,
+        checksum=cfg.checksum(),
+    )
+
+    distro.conn.remote_module.write_file(
+        '/etc/ceph/%s.client.admin.keyring' % args.cluster,
+        keyring,
+        0600,
+    )
+
+    distro.conn.exit()
+    return 'conf written' if written else 'conf unchanged'
+
+
 def admin(args):
     cfg = conf.ceph.load(args)
-    conf_data = StringIO()
-    cfg.write(conf_data)
 
     try:
         with file('%s.client.admin.keyring' % args.cluster, 'rb') as f:
@@ -22,30 +47,14 @@ def admin(args):
         raise RuntimeError('%s.client.admin.keyring not found' %
                            args.cluster)
 
-    errors = 0
-    for hostname in args.client:
-        LOG.debug('Pushing admin keys and conf to %s', hostname)
-        try:
-            distro = hosts.get(hostname, username=args.username)
-
-            distro.conn.remote_module.write_conf(
-                args.cluster,
-                conf_data.getvalue(),
-                args.overwrite_conf,
-            )
-
-            distro.conn.remote_module.write_file(
-                '/etc/ceph/%s.client.admin.keyring' % args.cluster,
-                keyring,
-                0600,
-            )
-
-            distro.conn.exit()
-
-        except RuntimeError as e:
-            LOG.error(e)
-            errors += 1
+    connection.start_masters(args.client, args.username)
+    results = parallel.run(
+        lambda hostname: admin_host(args, hostname, cfg, keyring),
+        args.client,
+        jobs=args.jobs,
+    )
 
+    errors = parallel.report(results, LOG, title='Admin summary')
     if errors:
         raise exc.GenericError('Failed to configure %d admin hosts' % errors)
 
@@ -61,6 +70,13 @@ def make(parser):
         nargs='+',
         help='host to configure for ceph administration',
         )
+    parser.add_argument(
+        '--jobs', '-j',
+        metavar='N',
+        type=validate.positive_int,
+        default=10,
+        help='configure up to N hosts at the same time (default: %(default)s)',
+        )
     parser.set_defaults(
         func=admin,
         )
@@ -24,7 +24,7 @@ def connect(args):
         distro = hosts.get(hostname, username=args.username)
         if not distro_is_supported(distro.normalized_name):
             raise exc.UnsupportedPlatform(
-                distro.distro_name,
+                distro.name,
                 distro.codename,
                 distro.release
             )
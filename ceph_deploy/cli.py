@@ -1,18 +1,29 @@
-import pkg_resources
 import argparse
+import ast
+import hashlib
+import json
 import logging
+import pkgutil
 import textwrap
 import os
 import sys
 from string import join
 
 import ceph_deploy
+import ceph_deploy.conf
 from ceph_deploy import exc, validate
-from ceph_deploy.util import log
+from ceph_deploy.util import constants, entry_points, log, trace
 from ceph_deploy.util.decorators import catches
 
 LOG = logging.getLogger(__name__)
 
+# where InfoCache keeps the help text of the subcommands between runs
+INFO_CACHE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'ceph-deploy',
+    'subcommands.json',
+)
+
 
 __header__ = textwrap.dedent("""
     -^-
@@ -37,6 +48,149 @@ def log_flags(args, logger=None):
         logger.info(' %-30s: %s' % (k, v))
 
 
+class LazySubParsersAction(argparse._SubParsersAction):
+    """
+    Subcommand parsers whose arguments are only added, importing the module
+    that defines them, when that subcommand is the one being run. Listing the
+    subcommands (for ``--help``) only needs their names and help text.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(LazySubParsersAction, self).__init__(*args, **kwargs)
+        self._makers = {}
+
+    def add_lazy_parser(self, name, make, **kwargs):
+        """
+        Add the parser for ``name``, ``make(parser)`` is called to add its
+        arguments the first time the subcommand is used.
+        """
+        parser = self.add_parser(name, **kwargs)
+        self._makers[name] = make
+        return parser
+
+    def load(self, name):
+        make = self._makers.pop(name, None)
+        if make is not None:
+            make(self._name_parser_map[name])
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        self.load(values[0])
+        return super(LazySubParsersAction, self).__call__(
+            parser, namespace, values, option_string=option_string,
+        )
+
+
+def function_info(node):
+    """
+    The help text and priority of a subcommand function from its
+    ``ast.FunctionDef``, or ``None`` if it is decorated with something other
+    than ``priority`` and has to be loaded to tell.
+    """
+    priority = 100
+    for decorator in node.decorator_list:
+        if (
+            isinstance(decorator, ast.Call) and
+            getattr(decorator.func, 'id', None) == 'priority' and
+            len(decorator.args) == 1 and
+            isinstance(decorator.args[0], ast.Num)
+        ):
+            priority = decorator.args[0].n
+        else:
+            return None
+    return ast.get_docstring(node, clean=False), priority
+
+
+class InfoCache(object):
+    """
+    The help text and priority of the top-level functions of every subcommand
+    module, read from their source without importing them. Parsing a module
+    is what takes most of the time to build the parser, so what was read is
+    kept in ``path`` between runs, keyed by the checksum of the source, and a
+    module is only parsed again when it changes.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._modules = None
+        self._changed = False
+
+    def _load(self):
+        if self._modules is None:
+            self._modules = {}
+            if self.path:
+                try:
+                    with open(self.path) as f:
+                        modules = json.load(f)
+                    if isinstance(modules, dict):
+                        self._modules = modules
+                except (IOError, ValueError):
+                    pass
+        return self._modules
+
+    def functions(self, module_name):
+        """
+        ``(help, priority)`` for every top-level function of
+        ``module_name`` by name (``None`` for the ones that have to be
+        loaded).
+        """
+        modules = self._load()
+        source = pkgutil.get_loader(module_name).get_source(module_name)
+        checksum = hashlib.sha1(source).hexdigest()
+        cached = modules.get(module_name)
+        if cached and cached.get('checksum') == checksum:
+            return cached['functions']
+
+        functions = dict(
+            (node.name, function_info(node))
+            for node in ast.parse(source).body
+            if isinstance(node, ast.FunctionDef)
+        )
+        modules[module_name] = {'checksum': checksum, 'functions': functions}
+        self._changed = True
+        return functions
+
+    def save(self):
+        if not (self.path and self._changed):
+            return
+        # write to a temporary file first so that other runs never read a
+        # half written cache
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        try:
+            if not os.path.isdir(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+            with open(tmp_path, 'w') as f:
+                json.dump(self._modules, f)
+            os.rename(tmp_path, self.path)
+            self._changed = False
+        except (IOError, OSError, ValueError) as error:
+            LOG.debug('unable to cache subcommand help in %s: %s', self.path, error)
+
+
+info_cache = InfoCache(INFO_CACHE_PATH)
+
+
+def subcommand_info(entry_point, cache=None):
+    """
+    Read the help text and priority of the function behind a ``ceph_deploy.cli``
+    entry point from the source of its module, without importing it.
+
+    Returns ``None`` if that is not possible (no source available, or the
+    function is decorated with something other than ``priority``), in which
+    case the entry point has to be loaded.
+    """
+    if len(entry_point.attrs) != 1:
+        return None
+    cache = cache or info_cache
+    try:
+        info = cache.functions(entry_point.module_name)[entry_point.attrs[0]]
+    except Exception:
+        return None
+    if info is None:
+        return None
+    doc, priority = info
+    return doc, priority
+
+
 def get_parser():
     parser = argparse.ArgumentParser(
         prog='ceph-deploy',
@@ -80,33 +234,76 @@ def get_parser():
         dest='ceph_conf',
         help='use (or reuse) a given ceph.conf file',
     )
+    parser.add_argument(
+        '--ssh-multiplex',
+        action='store_true',
+        help='share a single SSH connection per host (OpenSSH ControlMaster) '
+             'for everything done in this run',
+    )
+    parser.add_argument(
+        '--facts-cache',
+        action='store_true',
+        help='cache the detected host facts (distro, release, etc...) in the '
+             'working directory and reuse them on later runs',
+    )
+    parser.add_argument(
+        '--facts-ttl',
+        metavar='SECONDS',
+        type=validate.positive_int,
+        default=constants.facts_ttl,
+        help='how long cached host facts are valid for. Defaults to %s' % constants.facts_ttl,
+    )
+    parser.add_argument(
+        '--refresh-facts',
+        action='store_true',
+        help='detect host facts again and update the cache',
+    )
+    parser.add_argument(
+        '--trace',
+        metavar='FILE',
+        help='write how long each step took, per host, to FILE in the Chrome '
+             'trace event format',
+    )
     sub = parser.add_subparsers(
         title='commands',
         metavar='COMMAND',
         help='description',
+        action=LazySubParsersAction,
         )
-    entry_points = [
-        (ep.name, ep.load())
-        for ep in pkg_resources.iter_entry_points('ceph_deploy.cli')
-        ]
-    entry_points.sort(
-        key=lambda (name, fn): getattr(fn, 'priority', 100),
+    subcommands = []
+    for ep in entry_points.iter_entry_points('ceph_deploy.cli'):
+        info = subcommand_info(ep)
+        if info is None:
+            fn = ep.load()
+            info = (fn.__doc__, getattr(fn, 'priority', 100))
+            subcommands.append((ep.name, info, lambda p, fn=fn: fn(p)))
+        else:
+            subcommands.append((ep.name, info, lambda p, ep=ep: ep.load()(p)))
+    subcommands.sort(
+        key=lambda (name, (doc, priority), make): priority,
         )
-    for (name, fn) in entry_points:
-        p = sub.add_parser(
+    info_cache.save()
+
+    # parsed once and shared by every subcommand
+    cd_conf = None
+    if not os.environ.get('CEPH_DEPLOY_TEST'):
+        cd_conf = ceph_deploy.conf.cephdeploy.load()
+
+    for (name, (doc, priority), make) in subcommands:
+        p = sub.add_lazy_parser(
             name,
-            description=fn.__doc__,
-            help=fn.__doc__,
+            make,
+            description=doc,
+            help=doc,
             )
         # ugly kludge but i really want to have a nice way to access
         # the program name, with subcommand, later
         p.set_defaults(prog=p.prog)
-        if not os.environ.get('CEPH_DEPLOY_TEST'):
-            p.set_defaults(cd_conf=ceph_deploy.conf.cephdeploy.load())
+        if cd_conf is not None:
+            p.set_defaults(cd_conf=cd_conf)
 
         # flag if the default release is being used
         p.set_defaults(default_release=False)
-        fn(p)
     parser.set_defaults(
         # we want to hold on to this, for later
         prog=parser.prog,
@@ -163,7 +360,24 @@ def _main(args=None, namespace=None):
     # the one flag that will never work regardless of the config settings is
     # logging because we cannot set it before hand since the logging config is
     # not ready yet. This is the earliest we can do.
-    args = ceph_deploy.conf.cephdeploy.set_overrides(args)
+    args = ceph_deploy.conf.cephdeploy.set_overrides(
+        args,
+        _conf=getattr(args, 'cd_conf', None),
+    )
+
+    if args.ssh_multiplex:
+        # imported here so that remoto (and execnet) are only loaded by the
+        # subcommands that need them
+        from ceph_deploy import connection
+        connection.enable_multiplexing()
+
+    # values coming from cephdeploy.conf are not coerced to ints
+    from ceph_deploy.hosts import facts
+    facts.configure(
+        enabled=args.facts_cache,
+        ttl=int(args.facts_ttl),
+        refresh=args.refresh_facts,
+    )
 
     LOG.info("Invoked (%s): %s" % (
         ceph_deploy.__version__,
@@ -171,13 +385,23 @@ def _main(args=None, namespace=None):
     )
     log_flags(args)
 
-    return args.func(args)
+    if args.trace:
+        trace.enable(args.trace, subcommand=args.func.__name__)
+    with trace.span(args.func.__name__):
+        return args.func(args)
 
 
 def main(args=None, namespace=None):
     try:
         _main(args=args, namespace=namespace)
     finally:
+        # connections are shared for the whole run, close them all now (if
+        # the subcommand opened any)
+        connection = sys.modules.get('ceph_deploy.connection')
+        if connection is not None:
+            connection.close_all()
+        trace.write()
+
         # This block is crucial to avoid having issues with
         # Python spitting non-sense thread exceptions. We have already
         # handled what we could, so close stderr and stdout.
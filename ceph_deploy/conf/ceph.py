@@ -1,9 +1,19 @@
 import ConfigParser
 import contextlib
+import hashlib
+import os
+import threading
+from cStringIO import StringIO
 
 from ceph_deploy import exc
 
 
+# parsed configuration files by path, along with the modification time and
+# size they had when parsed, so that a run parses every file only once
+_cache = {}
+_cache_lock = threading.Lock()
+
+
 class _TrimIndentFile(object):
     def __init__(self, fp):
         self.fp = fp
@@ -14,6 +24,11 @@ class _TrimIndentFile(object):
 
 
 class CephConf(ConfigParser.RawConfigParser):
+    def __init__(self, *a, **kw):
+        ConfigParser.RawConfigParser.__init__(self, *a, **kw)
+        self._rendered = None
+        self._checksum = None
+
     def optionxform(self, s):
         s = s.replace('_', ' ')
         s = '_'.join(s.split())
@@ -33,6 +48,53 @@ class CephConf(ConfigParser.RawConfigParser):
                 ConfigParser.NoOptionError):
             return None
 
+    def render(self):
+        """
+        The configuration as it is written to a file. Rendered once and kept
+        until the configuration changes.
+        """
+        if self._rendered is None:
+            data = StringIO()
+            self.write(data)
+            self._rendered = data.getvalue()
+        return self._rendered
+
+    def checksum(self):
+        """
+        SHA-1 of :meth:`render`, as ``conf_checksum`` computes it remotely.
+        Kept along with the rendered copy.
+        """
+        if self._checksum is None:
+            self._checksum = hashlib.sha1(self.render()).hexdigest()
+        return self._checksum
+
+    # anything that changes the configuration drops the rendered copy and its
+    # checksum
+
+    def _changed(self):
+        self._rendered = None
+        self._checksum = None
+
+    def readfp(self, *a, **kw):
+        self._changed()
+        return ConfigParser.RawConfigParser.readfp(self, *a, **kw)
+
+    def add_section(self, *a, **kw):
+        self._changed()
+        return ConfigParser.RawConfigParser.add_section(self, *a, **kw)
+
+    def set(self, *a, **kw):
+        self._changed()
+        return ConfigParser.RawConfigParser.set(self, *a, **kw)
+
+    def remove_option(self, *a, **kw):
+        self._changed()
+        return ConfigParser.RawConfigParser.remove_option(self, *a, **kw)
+
+    def remove_section(self, *a, **kw):
+        self._changed()
+        return ConfigParser.RawConfigParser.remove_section(self, *a, **kw)
+
 
 def parse(fp):
     cfg = CephConf()
@@ -45,6 +107,9 @@ def load(args):
     """
     :param args: Will be used to infer the proper configuration name, or
     if args.ceph_conf is passed in, that will take precedence
+
+    The file is parsed once per run, the same object is returned as long as
+    the file is not modified, so it should not be changed by callers.
     """
     path = args.ceph_conf or '{cluster}.conf'.format(cluster=args.cluster)
 
@@ -56,7 +121,17 @@ def load(args):
         )
     else:
         with contextlib.closing(f):
-            return parse(f)
+            key = os.path.abspath(path)
+            stat = os.fstat(f.fileno())
+            stamp = (stat.st_mtime, stat.st_size)
+            with _cache_lock:
+                cached = _cache.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            cfg = parse(f)
+            with _cache_lock:
+                _cache[key] = (stamp, cfg)
+            return cfg
 
 
 def load_raw(args):
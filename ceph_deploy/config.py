@@ -1,71 +1,125 @@
+import hashlib
 import logging
 import os.path
 
 from ceph_deploy import exc
 from ceph_deploy import conf
+from ceph_deploy import connection
+from ceph_deploy import validate
 from ceph_deploy.cliutil import priority
 from ceph_deploy import hosts
+from ceph_deploy.util import parallel
 
 LOG = logging.getLogger(__name__)
 
 
-def config_push(args):
-    conf_data = conf.ceph.load_raw(args)
+def push_host(args, hostname, conf_data, checksum):
+    LOG.debug('Pushing config to %s', hostname)
+    distro = hosts.get(hostname, username=args.username)
 
-    errors = 0
-    for hostname in args.client:
-        LOG.debug('Pushing config to %s', hostname)
-        try:
-            distro = hosts.get(hostname, username=args.username)
+    written = hosts.common.write_conf(
+        distro.conn,
+        args.cluster,
+        conf_data,
+        args.overwrite_conf,
+        checksum=checksum,
+    )
 
-            distro.conn.remote_module.write_conf(
-                args.cluster,
-                conf_data,
-                args.overwrite_conf,
-            )
+    distro.conn.exit()
+    return 'written' if written else 'unchanged'
 
-            distro.conn.exit()
 
-        except RuntimeError as e:
-            LOG.error(e)
-            errors += 1
+def config_push(args):
+    conf_data = conf.ceph.load_raw(args)
+    checksum = hashlib.sha1(conf_data).hexdigest()
 
+    connection.start_masters(args.client, args.username)
+    results = parallel.run(
+        lambda hostname: push_host(args, hostname, conf_data, checksum),
+        args.client,
+        jobs=args.jobs,
+    )
+
+    errors = parallel.report(results, LOG, title='Config push summary')
     if errors:
         raise exc.GenericError('Failed to config %d hosts' % errors)
 
 
+def checksum_host(args, hostname):
+    """
+    The checksum of the configuration on ``hostname``, ``None`` if it has
+    none.
+    """
+    LOG.debug('Checking %s for /etc/ceph/%s.conf', hostname, args.cluster)
+    distro = hosts.get(hostname, username=args.username)
+    checksum = distro.conn.remote_module.conf_checksum(args.cluster)
+    distro.conn.exit()
+    return checksum
+
+
 def config_pull(args):
 
     topath = '{cluster}.conf'.format(cluster=args.cluster)
     frompath = '/etc/ceph/{cluster}.conf'.format(cluster=args.cluster)
 
-    errors = 0
-    for hostname in args.client:
+    # compare what every host has before pulling from one of them
+    connection.start_masters(args.client, args.username)
+    results = parallel.run(
+        lambda hostname: checksum_host(args, hostname),
+        args.client,
+        jobs=args.jobs,
+    )
+
+    by_checksum = {}
+    for result in results:
+        if result.ok and result.value:
+            by_checksum.setdefault(result.value, []).append(result.item)
+    parallel.report(
+        [
+            parallel.Result(
+                result.item,
+                value=(result.value or 'missing')[:12],
+                error=result.error,
+            )
+            for result in results
+        ],
+        LOG,
+        title='Config checksums',
+    )
+
+    if len(by_checksum) > 1:
+        LOG.warning('%s differs between hosts:', frompath)
+        for checksum, hostnames in sorted(by_checksum.items(), key=lambda item: -len(item[1])):
+            LOG.warning('  %s  %s', checksum[:12], ' '.join(hostnames))
+
+    for result in results:
+        if not (result.ok and result.value):
+            continue
+        hostname = result.item
+        LOG.debug('Pulling %s from %s', frompath, hostname)
         try:
-            LOG.debug('Checking %s for %s', hostname, frompath)
             distro = hosts.get(hostname, username=args.username)
             conf_file_contents = distro.conn.remote_module.get_file(frompath)
-
-            if conf_file_contents is not None:
-                LOG.debug('Got %s from %s', frompath, hostname)
-                if os.path.exists(topath):
-                    with file(topath, 'rb') as f:
-                        existing = f.read()
-                        if existing != conf_file_contents and not args.overwrite_conf:
-                            LOG.error('local config file %s exists with different content; use --overwrite-conf to overwrite' % topath)
-                            raise
-
-                with file(topath, 'w') as f:
-                    f.write(conf_file_contents)
-                return
             distro.conn.exit()
-            LOG.debug('Empty or missing %s on %s', frompath, hostname)
-        except:
-            LOG.error('Unable to pull %s from %s', frompath, hostname)
-        finally:
-            errors += 1
+        except RuntimeError as e:
+            LOG.error('Unable to pull %s from %s: %s', frompath, hostname, e)
+            continue
+        if conf_file_contents is None:
+            continue
+
+        LOG.debug('Got %s from %s', frompath, hostname)
+        if os.path.exists(topath):
+            with file(topath, 'rb') as f:
+                existing = f.read()
+            if existing != conf_file_contents and not args.overwrite_conf:
+                LOG.error('local config file %s exists with different content; use --overwrite-conf to overwrite' % topath)
+                raise exc.GenericError('Failed to fetch config from %s' % hostname)
 
-    raise exc.GenericError('Failed to fetch config from %d hosts' % errors)
+        with file(topath, 'w') as f:
+            f.write(conf_file_contents)
+        return
+
+    raise exc.GenericError('Failed to fetch config from %d hosts' % len(args.client))
 
 
 def config(args):
@@ -94,6 +148,13 @@ def make(parser):
         nargs='*',
         help='host(s) to push the config file to',
         )
+    config_push.add_argument(
+        '--jobs', '-j',
+        metavar='N',
+        type=validate.positive_int,
+        default=10,
+        help='push to up to N hosts at the same time (default: %(default)s)',
+        )
 
     config_pull = config_parser.add_parser(
         'pull',
@@ -105,6 +166,13 @@ def make(parser):
         nargs='*',
         help='host(s) to pull the config file from',
         )
+    config_pull.add_argument(
+        '--jobs', '-j',
+        metavar='N',
+        type=validate.positive_int,
+        default=10,
+        help='check up to N hosts at the same time (default: %(default)s)',
+        )
     parser.set_defaults(
         func=config,
         )
@@ -1,16 +1,388 @@
+import atexit
+import logging
+import os
+import shutil
 import socket
+import subprocess
+import tempfile
+import threading
+
 from ceph_deploy.lib import remoto
+from ceph_deploy.util import parallel, trace
+
+
+LOG = logging.getLogger(__name__)
+
+# Every connection opened during a run is kept here, keyed by the
+# ``user@host`` string and whether sudo was detected, so that every subcommand
+# step talking to the same host reuses a single SSH session instead of paying
+# for a new handshake (and a new remote interpreter) each time.
+_pool = {}
+_pool_lock = threading.Lock()
+_key_locks = {}
+
+# entries replaced by a new connection while other handles may still use
+# them, closed by close_all() along with the pool
+_retired = []
+
+# OpenSSH connection sharing (see ControlMaster in ssh_config(5)). It is off
+# unless enable_multiplexing() is called, after that every ssh session to a
+# host goes through a single master connection with its socket in
+# ``_control_dir``.
+_control_dir = None
+_masters = set()
+
+# seconds a master stays around once its last session is gone, in case
+# ceph-deploy dies before it can close them
+CONTROL_PERSIST = 60
+
+
+class _Entry(object):
+    """
+    A single shared remoto connection and the number of handles using it.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.refs = 0
+        # the remote module lives on a single execnet channel, so calls going
+        # through it have to be serialized across threads
+        self.lock = threading.RLock()
+        self.module = None
+
+    @property
+    def alive(self):
+        try:
+            if not self.conn.gateway.hasreceiver():
+                return False
+        except Exception:
+            return False
+        return self.module is None or self.module_alive
+
+    @property
+    def module_alive(self):
+        """
+        Whether the channel of the imported remote module is still open. An
+        exception raised by a remote call closes it, after that the module
+        has to be imported again.
+        """
+        module = getattr(self.conn, 'remote_module', None)
+        if module is None:
+            return False
+        try:
+            return not module.channel.isclosed()
+        except Exception:
+            return False
+
+
+class _LockedModule(object):
+    """
+    Wraps a remoto ``ModuleExecute`` so that each call holds the connection
+    lock while the request is sent and the response is received.
+    """
+
+    def __init__(self, module, lock, hostname=None):
+        self._module = module
+        self._lock = lock
+        self._hostname = hostname
+
+    def __getattr__(self, name):
+        func = getattr(self._module, name)
+        lock = self._lock
+        hostname = self._hostname
+
+        def wrapper(*args):
+            with trace.span('remote_module.%s' % name, host=hostname):
+                with lock:
+                    return func(*args)
+        return wrapper
+
+
+class Connection(object):
+    """
+    A handle on a pooled remoto connection. It behaves like
+    ``remoto.Connection`` except that ``exit()`` only gives the handle back to
+    the pool: the underlying connection stays open until :func:`close_all` is
+    called at the end of the run.
+    """
+
+    _local = ('_entry', '_key', '_released', 'logger')
+
+    def __init__(self, entry, key, logger):
+        object.__setattr__(self, '_entry', entry)
+        object.__setattr__(self, '_key', key)
+        object.__setattr__(self, '_released', False)
+        object.__setattr__(self, 'logger', logger)
+
+    def __getattr__(self, name):
+        return getattr(self._entry.conn, name)
+
+    def __setattr__(self, name, value):
+        if name in self._local:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._entry.conn, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.exit()
+        return False
+
+    @property
+    def remote_module(self):
+        module = self._entry.conn.remote_module
+        if module is None:
+            return None
+        return _LockedModule(module, self._entry.lock, self._key[0])
+
+    def import_module(self, module):
+        """
+        Import ``module`` on the remote end, unless a previous handle for
+        this host already did and its channel is still open.
+        """
+        entry = self._entry
+        with entry.lock:
+            if entry.module is not module or not entry.module_alive:
+                entry.conn.import_module(module)
+                entry.module = module
+
+    def batch(self, stop_on_error=True):
+        """
+        Return a :class:`Batch` to queue calls to the remote module and run
+        them in a single round trip.
+        """
+        return Batch(self, stop_on_error=stop_on_error)
+
+    def exit(self):
+        if self._released:
+            return
+        self._released = True
+        _release(self._key)
+
+
+class Batch(object):
+    """
+    Queues calls to functions of the remote module so that all of them run on
+    the remote end in a single round trip::
+
+        batch = conn.batch()
+        batch.path_exists('/var/lib/ceph/osd/ceph-0/whoami')
+        batch.readline('/var/lib/ceph/osd/ceph-0/whoami')
+        exists, whoami = batch.run()
+
+    By default calls stop at the first one that fails and its error is raised
+    as a ``RuntimeError``, just like making the calls one by one would. With
+    ``stop_on_error=False`` every call runs, and the ones that failed get a
+    ``RuntimeError`` instance in place of their result.
+
+    The remote module needs a ``run_batch`` function, like the one in
+    :mod:`ceph_deploy.hosts.remotes`.
+    """
+
+    def __init__(self, conn, stop_on_error=True):
+        self.conn = conn
+        self.stop_on_error = stop_on_error
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def queue(*args):
+            self.calls.append((name, args))
+        return queue
+
+    def run(self):
+        calls, self.calls = self.calls, []
+        if not calls:
+            return []
+        values = []
+        for ok, value in self.conn.remote_module.run_batch(calls, self.stop_on_error):
+            if ok:
+                values.append(value)
+                continue
+            error = RuntimeError(value)
+            if self.stop_on_error:
+                raise error
+            values.append(error)
+        return values
+
+
+def _release(key):
+    with _pool_lock:
+        entry = _pool.get(key)
+        if entry is not None and entry.refs > 0:
+            entry.refs -= 1
+
+
+def _acquire(key, connect):
+    with _pool_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    # only one thread connects to a given host, others wait for it and then
+    # reuse the connection, while connections to other hosts go ahead
+    with key_lock:
+        with _pool_lock:
+            entry = _pool.get(key)
+        if entry is not None and not entry.alive:
+            LOG.debug('connection to %s is gone, reconnecting', key[0])
+            with _pool_lock:
+                _retired.append((key, _pool.pop(key)))
+            entry = None
+        if entry is None:
+            entry = _Entry(connect())
+            with _pool_lock:
+                _pool[key] = entry
+        with _pool_lock:
+            entry.refs += 1
+    return entry
+
+
+def close_all():
+    """
+    Close every pooled connection, and any SSH master connection that was
+    started. Handles that are still around become unusable, so this should
+    only be called once the run is over.
+    """
+    with _pool_lock:
+        entries = _pool.items() + _retired
+        _pool.clear()
+        del _retired[:]
+    for key, entry in entries:
+        try:
+            entry.conn.exit()
+        except Exception:
+            LOG.debug('could not cleanly close connection to %s', key[0])
+    stop_masters()
+
+
+def enable_multiplexing():
+    """
+    Make every SSH session of this run go through one OpenSSH master
+    connection per host, so only the first session to a host pays for the
+    SSH handshake.
+    """
+    global _control_dir
+    if _control_dir is None:
+        _control_dir = tempfile.mkdtemp(prefix='ceph-deploy-ssh-')
+    return _control_dir
+
+
+def ssh_options():
+    """
+    The ``ssh`` options needed to share the master connection of a host, or
+    an empty list when multiplexing is not enabled.
+    """
+    if _control_dir is None:
+        return []
+    return [
+        '-o', 'ControlMaster=auto',
+        '-o', 'ControlPath=%s' % os.path.join(_control_dir, '%r@%h:%p'),
+        '-o', 'ControlPersist=%d' % CONTROL_PERSIST,
+    ]
+
+
+def start_masters(hostnames, username=None):
+    """
+    Start the master connections for ``hostnames`` at the same time, ahead
+    of the (usually serial) work on each host. Hosts that cannot be reached
+    without a password are left alone, they will prompt on first use as
+    usual. Does nothing when multiplexing is not enabled.
+    """
+    if _control_dir is None:
+        return
+
+    def start(hostname):
+        if username:
+            hostname = '%s@%s' % (username, hostname)
+        if not remoto.connection.needs_ssh(hostname):
+            return
+        _masters.add(hostname)
+        command = ['ssh'] + ssh_options() + ['-o', 'BatchMode=yes', hostname, 'true']
+        # the master stays in the background holding on to the stdout and
+        # stderr it inherited, reading those until they close would wait for
+        # it to exit (ControlPersist seconds later), so only wait for ssh
+        with open(os.devnull, 'r+') as devnull:
+            subprocess.Popen(
+                command,
+                stdin=devnull,
+                stdout=devnull,
+                stderr=devnull,
+            ).wait()
+
+    parallel.run(start, set(hostnames), jobs=len(set(hostnames)))
+
+
+def stop_masters():
+    global _control_dir
+    if _control_dir is None:
+        return
+    for hostname in _masters:
+        command = ['ssh'] + ssh_options() + ['-O', 'exit', hostname]
+        try:
+            subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            ).communicate()
+        except OSError:
+            pass
+    _masters.clear()
+    shutil.rmtree(_control_dir, ignore_errors=True)
+    _control_dir = None
+
+
+class MultiplexedConnection(remoto.Connection):
+    """
+    A remoto connection whose SSH sessions, including the one used to detect
+    ``sudo``, go through the master connection for the host.
+    """
+
+    def _make_connection_string(self, hostname, _needs_ssh=None, use_sudo=None):
+        spec = super(MultiplexedConnection, self)._make_connection_string(
+            hostname,
+            _needs_ssh=_needs_ssh,
+            use_sudo=use_sudo,
+        )
+        if spec.startswith('ssh='):
+            spec = 'ssh=%s %s' % (' '.join(ssh_options()), spec[len('ssh='):])
+        return spec
+
+
+def rsync(conn, source, destination):
+    """
+    Push the ``source`` directory to ``destination`` on the remote end of
+    ``conn``, reusing its gateway instead of opening a new connection.
+    """
+    sync = remoto.file_sync._RSync(source, logger=conn.logger)
+    sync.add_target(conn.gateway, destination)
+    return sync.send()
+
+
+atexit.register(close_all)
 
 
 def get_connection(hostname, username, logger, threads=5, use_sudo=None, detect_sudo=True):
     """
     A very simple helper, meant to return a connection
     that will know about the need to use sudo.
+
+    Connections are pooled: asking again for the same host returns a handle
+    on the connection that is already open.
     """
     if username:
         hostname = "%s@%s" % (username, hostname)
-    try:
-        conn = remoto.Connection(
+
+    def connect():
+        if _control_dir is not None:
+            factory = MultiplexedConnection
+            if remoto.connection.needs_ssh(hostname):
+                _masters.add(hostname)
+        else:
+            factory = remoto.Connection
+        conn = factory(
             hostname,
             logger=logger,
             threads=threads,
@@ -23,10 +395,14 @@ def get_connection(hostname, username, logger, threads=5, use_sudo=None, detect_
         logger.debug("connected to host: %s " % hostname)
         return conn
 
+    key = (hostname, detect_sudo)
+    try:
+        entry = _acquire(key, connect)
     except Exception as error:
         msg = "connecting to host: %s " % hostname
         errors = "resulted in errors: %s %s" % (error.__class__.__name__, error)
         raise RuntimeError(msg + errors)
+    return Connection(entry, key, logger)
 
 
 def get_local_connection(logger, use_sudo=False):
@@ -3,79 +3,144 @@ import logging
 
 from ceph_deploy import hosts, exc
 from ceph_deploy.cliutil import priority
+from ceph_deploy.util import parallel
+from ceph_deploy.util.decorators import make_exception_message
 
 
 LOG = logging.getLogger(__name__)
 
 
-def fetch_file(args, frompath, topath, _hosts):
-    if os.path.exists(topath):
-        LOG.debug('Have %s', topath)
-        return True
-    else:
-        for hostname in _hosts:
-            filepath = frompath.format(hostname=hostname)
-            LOG.debug('Checking %s for %s', hostname, filepath)
-            distro = hosts.get(hostname, username=args.username)
-            key = distro.conn.remote_module.get_file(filepath)
+def keyrings(cluster):
+    """
+    The keyrings to gather, as ``(local path, remote path, required)`` tuples.
+    Remote paths may contain ``{hostname}`` for keyrings that live in a
+    per-monitor directory.
+    """
+    wanted = [
+        (
+            '{cluster}.client.admin.keyring'.format(cluster=cluster),
+            '/etc/ceph/{cluster}.client.admin.keyring'.format(cluster=cluster),
+            True,
+        ),
+        (
+            '{cluster}.mon.keyring'.format(cluster=cluster),
+            '/var/lib/ceph/mon/{cluster}-{{hostname}}/keyring'.format(cluster=cluster),
+            True,
+        ),
+    ]
+    for what in ['osd', 'mds', 'rgw']:
+        wanted.append((
+            '{cluster}.bootstrap-{what}.keyring'.format(cluster=cluster, what=what),
+            '/var/lib/ceph/bootstrap-{what}/{cluster}.keyring'.format(
+                what=what,
+                cluster=cluster),
+            what in ['osd', 'mds'],
+        ))
+    return wanted
 
-            if key is not None:
-                LOG.debug('Got %s key from %s.', topath, hostname)
-                with file(topath, 'w') as f:
-                    f.write(key)
-                    return True
-            distro.conn.exit()
-            LOG.warning('Unable to find %s on %s', filepath, hostname)
-    return False
+
+def fetch_keys(args, wanted, hostname):
+    """
+    Fetch every wanted keyring from a single monitor in one remote call and
+    return the ones it has, mapped by their local path.
+    """
+    distro = hosts.get(hostname, username=args.username)
+    paths = dict(
+        (frompath.format(hostname=hostname), topath)
+        for topath, frompath, _ in wanted
+    )
+    try:
+        found = distro.conn.remote_module.get_files(paths.keys())
+    finally:
+        distro.conn.exit()
+    return dict(
+        (paths[path], key) for path, key in found.items()
+        if key is not None
+    )
+
+
+def combine(keys_per_host, order, preferred=None):
+    """
+    Combine the keys from every monitor that answered, in the ``order`` the
+    monitors were given, with the keys of the ``preferred`` monitor (the
+    first one that had every required keyring) taking precedence.
+    """
+    keys = {}
+    for hostname in reversed(order):
+        keys.update(keys_per_host.get(hostname, {}))
+    if preferred is not None:
+        keys.update(keys_per_host[preferred])
+    return keys
+
+
+def gather(args, wanted):
+    """
+    Probe all the monitors at the same time and return the keys of the first
+    one that has every required keyring, with any optional keyring it lacks
+    taken from the other monitors: the answers of the rest are only used while
+    an optional keyring is still missing. If no monitor has all the required
+    keyrings, keys are combined from every monitor that answered, in the order
+    the monitors were given.
+
+    Monitors still being probed once the keys are complete are not used, but
+    they are waited for before returning so none of them is left connected.
+    """
+    required = set(topath for topath, _, required in wanted if required)
+    everything = set(topath for topath, _, _ in wanted)
+    answered = {}
+    complete = None
+    results = parallel.as_completed(
+        lambda hostname: fetch_keys(args, wanted, hostname),
+        args.mon,
+        jobs=len(args.mon),
+    )
+    try:
+        for result in results:
+            if not result.ok:
+                LOG.warning(
+                    'Unable to gather keys from %s: %s',
+                    result.item,
+                    make_exception_message(result.error).strip(),
+                )
+                continue
+            answered[result.item] = result.value
+            if complete is None and required.issubset(result.value):
+                LOG.debug('Got all required keys from %s', result.item)
+                complete = result.item
+            if complete is not None:
+                keys = combine(answered, args.mon, complete)
+                if everything.issubset(keys):
+                    return keys
+    finally:
+        results.close()
+
+    return combine(answered, args.mon, complete)
 
 
 def gatherkeys(args):
     oldmask = os.umask(077)
     try:
-        # client.admin
-        keyring = '/etc/ceph/{cluster}.client.admin.keyring'.format(
-            cluster=args.cluster)
-        r = fetch_file(
-            args=args,
-            frompath=keyring,
-            topath='{cluster}.client.admin.keyring'.format(
-                cluster=args.cluster),
-            _hosts=args.mon,
-            )
-        if not r:
-            raise exc.KeyNotFoundError(keyring, args.mon)
-
-        # mon.
-        keyring = '/var/lib/ceph/mon/{cluster}-{{hostname}}/keyring'.format(
-            cluster=args.cluster)
-        r = fetch_file(
-            args=args,
-            frompath=keyring,
-            topath='{cluster}.mon.keyring'.format(cluster=args.cluster),
-            _hosts=args.mon,
-            )
-        if not r:
-            raise exc.KeyNotFoundError(keyring, args.mon)
-
-        # bootstrap
-        for what in ['osd', 'mds', 'rgw']:
-            keyring = '/var/lib/ceph/bootstrap-{what}/{cluster}.keyring'.format(
-                what=what,
-                cluster=args.cluster)
-            r = fetch_file(
-                args=args,
-                frompath=keyring,
-                topath='{cluster}.bootstrap-{what}.keyring'.format(
-                    cluster=args.cluster,
-                    what=what),
-                _hosts=args.mon,
-                )
-            if not r:
-                if what in ['osd', 'mds']:
-                    raise exc.KeyNotFoundError(keyring, args.mon)
-                else:
-                    LOG.warning(("No RGW bootstrap key found. Will not be able to "
-                                 "deploy RGW daemons"))
+        wanted = []
+        for topath, frompath, required in keyrings(args.cluster):
+            if os.path.exists(topath):
+                LOG.debug('Have %s', topath)
+            else:
+                wanted.append((topath, frompath, required))
+        if not wanted:
+            return
+
+        keys = gather(args, wanted)
+        for topath, frompath, required in wanted:
+            key = keys.get(topath)
+            if key is not None:
+                LOG.debug('Got %s key', topath)
+                with file(topath, 'w') as f:
+                    f.write(key)
+            elif required:
+                raise exc.KeyNotFoundError(frompath, args.mon)
+            else:
+                LOG.warning(("No RGW bootstrap key found. Will not be able to "
+                             "deploy RGW daemons"))
     finally:
         os.umask(oldmask)
 
@@ -6,8 +6,9 @@ on the type of distribution/version we are dealing with.
 """
 import logging
 from ceph_deploy import exc
-from ceph_deploy.hosts import debian, centos, fedora, suse, remotes, rhel
+from ceph_deploy.hosts import debian, centos, fedora, suse, remotes, rhel, facts
 from ceph_deploy.connection import get_connection
+from ceph_deploy.util import trace
 
 logger = logging.getLogger()
 
@@ -18,24 +19,35 @@ def get(hostname,
         detect_sudo=True,
         use_rhceph=False):
     """
-    Retrieve the module that matches the distribution of a ``hostname``. This
+    Retrieve the distro that matches the distribution of a ``hostname``. This
     function will connect to that host and retrieve the distribution
-    information, then return the appropriate module and slap a few attributes
-    to that module defining the information it found from the hostname.
+    information, then return a :class:`Distro` object that wraps the
+    appropriate module along with the information it found from the hostname.
 
     For example, if host ``node1.example.com`` is an Ubuntu server, the
-    ``debian`` module would be returned and the following would be set::
+    ``debian`` module would be wrapped and the following would be set::
 
-        module.name = 'ubuntu'
-        module.release = '12.04'
-        module.codename = 'precise'
+        distro.name = 'ubuntu'
+        distro.release = '12.04'
+        distro.codename = 'precise'
+
+    The distro module itself is never modified, so it is safe to call this for
+    several hosts at the same time.
 
     :param hostname: A hostname that is reachable/resolvable over the network
     :param fallback: Optional fallback to use if no supported distro is found
     :param use_rhceph: Whether or not to install RH Ceph on a RHEL machine or
                        the community distro.  Changes what host module is
                        returned for RHEL.
+
+    If the facts cache is enabled (see :mod:`ceph_deploy.hosts.facts`) and
+    has a fresh entry for the host, the remote detection is skipped.
     """
+    with trace.span('hosts.get', host=hostname):
+        return _get(hostname, username, fallback, detect_sudo, use_rhceph)
+
+
+def _get(hostname, username, fallback, detect_sudo, use_rhceph):
     conn = get_connection(
         hostname,
         username=username,
@@ -47,29 +59,89 @@ def get(hostname,
     except IOError as error:
         if 'already closed' in getattr(error, 'message', ''):
             raise RuntimeError('remote connection got closed, ensure ``requiretty`` is disabled for %s' % hostname)
-    distro_name, release, codename = conn.remote_module.platform_information()
-    if not codename or not _get_distro(distro_name):
-        raise exc.UnsupportedPlatform(
-            distro=distro_name,
+    cache_key = '%s@%s' % (username, hostname) if username else hostname
+    cached = facts.lookup(cache_key)
+    if cached and _get_distro(cached['distro_name']):
+        distro_name = cached['distro_name']
+        release = cached['release']
+        codename = cached['codename']
+        machine_type = cached['machine_type']
+    else:
+        distro_name, release, codename = conn.remote_module.platform_information()
+        if not codename or not _get_distro(distro_name):
+            raise exc.UnsupportedPlatform(
+                distro=distro_name,
+                codename=codename,
+                release=release)
+
+        machine_type = conn.remote_module.machine_type()
+        facts.store(
+            cache_key,
+            distro_name=distro_name,
+            release=release,
             codename=codename,
-            release=release)
-
-    machine_type = conn.remote_module.machine_type()
+            machine_type=machine_type,
+        )
     module = _get_distro(distro_name, use_rhceph=use_rhceph)
-    module.name = distro_name
-    module.normalized_name = _normalized_distro_name(distro_name)
-    module.normalized_release = _normalized_release(release)
-    module.distro = module.normalized_name
-    module.is_el = module.normalized_name in ['redhat', 'centos', 'fedora', 'scientific']
-    module.is_rpm = module.normalized_name in ['redhat', 'centos',
+    distro = Distro(module)
+    distro.name = distro_name
+    distro.normalized_name = _normalized_distro_name(distro_name)
+    distro.normalized_release = _normalized_release(release)
+    distro.distro = distro.normalized_name
+    distro.is_el = distro.normalized_name in ['redhat', 'centos', 'fedora', 'scientific']
+    distro.is_rpm = distro.normalized_name in ['redhat', 'centos',
                                                'fedora', 'scientific', 'suse']
-    module.is_deb = not module.is_rpm
-    module.release = release
-    module.codename = codename
-    module.conn = conn
-    module.machine_type = machine_type
-    module.init = module.choose_init()
-    return module
+    distro.is_deb = not distro.is_rpm
+    distro.release = release
+    distro.codename = codename
+    distro.conn = conn
+    distro.machine_type = machine_type
+    distro.init = module.choose_init(distro)
+    return distro
+
+
+class Distro(object):
+    """
+    The facts and connection for a single host, together with the distro
+    module that knows how to deal with it. Anything that is not a host fact
+    (``install``, ``mon``, ``pkg``, etc...) is looked up in the module, so
+    this can be used exactly like the module itself::
+
+        distro.install(distro, 'stable', 'hammer', True)
+    """
+
+    __slots__ = (
+        'module',
+        'name',
+        'normalized_name',
+        'normalized_release',
+        'distro',
+        'is_el',
+        'is_rpm',
+        'is_deb',
+        'release',
+        'codename',
+        'conn',
+        'machine_type',
+        'init',
+    )
+
+    def __init__(self, module):
+        self.module = module
+
+    def __getattr__(self, name):
+        # only called when ``name`` is not a (set) slot
+        if name == 'module':
+            raise AttributeError(name)
+        return getattr(self.module, name)
+
+    def __repr__(self):
+        return '<Distro %s %s %s (%s)>' % (
+            getattr(self, 'name', None),
+            getattr(self, 'release', None),
+            getattr(self, 'codename', None),
+            self.module.__name__,
+        )
 
 
 def _get_distro(distro, fallback=None, use_rhceph=False):
@@ -3,17 +3,13 @@ import pkg  # noqa
 from install import install, mirror_install, repo_install, repository_url_part, rpm_dist  # noqa
 from uninstall import uninstall  # noqa
 
-# Allow to set some information about this distro
-#
 
-distro = None
-release = None
-codename = None
-
-def choose_init():    
+def choose_init(distro):
     """
     Select a init system
 
     Returns the name of a init system (upstart, sysvinit ...).
+
+    :param distro: The per-host distro object with the detected host facts
     """
     return 'sysvinit'
@@ -1,4 +1,4 @@
-from ceph_deploy.util import pkg_managers, templates
+from ceph_deploy.util import gpg_keys, pkg_managers, templates
 from ceph_deploy.lib import remoto
 from ceph_deploy.hosts.util import install_yum_priorities
 from ceph_deploy.util.paths import gpg
@@ -44,7 +44,7 @@ def install(distro, version_kind, version, adjust_repos, **kw):
     repo_part = repository_url_part(distro)
     dist = rpm_dist(distro)
 
-    pkg_managers.yum_clean(distro.conn)
+    metadata = pkg_managers.yum_metadata(distro.conn, kw.get('metadata_max_age'))
 
     # Get EPEL installed before we continue:
     if adjust_repos:
@@ -64,7 +64,12 @@ def install(distro, version_kind, version, adjust_repos, **kw):
                 [
                     'rpm',
                     '--import',
-                    gpg.url(key)
+                    gpg_keys.push(
+                        distro.conn,
+                        gpg.url(key),
+                        '{key}.asc'.format(key=key),
+                        fallback_url=True,
+                    ),
                 ]
             )
 
@@ -105,6 +110,9 @@ def install(distro, version_kind, version, adjust_repos, **kw):
         distro.conn.remote_module.set_repo_priority(['Ceph', 'Ceph-noarch', 'ceph-source'])
         logger.warning('altered ceph.repo priorities to contain: priority=1')
 
+    if metadata.needed():
+        pkg_managers.yum_clean(distro.conn)
+
     remoto.process.run(
         distro.conn,
         [
@@ -131,9 +139,8 @@ def mirror_install(distro, repo_url, gpg_url, adjust_repos, extra_installs=True,
     # note: when split packages for ceph land for CentOS, `kw['components']`
     # will have those. Unused for now.
     repo_url = repo_url.strip('/')  # Remove trailing slashes
-    gpg_url_path = gpg_url.split('file://')[-1]  # Remove file if present
 
-    pkg_managers.yum_clean(distro.conn)
+    metadata = pkg_managers.yum_metadata(distro.conn, kw.get('metadata_max_age'))
 
     if adjust_repos:
         remoto.process.run(
@@ -141,7 +148,7 @@ def mirror_install(distro, repo_url, gpg_url, adjust_repos, extra_installs=True,
             [
                 'rpm',
                 '--import',
-                gpg_url_path,
+                gpg_keys.push(distro.conn, gpg_url, 'release.asc', fallback_url=True),
             ]
         )
 
@@ -156,6 +163,8 @@ def mirror_install(distro, repo_url, gpg_url, adjust_repos, extra_installs=True,
         distro.conn.remote_module.set_repo_priority(['Ceph', 'Ceph-noarch', 'ceph-source'])
         distro.conn.logger.warning('alter.d ceph.repo priorities to contain: priority=1')
 
+    if metadata.needed():
+        pkg_managers.yum_clean(distro.conn)
 
     if extra_installs:
         pkg_managers.yum(distro.conn, 'ceph')
@@ -177,7 +186,7 @@ def repo_install(distro, reponame, baseurl, gpgkey, **kw):
     _type = 'repo-md'
     baseurl = baseurl.strip('/')  # Remove trailing slashes
 
-    pkg_managers.yum_clean(distro.conn)
+    metadata = pkg_managers.yum_metadata(distro.conn, kw.pop('metadata_max_age', 0))
 
     if gpgkey:
         remoto.process.run(
@@ -185,7 +194,7 @@ def repo_install(distro, reponame, baseurl, gpgkey, **kw):
             [
                 'rpm',
                 '--import',
-                gpgkey,
+                gpg_keys.push(distro.conn, gpgkey, 'release.asc', fallback_url=True),
             ]
         )
 
@@ -221,6 +230,9 @@ def repo_install(distro, reponame, baseurl, gpgkey, **kw):
             reponame=reponame)
         )
 
+    if metadata.needed():
+        pkg_managers.yum_clean(distro.conn)
+
     # Some custom repos do not need to install ceph
     if install_ceph:
         pkg_managers.yum(distro.conn, 'ceph')
@@ -1,7 +1,8 @@
+import hashlib
+
 from ceph_deploy.util import paths
 from ceph_deploy import conf
 from ceph_deploy.lib import remoto
-from StringIO import StringIO
 
 
 def ceph_version(conn):
@@ -11,6 +12,20 @@ def ceph_version(conn):
     return remoto.process.run(conn, ['ceph', '--version'])
 
 
+def write_conf(conn, cluster, conf, overwrite, checksum=None):
+    """
+    Write ``conf`` to ``/etc/ceph/{cluster}.conf`` on the remote end of
+    ``conn``, comparing checksums first so that a host that already has it
+    only costs the checksum. Returns whether the file was written.
+    """
+    checksum = checksum or hashlib.sha1(conf).hexdigest()
+    if conn.remote_module.conf_checksum(cluster) == checksum:
+        conn.logger.debug('/etc/ceph/%s.conf is up to date' % cluster)
+        return False
+    conn.remote_module.write_conf(cluster, conf, overwrite)
+    return True
+
+
 def mon_create(distro, args, monitor_keyring, hostname):
     logger = distro.conn.logger
     logger.debug('remote hostname: %s' % hostname)
@@ -19,32 +34,40 @@ def mon_create(distro, args, monitor_keyring, hostname):
     init_path = paths.mon.init(args.cluster, hostname, distro.init)
 
     configuration = conf.ceph.load(args)
-    conf_data = StringIO()
-    configuration.write(conf_data)
 
-    # write the configuration file
-    distro.conn.remote_module.write_conf(
-        args.cluster,
-        conf_data.getvalue(),
-        args.overwrite_conf,
-    )
-
-    # if the mon path does not exist, create it
-    distro.conn.remote_module.create_mon_path(path)
+    # check what is already there in one go
+    batch = distro.conn.batch()
+    batch.conf_checksum(args.cluster)
+    batch.path_exists(done_path)
+    batch.path_exists(paths.mon.constants.tmp_path)
+    checksum, done_path_exists, tmp_path_exists = batch.run()
+
+    # write the configuration file only if it changed, and create the mon
+    # path if it does not exist, along with the next round trip
+    if checksum == configuration.checksum():
+        logger.debug('/etc/ceph/%s.conf is up to date' % args.cluster)
+    else:
+        batch.write_conf(
+            args.cluster,
+            configuration.render(),
+            args.overwrite_conf,
+        )
+    batch.create_mon_path(path)
 
     logger.debug('checking for done path: %s' % done_path)
-    if not distro.conn.remote_module.path_exists(done_path):
+    if not done_path_exists:
         logger.debug('done path does not exist: %s' % done_path)
-        if not distro.conn.remote_module.path_exists(paths.mon.constants.tmp_path):
+        if not tmp_path_exists:
             logger.info('creating tmp path: %s' % paths.mon.constants.tmp_path)
-            distro.conn.remote_module.makedir(paths.mon.constants.tmp_path)
+            batch.makedir(paths.mon.constants.tmp_path)
         keyring = paths.mon.keyring(args.cluster, hostname)
 
         logger.info('creating keyring file: %s' % keyring)
-        distro.conn.remote_module.write_monitor_keyring(
+        batch.write_monitor_keyring(
             keyring,
             monitor_keyring,
         )
+        batch.run()
 
         remoto.process.run(
             distro.conn,
@@ -58,13 +81,14 @@ def mon_create(distro, args, monitor_keyring, hostname):
         )
 
         logger.info('unlinking keyring file %s' % keyring)
-        distro.conn.remote_module.unlink(keyring)
+        batch.unlink(keyring)
 
     # create the done file
-    distro.conn.remote_module.create_done_path(done_path)
+    batch.create_done_path(done_path)
 
     # create init path
-    distro.conn.remote_module.create_init_path(init_path)
+    batch.create_init_path(init_path)
+    batch.run()
 
 
 def mon_add(distro, args, monitor_keyring):
@@ -76,14 +100,14 @@ def mon_add(distro, args, monitor_keyring):
     init_path = paths.mon.init(args.cluster, hostname, distro.init)
 
     configuration = conf.ceph.load(args)
-    conf_data = StringIO()
-    configuration.write(conf_data)
 
     # write the configuration file
-    distro.conn.remote_module.write_conf(
+    write_conf(
+        distro.conn,
         args.cluster,
-        conf_data.getvalue(),
+        configuration.render(),
         args.overwrite_conf,
+        checksum=configuration.checksum(),
     )
 
     # if the mon path does not exist, create it
@@ -3,19 +3,15 @@ import pkg  # noqa
 from install import install, mirror_install, repo_install  # noqa
 from uninstall import uninstall  # noqa
 
-# Allow to set some information about this distro
-#
 
-distro = None
-release = None
-codename = None
-
-def choose_init():    
+def choose_init(distro):
     """
     Select a init system
 
     Returns the name of a init system (upstart, sysvinit ...).
+
+    :param distro: The per-host distro object with the detected host facts
     """
-    if distro.lower() == 'ubuntu':
+    if distro.distro.lower() == 'ubuntu':
         return 'upstart'
     return 'sysvinit'
@@ -1,7 +1,7 @@
 from urlparse import urlparse
 
 from ceph_deploy.lib import remoto
-from ceph_deploy.util import pkg_managers
+from ceph_deploy.util import gpg_keys, pkg_managers
 from ceph_deploy.util.paths import gpg
 
 
@@ -16,6 +16,8 @@ def install(distro, version_kind, version, adjust_repos, **kw):
     else:
         key = 'autobuild'
 
+    metadata = pkg_managers.apt_metadata(distro.conn, kw.get('metadata_max_age'))
+
     # Make sure ca-certificates is installed
     remoto.process.run(
         distro.conn,
@@ -35,15 +37,10 @@ def install(distro, version_kind, version, adjust_repos, **kw):
         protocol = 'https'
         if codename == 'wheezy':
             protocol = 'http'
-        remoto.process.run(
+        key_path = gpg_keys.push(
             distro.conn,
-            [
-                'wget',
-                '-O',
-                '{key}.asc'.format(key=key),
-                gpg.url(key, protocol=protocol),
-            ],
-            stop_on_nonzero=False,
+            gpg.url(key, protocol=protocol),
+            '{key}.asc'.format(key=key),
         )
 
         remoto.process.run(
@@ -51,7 +48,7 @@ def install(distro, version_kind, version, adjust_repos, **kw):
             [
                 'apt-key',
                 'add',
-                '{key}.asc'.format(key=key)
+                key_path,
             ]
         )
 
@@ -75,10 +72,8 @@ def install(distro, version_kind, version, adjust_repos, **kw):
         distro.conn.remote_module.set_apt_priority(fqdn)
         distro.conn.remote_module.write_sources_list(url, codename)
 
-    remoto.process.run(
-        distro.conn,
-        ['apt-get', '-q', 'update'],
-        )
+    if metadata.needed():
+        pkg_managers.apt_update(distro.conn)
 
     # TODO this does not downgrade -- should it?
     remoto.process.run(
@@ -110,22 +105,10 @@ def mirror_install(distro, repo_url, gpg_url, adjust_repos, **kw):
     # note: when split packages for ceph land for Debian/Ubuntu,
     # `kw['components']` will have those. Unused for now.
     repo_url = repo_url.strip('/')  # Remove trailing slashes
-    gpg_path = gpg_url.split('file://')[-1]
+    metadata = pkg_managers.apt_metadata(distro.conn, kw.get('metadata_max_age'))
 
     if adjust_repos:
-        if not gpg_url.startswith('file://'):
-            remoto.process.run(
-                distro.conn,
-                [
-                    'wget',
-                    '-O',
-                    'release.asc',
-                    gpg_url,
-                ],
-                stop_on_nonzero=False,
-            )
-
-        gpg_file = 'release.asc' if not gpg_url.startswith('file://') else gpg_path
+        gpg_file = gpg_keys.push(distro.conn, gpg_url, 'release.asc')
         remoto.process.run(
             distro.conn,
             [
@@ -141,7 +124,8 @@ def mirror_install(distro, repo_url, gpg_url, adjust_repos, **kw):
 
         distro.conn.remote_module.write_sources_list(repo_url, distro.codename)
 
-    pkg_managers.apt_update(distro.conn)
+    if metadata.needed():
+        pkg_managers.apt_update(distro.conn)
     packages = (
         'ceph',
         'ceph-mds',
@@ -166,28 +150,19 @@ def repo_install(distro, repo_name, baseurl, gpgkey, **kw):
     safe_filename = '%s.list' % repo_name.replace(' ', '-')
     install_ceph = kw.pop('install_ceph', False)
     baseurl = baseurl.strip('/')  # Remove trailing slashes
+    metadata = pkg_managers.apt_metadata(distro.conn, kw.pop('metadata_max_age', 0))
 
     if gpgkey:
+        gpg_file = gpg_keys.push(distro.conn, gpgkey, 'release.asc')
         remoto.process.run(
             distro.conn,
             [
-                'wget',
-                '-O',
-                'release.asc',
-                gpgkey,
-            ],
-            stop_on_nonzero=False,
+                'apt-key',
+                'add',
+                gpg_file,
+            ]
         )
 
-    remoto.process.run(
-        distro.conn,
-        [
-            'apt-key',
-            'add',
-            'release.asc'
-        ]
-    )
-
     distro.conn.remote_module.write_sources_list(
         baseurl,
         distro.codename,
@@ -199,7 +174,8 @@ def repo_install(distro, repo_name, baseurl, gpgkey, **kw):
     distro.conn.remote_module.set_apt_priority(fqdn)
 
     # repo is not operable until an update
-    pkg_managers.apt_update(distro.conn)
+    if metadata.needed():
+        pkg_managers.apt_update(distro.conn)
 
     if install_ceph:
         # Before any install, make sure we have `wget`
@@ -0,0 +1,123 @@
+"""
+An opt-in, on-disk cache for the facts that :func:`ceph_deploy.hosts.get`
+detects on every remote host (distribution, release, codename and machine
+type). These rarely change between runs, so with the cache enabled repeated
+commands against the same hosts skip the detection round-trips.
+
+The cache is a JSON file in the current working directory, next to the
+keyrings and the log file, with one entry per host::
+
+    {
+        "node1": {
+            "timestamp": 1433116800.0,
+            "distro_name": "Ubuntu",
+            "release": "14.04",
+            "codename": "trusty",
+            "machine_type": "x86_64"
+        }
+    }
+
+Entries older than the configured TTL are detected again.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from ceph_deploy.util import constants
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PATH = 'ceph-deploy-facts.json'
+DEFAULT_TTL = constants.facts_ttl
+
+FACTS = ('distro_name', 'release', 'codename', 'machine_type')
+
+
+class FactsCache(object):
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, refresh=False, _time=None):
+        self.path = path
+        self.ttl = ttl
+        self.refresh = refresh
+        self._time = _time or time.time
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    entries = json.load(f)
+                if isinstance(entries, dict):
+                    self._entries = entries
+            except (IOError, ValueError) as error:
+                LOG.warning('ignoring unreadable facts cache %s: %s', self.path, error)
+        return self._entries
+
+    def _save(self):
+        tmp_path = '%s.tmp' % self.path
+        with open(tmp_path, 'w') as f:
+            json.dump(self._entries, f, indent=4, sort_keys=True)
+        os.rename(tmp_path, self.path)
+
+    def get(self, host):
+        """
+        Return the cached facts for ``host`` as a dictionary, or ``None`` if
+        there are none, they are too old, or a refresh was requested.
+        """
+        if self.refresh:
+            return None
+        with self._lock:
+            entry = self._load().get(host)
+        if not entry:
+            return None
+        age = self._time() - entry.get('timestamp', 0)
+        if age < 0 or age > self.ttl:
+            return None
+        if not all(fact in entry for fact in FACTS):
+            return None
+        return dict((fact, entry[fact]) for fact in FACTS)
+
+    def set(self, host, **facts):
+        entry = dict((fact, facts[fact]) for fact in FACTS)
+        entry['timestamp'] = self._time()
+        with self._lock:
+            self._load()[host] = entry
+            try:
+                self._save()
+            except (IOError, OSError) as error:
+                LOG.warning('unable to write facts cache %s: %s', self.path, error)
+
+
+# disabled unless the command line asks for it
+cache = None
+
+
+def configure(enabled=False, ttl=DEFAULT_TTL, refresh=False, path=DEFAULT_PATH):
+    """
+    Enable (or disable) the facts cache for this run. Asking for a refresh
+    enables it as well, so that the newly detected facts are stored.
+    """
+    global cache
+    if enabled or refresh:
+        cache = FactsCache(path=path, ttl=ttl, refresh=refresh)
+    else:
+        cache = None
+    return cache
+
+
+def lookup(host):
+    if cache is None:
+        return None
+    return cache.get(host)
+
+
+def store(host, **facts):
+    if cache is not None:
+        cache.set(host, **facts)
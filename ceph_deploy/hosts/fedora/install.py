@@ -1,6 +1,7 @@
 from ceph_deploy.lib import remoto
 from ceph_deploy.hosts.centos.install import repo_install, mirror_install  # noqa
 from ceph_deploy.hosts.util import install_yum_priorities
+from ceph_deploy.util import gpg_keys
 from ceph_deploy.util.paths import gpg
 
 
@@ -27,7 +28,12 @@ def install(distro, version_kind, version, adjust_repos, **kw):
                 [
                     'rpm',
                     '--import',
-                    gpg.url(key)
+                    gpg_keys.push(
+                        distro.conn,
+                        gpg.url(key),
+                        '{key}.asc'.format(key=key),
+                        fallback_url=True,
+                    ),
                 ]
             )
 
@@ -1,9 +1,12 @@
 import ConfigParser
 import errno
+import glob
+import hashlib
 import socket
 import os
 import shutil
 import tempfile
+import time
 import platform
 
 
@@ -98,20 +101,37 @@ def set_repo_priority(sections, path='/etc/yum.repos.d/ceph.repo', priority='1')
     remove_whitespace_from_assignments()
 
 
+def conf_checksum(cluster):
+    """ checksum of /etc/ceph/{cluster}.conf, None if it does not exist """
+    path = '/etc/ceph/{cluster}.conf'.format(cluster=cluster)
+    content = get_file(path)
+    if content is None:
+        return None
+    return hashlib.sha1(content).hexdigest()
+
+
 def write_conf(cluster, conf, overwrite):
     """ write cluster configuration to /etc/ceph/{cluster}.conf """
     path = '/etc/ceph/{cluster}.conf'.format(cluster=cluster)
-    tmp_file = tempfile.NamedTemporaryFile(dir='/etc/ceph', delete=False)
     err_msg = 'config file %s exists with different content; use --overwrite-conf to overwrite' % path
 
     if os.path.exists(path):
         with file(path, 'rb') as f:
             old = f.read()
-            if old != conf and not overwrite:
-                raise RuntimeError(err_msg)
-        tmp_file.write(conf)
-        tmp_file.close()
-        shutil.move(tmp_file.name, path)
+        if old == conf:
+            return
+        if not overwrite:
+            raise RuntimeError(err_msg)
+        tmp_file = tempfile.NamedTemporaryFile(dir='/etc/ceph', delete=False)
+        try:
+            tmp_file.write(conf)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+            tmp_file.close()
+            shutil.move(tmp_file.name, path)
+        finally:
+            if os.path.exists(tmp_file.name):
+                os.unlink(tmp_file.name)
         os.chmod(path, 0644)
         return
     if os.path.exists('/etc/ceph'):
@@ -205,7 +225,7 @@ def write_file(path, content, mode=0644, directory=None):
         if path.startswith("/"):
             path = path[1:]
         path = os.path.join(directory, path)
-    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT, mode), 'w') as f:
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), 'w') as f:
         f.write(content)
 
 
@@ -223,6 +243,82 @@ def get_file(path):
         pass
 
 
+def get_files(paths):
+    """ fetch remote files """
+    return dict((path, get_file(path)) for path in paths)
+
+
+def repo_fingerprint(patterns):
+    """ checksum of the files matching ``patterns``, to tell when they change """
+    digest = hashlib.sha1()
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            digest.update(path)
+            digest.update(get_file(path) or '')
+    return digest.hexdigest()
+
+
+def metadata_age(patterns):
+    """ seconds since the newest file matching ``patterns`` was modified """
+    mtimes = [
+        os.path.getmtime(path)
+        for pattern in patterns
+        for path in glob.glob(pattern)
+    ]
+    if not mtimes:
+        return None
+    return time.time() - max(mtimes)
+
+
+def osd_inventory(path='/var/lib/ceph/osd'):
+    """ gather the metadata of every OSD """
+    # the device backing each mount point
+    mounts = {}
+    try:
+        with open('/proc/mounts') as _file:
+            for line in _file:
+                parts = line.split()
+                if len(parts) > 1:
+                    mounts[parts[1]] = parts[0]
+    except IOError:
+        pass
+
+    inventory = []
+    if not os.path.isdir(path):
+        return inventory
+
+    for name in sorted(os.listdir(path)):
+        osd_path = os.path.join(path, name)
+        record = {
+            'name': name,
+            'path': osd_path,
+            'device': mounts.get(os.path.realpath(osd_path)),
+        }
+        for metadata_file in ['active', 'magic', 'whoami', 'journal_uuid']:
+            try:
+                record[metadata_file] = readline(os.path.join(osd_path, metadata_file))
+            except IOError:
+                pass
+        journal_path = os.path.join(osd_path, 'journal')
+        if os.path.exists(journal_path):
+            record['journal'] = os.path.realpath(journal_path)
+        inventory.append(record)
+    return inventory
+
+
+def run_batch(calls, stop_on_error=True):
+    """ run a batch of remote calls """
+    results = []
+    for name, args in calls:
+        try:
+            results.append((True, globals()[name](*args)))
+        except Exception as error:
+            results.append((False, '%s: %s' % (error.__class__.__name__, error)))
+            if stop_on_error:
+                break
+    return results
+
+
 def object_grep(term, file_object):
     for line in file_object.readlines():
         if term in line:
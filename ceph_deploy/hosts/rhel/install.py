@@ -1,10 +1,12 @@
-from ceph_deploy.util import pkg_managers, templates
+from ceph_deploy.util import gpg_keys, pkg_managers, templates
 from ceph_deploy.lib import remoto
 
 
 def install(distro, version_kind, version, adjust_repos, **kw):
     packages = kw.get('components', [])
-    pkg_managers.yum_clean(distro.conn)
+    metadata = pkg_managers.yum_metadata(distro.conn, kw.get('metadata_max_age'))
+    if metadata.needed():
+        pkg_managers.yum_clean(distro.conn)
     pkg_managers.yum(distro.conn, packages)
 
 
@@ -12,9 +14,8 @@ def mirror_install(distro, repo_url,
                    gpg_url, adjust_repos, extra_installs=True, **kw):
     packages = kw.get('components', [])
     repo_url = repo_url.strip('/')  # Remove trailing slashes
-    gpg_url_path = gpg_url.split('file://')[-1]  # Remove file if present
 
-    pkg_managers.yum_clean(distro.conn)
+    metadata = pkg_managers.yum_metadata(distro.conn, kw.get('metadata_max_age'))
 
     if adjust_repos:
         remoto.process.run(
@@ -22,7 +23,7 @@ def mirror_install(distro, repo_url,
             [
                 'rpm',
                 '--import',
-                gpg_url_path,
+                gpg_keys.push(distro.conn, gpg_url, 'release.asc', fallback_url=True),
             ]
         )
 
@@ -33,6 +34,9 @@ def mirror_install(distro, repo_url,
 
         distro.conn.remote_module.write_yum_repo(ceph_repo_content)
 
+    if metadata.needed():
+        pkg_managers.yum_clean(distro.conn)
+
     if extra_installs:
         pkg_managers.yum(distro.conn, packages)
 
@@ -51,7 +55,7 @@ def repo_install(distro, reponame, baseurl, gpgkey, **kw):
     _type = 'repo-md'
     baseurl = baseurl.strip('/')  # Remove trailing slashes
 
-    pkg_managers.yum_clean(distro.conn)
+    metadata = pkg_managers.yum_metadata(distro.conn, kw.pop('metadata_max_age', 0))
 
     if gpgkey:
         remoto.process.run(
@@ -59,7 +63,7 @@ def repo_install(distro, reponame, baseurl, gpgkey, **kw):
             [
                 'rpm',
                 '--import',
-                gpgkey,
+                gpg_keys.push(distro.conn, gpgkey, 'release.asc', fallback_url=True),
             ]
         )
 
@@ -80,6 +84,9 @@ def repo_install(distro, reponame, baseurl, gpgkey, **kw):
         "%s.repo" % reponame
     )
 
+    if metadata.needed():
+        pkg_managers.yum_clean(distro.conn)
+
     # Some custom repos do not need to install ceph
     if install_ceph:
         pkg_managers.yum(distro.conn, packages)
@@ -4,23 +4,19 @@ from install import install, mirror_install, repo_install  # noqa
 from uninstall import uninstall  # noqa
 import logging
 
-# Allow to set some information about this distro
-#
-
 log = logging.getLogger(__name__)
 
-distro = None
-release = None
-codename = None
 
-def choose_init():
+def choose_init(distro):
     """
     Select a init system
 
     Returns the name of a init system (upstart, sysvinit ...).
+
+    :param distro: The per-host distro object with the detected host facts
     """
     init_mapping = { '11' : 'sysvinit', # SLE_11
         '12' : 'systemd',               # SLE_12
         '13.1' : 'systemd',             # openSUSE_13.1
         }
-    return init_mapping.get(release, 'sysvinit')
+    return init_mapping.get(distro.release, 'sysvinit')
@@ -1,4 +1,4 @@
-from ceph_deploy.util import templates, pkg_managers
+from ceph_deploy.util import gpg_keys, templates, pkg_managers
 from ceph_deploy.lib import remoto
 from ceph_deploy.util.paths import gpg
 import logging
@@ -41,7 +41,12 @@ def install(distro, version_kind, version, adjust_repos, **kw):
             [
                 'rpm',
                 '--import',
-                gpg.url(key, protocol=protocol)
+                gpg_keys.push(
+                    distro.conn,
+                    gpg.url(key, protocol=protocol),
+                    '{key}.asc'.format(key=key),
+                    fallback_url=True,
+                ),
             ]
         )
 
@@ -100,7 +105,6 @@ def mirror_install(distro, repo_url, gpg_url, adjust_repos, **kw):
     # note: when split packages for ceph land for Suse,
     # `kw['components']` will have those. Unused for now.
     repo_url = repo_url.strip('/')  # Remove trailing slashes
-    gpg_url_path = gpg_url.split('file://')[-1]  # Remove file if present
 
     if adjust_repos:
         remoto.process.run(
@@ -108,7 +112,7 @@ def mirror_install(distro, repo_url, gpg_url, adjust_repos, **kw):
             [
                 'rpm',
                 '--import',
-                gpg_url_path,
+                gpg_keys.push(distro.conn, gpg_url, 'release.asc', fallback_url=True),
             ]
         )
 
@@ -161,7 +165,7 @@ def repo_install(distro, reponame, baseurl, gpgkey, **kw):
             [
                 'rpm',
                 '--import',
-                gpgkey,
+                gpg_keys.push(distro.conn, gpgkey, 'release.asc', fallback_url=True),
             ]
         )
 
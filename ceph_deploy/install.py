@@ -2,14 +2,21 @@ import argparse
 import logging
 import os
 
-from ceph_deploy import hosts
+from ceph_deploy import connection, exc, hosts, validate
 from ceph_deploy.cliutil import priority
 from ceph_deploy.lib import remoto
+from ceph_deploy.util import constants, parallel, pkg_managers, trace
 from ceph_deploy.util.constants import default_components
 from ceph_deploy.util.paths import gpg
 
 LOG = logging.getLogger(__name__)
 
+# how many hosts are checked for an existing installation at the same time
+INSTALLED_CHECK_JOBS = 32
+
+# where --local-mirror puts the repository on every host
+LOCAL_MIRROR_PATH = '/opt/ceph-deploy/repo'
+
 
 def sanitize_args(args):
     """
@@ -100,93 +107,315 @@ def install(args):
         ' '.join(args.host),
     )
 
-    for hostname in args.host:
-        LOG.debug('Detecting platform for host %s ...', hostname)
-        distro = hosts.get(
-            hostname,
-            username=args.username,
-            # XXX this should get removed once ceph packages are split for
-            # upstream. If default_release is True, it means that the user is
-            # trying to install on a RHEL machine and should expect to get RHEL
-            # packages. Otherwise, it will need to specify either a specific
-            # version, or repo, or a development branch. Other distro users
-            # should not see any differences.
-            use_rhceph=args.default_release,
+    connection.start_masters(args.host, args.username)
+
+    installed = set()
+    if not args.reinstall:
+        installed = already_installed(args, expected_version(args))
+    pending = [hostname for hostname in args.host if hostname not in installed]
+    if not pending:
+        LOG.info('nothing to install, every host already has the requested version')
+        return
+
+    args.mirrored_hosts = set()
+    if args.local_mirror and args.mirror_fanout:
+        args.mirrored_hosts = distribute_mirror(args, pending)
+
+    results = parallel.run(
+        lambda hostname: install_host(args, hostname, version),
+        pending,
+        jobs=args.jobs,
+    )
+
+    if len(results) == 1 and not results[0].ok:
+        # a single host behaves just like it always did, the error bubbles up
+        raise results[0].error
+
+    errors = parallel.report(results, LOG, title='Install summary')
+    if errors:
+        raise exc.GenericError('Failed to install on %d hosts' % errors)
+
+
+def expected_version(args):
+    """
+    The version that the installed packages should have after installing, or
+    ``None`` if that cannot be told before installing (development and
+    testing builds, custom repositories, only adding the repository).
+    """
+    if args.repo or args.version_kind != 'stable':
+        return None
+    repo_url = args.repo_url or os.environ.get('CEPH_DEPLOY_REPO_URL')
+    if args.local_mirror or repo_url:
+        return None
+    if should_use_custom_repo(args, getattr(args, 'cd_conf', None), repo_url):
+        # a repository from cephdeploy.conf can hold any version
+        return None
+    release = args.release.lower()
+    if release in constants.release_versions:
+        return constants.release_versions[release]
+    if release.replace('.', '').isdigit():
+        # an actual version number
+        return release
+    return None
+
+
+def version_matches(installed, expected):
+    """
+    Whether an ``installed`` package version (like ``0.94.2-1trusty``) is
+    one of the ``expected`` version (like ``0.94``).
+    """
+    return (
+        installed == expected or
+        installed.startswith(expected + '.') or
+        installed.startswith(expected + '-')
+    )
+
+
+def installed_check(args, hostname, expected):
+    """
+    Whether the packages of every requested component on ``hostname`` are
+    already at the ``expected`` version, with a single query to the package
+    manager.
+    """
+    distro = hosts.get(
+        hostname,
+        username=args.username,
+        use_rhceph=args.default_release,
+    )
+    if distro.is_rpm:
+        component_packages = constants.component_packages.rpm
+    else:
+        component_packages = constants.component_packages.deb
+    # installed whatever the components, ``ceph`` needs ``ceph-common``
+    packages = ['ceph', 'ceph-common']
+    for component in detect_components(args, distro):
+        package = component_packages.get(component, component)
+        if package not in packages:
+            packages.append(package)
+    versions = pkg_managers.installed_versions(distro.conn, packages, rpm=distro.is_rpm)
+    distro.conn.exit()
+    return all(
+        version_matches(versions.get(package, ''), expected)
+        for package in packages
+    )
+
+
+def already_installed(args, expected):
+    """
+    Check every host at the same time and return the ones that already have
+    the ``expected`` version installed. Hosts that could not be checked are
+    left for the install to deal with.
+    """
+    if expected is None:
+        return set()
+    LOG.debug('checking for ceph %s on hosts %s', expected, ' '.join(args.host))
+    results = parallel.run(
+        lambda hostname: installed_check(args, hostname, expected),
+        args.host,
+        jobs=INSTALLED_CHECK_JOBS,
+    )
+    installed = set()
+    for result in results:
+        if result.ok and result.value:
+            LOG.info(
+                'ceph %s is already installed on %s, skipping (use --reinstall to install anyway)',
+                expected,
+                result.item,
             )
-        LOG.info(
-            'Distro info: %s %s %s',
-            distro.name,
-            distro.release,
-            distro.codename
+            installed.add(result.item)
+        elif not result.ok:
+            LOG.debug('could not check the installed version on %s: %s', result.item, result.error)
+    return installed
+
+
+def copy_mirror(args, source, hostname):
+    """
+    Copy the local mirror to ``hostname``, from the admin node when
+    ``source`` is ``None`` and from the ``source`` host (which already has
+    it) otherwise.
+
+    Host to host copies run as the connecting user on ``source``, so that its
+    own SSH keys and known hosts are used, and ``rsync`` runs under ``sudo``
+    on ``hostname`` when its connection needs it.
+    """
+    logger = logging.getLogger(hostname)
+    conn = connection.get_connection(hostname, args.username, logger)
+    try:
+        if source is None:
+            connection.rsync(conn, args.local_mirror, LOCAL_MIRROR_PATH)
+            return
+        remoto.process.run(conn, ['mkdir', '-p', os.path.dirname(LOCAL_MIRROR_PATH)])
+        source_conn = connection.get_connection(
+            source,
+            args.username,
+            logging.getLogger(source),
+            detect_sudo=False,
         )
+        try:
+            target = hostname
+            if args.username:
+                target = '%s@%s' % (args.username, hostname)
+            ssh_command = 'ssh -o BatchMode=yes'
+            if args.mirror_skip_host_key_check:
+                ssh_command += ' -o StrictHostKeyChecking=no'
+            command = [
+                'rsync',
+                '-a',
+                '--delete',
+                '-e', ssh_command,
+            ]
+            if conn.sudo:
+                command.append('--rsync-path=sudo rsync')
+            command.extend([
+                LOCAL_MIRROR_PATH + '/',
+                '%s:%s' % (target, LOCAL_MIRROR_PATH),
+            ])
+            remoto.process.run(source_conn, command)
+        finally:
+            source_conn.exit()
+    finally:
+        conn.exit()
+
+
+def distribute_mirror(args, hostnames):
+    """
+    Copy the local mirror to ``hostnames`` in waves, with every host that
+    already has it passing it on to ``args.mirror_fanout`` more hosts, so that
+    the admin node uplink is not crossed once per host. Returns the hosts that
+    got the mirror, the others get it from the admin node when installing.
+    """
+    mirrored = set()
+    waves = parallel.fanout_waves(hostnames, args.mirror_fanout)
+    LOG.info(
+        'distributing %s to %d hosts in %d waves',
+        args.local_mirror,
+        len(hostnames),
+        len(waves),
+    )
 
-        components = detect_components(args, distro)
-        if distro.init == 'sysvinit' and args.cluster != 'ceph':
-            LOG.error('refusing to install on host: %s, with custom cluster name: %s' % (
+    def copy(pair):
+        source, hostname = pair
+        with trace.span('install.copy_mirror', host=hostname, source=source or 'admin'):
+            copy_mirror(args, source, hostname)
+
+    for number, wave in enumerate(waves, 1):
+        # a host that did not get the mirror cannot pass it on
+        wave = [
+            (source, hostname) for source, hostname in wave
+            if source is None or source in mirrored
+        ]
+        LOG.debug('mirror wave %d: %s', number, ', '.join(
+            '%s -> %s' % (source or 'admin', hostname) for source, hostname in wave))
+        for result in parallel.run(copy, wave, jobs=len(wave)):
+            source, hostname = result.item
+            if result.ok:
+                mirrored.add(hostname)
+            else:
+                LOG.warning(
+                    'could not copy the mirror from %s to %s, it will be pushed from here: %s',
+                    source or 'admin',
                     hostname,
-                    args.cluster,
+                    result.error,
                 )
-            )
-            LOG.error('custom cluster names are not supported on sysvinit hosts')
-            continue
+    return mirrored
 
-        rlogger = logging.getLogger(hostname)
-        rlogger.info('installing ceph on %s' % hostname)
-
-        cd_conf = getattr(args, 'cd_conf', None)
-
-        # custom repo arguments
-        repo_url = os.environ.get('CEPH_DEPLOY_REPO_URL') or args.repo_url
-        gpg_url = os.environ.get('CEPH_DEPLOY_GPG_URL') or args.gpg_url
-        gpg_fallback = gpg.url('release')
-
-        if gpg_url is None and repo_url:
-            LOG.warning('--gpg-url was not used, will fallback')
-            LOG.warning('using GPG fallback: %s', gpg_fallback)
-            gpg_url = gpg_fallback
-
-        if args.local_mirror:
-            remoto.rsync(hostname, args.local_mirror, '/opt/ceph-deploy/repo', distro.conn.logger, sudo=True)
-            repo_url = 'file:///opt/ceph-deploy/repo'
-            gpg_url = 'file:///opt/ceph-deploy/repo/release.asc'
-
-        if repo_url:  # triggers using a custom repository
-            # the user used a custom repo url, this should override anything
-            # we can detect from the configuration, so warn about it
-            if cd_conf:
-                if cd_conf.get_default_repo():
-                    rlogger.warning('a default repo was found but it was \
-                        overridden on the CLI')
-                if args.release in cd_conf.get_repos():
-                    rlogger.warning('a custom repo was found but it was \
-                        overridden on the CLI')
-
-            rlogger.info('using custom repository location: %s', repo_url)
-            distro.mirror_install(
-                distro,
-                repo_url,
-                gpg_url,
-                args.adjust_repos,
-                components=components,
-            )
 
-        # Detect and install custom repos here if needed
-        elif should_use_custom_repo(args, cd_conf, repo_url):
-            LOG.info('detected valid custom repositories from config file')
-            custom_repo(distro, args, cd_conf, rlogger)
+def install_host(args, hostname, version):
+    """
+    Install Ceph on a single host. Safe to be called concurrently for
+    different hosts: every message is logged with the hostname as a prefix.
+    """
+    rlogger = logging.getLogger(hostname)
+    LOG.debug('Detecting platform for host %s ...', hostname)
+    distro = hosts.get(
+        hostname,
+        username=args.username,
+        # XXX this should get removed once ceph packages are split for
+        # upstream. If default_release is True, it means that the user is
+        # trying to install on a RHEL machine and should expect to get RHEL
+        # packages. Otherwise, it will need to specify either a specific
+        # version, or repo, or a development branch. Other distro users
+        # should not see any differences.
+        use_rhceph=args.default_release,
+        )
+    rlogger.info(
+        'Distro info: %s %s %s',
+        distro.name,
+        distro.release,
+        distro.codename
+    )
 
-        else:  # otherwise a normal installation
-            distro.install(
-                distro,
-                args.version_kind,
-                version,
-                args.adjust_repos,
-                components=components,
+    components = detect_components(args, distro)
+    if distro.init == 'sysvinit' and args.cluster != 'ceph':
+        # skipped, just like it always was, without failing the other hosts
+        rlogger.error('refusing to install on host: %s, with custom cluster name: %s' % (
+                hostname,
+                args.cluster,
             )
-
-        # Check the ceph version we just installed
-        hosts.common.ceph_version(distro.conn)
+        )
+        rlogger.error('custom cluster names are not supported on sysvinit hosts')
         distro.conn.exit()
+        return
+
+    rlogger.info('installing ceph on %s' % hostname)
+
+    cd_conf = getattr(args, 'cd_conf', None)
+
+    # custom repo arguments
+    repo_url = os.environ.get('CEPH_DEPLOY_REPO_URL') or args.repo_url
+    gpg_url = os.environ.get('CEPH_DEPLOY_GPG_URL') or args.gpg_url
+    gpg_fallback = gpg.url('release')
+
+    if gpg_url is None and repo_url:
+        LOG.warning('--gpg-url was not used, will fallback')
+        LOG.warning('using GPG fallback: %s', gpg_fallback)
+        gpg_url = gpg_fallback
+
+    if args.local_mirror:
+        if hostname not in args.mirrored_hosts:
+            connection.rsync(distro.conn, args.local_mirror, LOCAL_MIRROR_PATH)
+        repo_url = 'file://%s' % LOCAL_MIRROR_PATH
+        gpg_url = 'file://%s/release.asc' % LOCAL_MIRROR_PATH
+
+    if repo_url:  # triggers using a custom repository
+        # the user used a custom repo url, this should override anything
+        # we can detect from the configuration, so warn about it
+        if cd_conf:
+            if cd_conf.get_default_repo():
+                rlogger.warning('a default repo was found but it was \
+                    overridden on the CLI')
+            if args.release in cd_conf.get_repos():
+                rlogger.warning('a custom repo was found but it was \
+                    overridden on the CLI')
+
+        rlogger.info('using custom repository location: %s', repo_url)
+        distro.mirror_install(
+            distro,
+            repo_url,
+            gpg_url,
+            args.adjust_repos,
+            components=components,
+            metadata_max_age=args.metadata_max_age,
+        )
+
+    # Detect and install custom repos here if needed
+    elif should_use_custom_repo(args, cd_conf, repo_url):
+        rlogger.info('detected valid custom repositories from config file')
+        custom_repo(distro, args, cd_conf, rlogger)
+
+    else:  # otherwise a normal installation
+        distro.install(
+            distro,
+            args.version_kind,
+            version,
+            args.adjust_repos,
+            components=components,
+            metadata_max_age=args.metadata_max_age,
+        )
+
+    # Check the ceph version we just installed
+    hosts.common.ceph_version(distro.conn)
+    distro.conn.exit()
 
 
 def should_use_custom_repo(args, cd_conf, repo_url):
@@ -217,6 +446,7 @@ def custom_repo(distro, args, cd_conf, rlogger, install_ceph=None):
     """
     default_repo = cd_conf.get_default_repo()
     components = detect_components(args, distro)
+    metadata_max_age = getattr(args, 'metadata_max_age', 0)
     if args.release in cd_conf.get_repos():
         LOG.info('will use repository from conf: %s' % args.release)
         default_repo = args.release
@@ -240,6 +470,7 @@ def custom_repo(distro, args, cd_conf, rlogger, install_ceph=None):
                 options.pop('baseurl'),
                 options.pop('gpgkey'),
                 components=components,
+                metadata_max_age=metadata_max_age,
                 **options
             )
         except KeyError as err:
@@ -255,6 +486,7 @@ def custom_repo(distro, args, cd_conf, rlogger, install_ceph=None):
                     options.pop('baseurl'),
                     options.pop('gpgkey'),
                     components=components,
+                    metadata_max_age=metadata_max_age,
                     **options
                 )
             except KeyError as err:
@@ -565,6 +797,23 @@ def make(parser):
         help='Fetch packages and push them to hosts for a local repo mirror',
     )
 
+    parser.add_argument(
+        '--mirror-fanout',
+        metavar='WIDTH',
+        type=validate.non_negative_int,
+        default=0,
+        help='with --local-mirror, have every host that has the mirror copy \
+                it to WIDTH more hosts (default: copy it from here to every \
+                host)',
+    )
+
+    parser.add_argument(
+        '--mirror-skip-host-key-check',
+        action='store_true',
+        help='with --mirror-fanout, do not check the SSH host keys of hosts \
+                when they copy the mirror to each other',
+    )
+
     parser.add_argument(
         '--repo-url',
         nargs='?',
@@ -580,6 +829,30 @@ def make(parser):
                 (defaults to ceph.com)'
     )
 
+    parser.add_argument(
+        '--jobs', '-j',
+        metavar='N',
+        type=validate.positive_int,
+        default=1,
+        help='install on up to N hosts at the same time (default: %(default)s)',
+    )
+
+    parser.add_argument(
+        '--reinstall',
+        action='store_true',
+        help='install even on hosts that already have the requested version',
+    )
+
+    parser.add_argument(
+        '--metadata-max-age',
+        metavar='SECONDS',
+        type=validate.non_negative_int,
+        default=0,
+        help='only refresh package metadata (apt-get update, yum clean) when \
+                a repository changed or it is older than SECONDS \
+                (default: always refresh)',
+    )
+
     parser.set_defaults(
         func=install,
     )
@@ -4,10 +4,10 @@ import re
 import os
 import time
 
-from ceph_deploy import conf, exc, admin
+from ceph_deploy import conf, exc, admin, validate
 from ceph_deploy.cliutil import priority
 from ceph_deploy.util.help_formatters import ToggleRawTextHelpFormatter
-from ceph_deploy.util import paths, net, files
+from ceph_deploy.util import backoff, paths, net, files, parallel, trace
 from ceph_deploy.lib import remoto
 from ceph_deploy.new import new_mon_keyring
 from ceph_deploy import hosts
@@ -222,7 +222,7 @@ def mon_add(args):
         distro.mon.add(distro, args, monitor_keyring)
 
         # tell me the status of the deployed mon
-        time.sleep(2)  # give some room to start
+        trace.sleep(2, host=mon_host)  # give some room to start
         catch_mon_errors(distro.conn, rlogger, mon_host, cfg, args)
         mon_status(distro.conn, rlogger, mon_host, args)
         distro.conn.exit()
@@ -235,7 +235,8 @@ def mon_add(args):
 def mon_create(args):
 
     cfg = conf.ceph.load(args)
-    if not args.mon:
+    # ``mon create-initial`` has no hosts argument at all
+    if not getattr(args, 'mon', None):
         args.mon = get_mon_initial_members(args, error_on_empty=True, _cfg=cfg)
 
     if args.keyrings:
@@ -270,7 +271,7 @@ def mon_create(args):
             distro.mon.create(distro, args, monitor_keyring)
 
             # tell me the status of the deployed mon
-            time.sleep(2)  # give some room to start
+            trace.sleep(2, host=name)  # give some room to start
             mon_status(distro.conn, rlogger, name, args)
             catch_mon_errors(distro.conn, rlogger, name, cfg, args)
             distro.conn.exit()
@@ -302,7 +303,6 @@ def hostname_is_compatible(conn, logger, provided_hostname):
 
 def destroy_mon(conn, cluster, hostname):
     import datetime
-    import time
     retries = 5
 
     path = paths.mon.path(cluster, hostname)
@@ -344,7 +344,7 @@ def destroy_mon(conn, cluster, hostname):
         while retries:
             conn.logger.info('polling the daemon to verify it stopped')
             if is_running(conn, status_args):
-                time.sleep(5)
+                trace.sleep(5, host=hostname)
                 retries -= 1
                 if retries <= 0:
                     raise RuntimeError('ceph-mon deamon did not stop')
@@ -394,6 +394,62 @@ def mon_destroy(args):
         raise exc.GenericError('Failed to destroy %d monitors' % errors)
 
 
+def wait_for_quorum(args, mon_members, timeout):
+    """
+    Poll all the monitors at the same time, backing off between checks, until
+    every one of them is in quorum or ``timeout`` seconds have passed overall.
+    Returns the set of monitors that reached quorum.
+    """
+    deadline = time.time() + timeout
+
+    def in_quorum(status):
+        return status.get('state', '') in ['peon', 'leader']
+
+    def wait(host):
+        mon_name = 'mon.%s' % host
+        LOG.info('processing monitor %s', mon_name)
+        rlogger = logging.getLogger(host)
+        rconn = get_connection(host, username=args.username, logger=rlogger)
+
+        def check():
+            status = mon_status_check(rconn, rlogger, host, args)
+            if not in_quorum(status):
+                LOG.warning(
+                    '%s monitor is not yet in quorum, %d seconds left',
+                    mon_name,
+                    max(0, deadline - time.time()),
+                )
+            return status
+
+        try:
+            status = backoff.poll(
+                check,
+                ready=in_quorum,
+                timeout=max(0, deadline - time.time()),
+                initial=2,
+                host=host,
+            )
+        finally:
+            rconn.exit()
+        return in_quorum(status)
+
+    reached = set()
+    for result in parallel.as_completed(wait, mon_members, jobs=len(mon_members)):
+        if not result.ok:
+            LOG.error('unable to check monitor %s: %s', result.item, result.error)
+        elif result.value:
+            reached.add(result.item)
+            LOG.info(
+                'mon.%s monitor has reached quorum! (%d of %d)',
+                result.item,
+                len(reached),
+                len(mon_members),
+            )
+        else:
+            LOG.warning('mon.%s monitor did not reach quorum in time', result.item)
+    return reached
+
+
 def mon_create_initial(args):
     mon_initial_members = get_mon_initial_members(args, error_on_empty=True)
 
@@ -401,30 +457,8 @@ def mon_create_initial(args):
     mon_create(args)
 
     # make the sets to be able to compare late
-    mon_in_quorum = set([])
     mon_members = set([host for host in mon_initial_members])
-
-    for host in mon_initial_members:
-        mon_name = 'mon.%s' % host
-        LOG.info('processing monitor %s', mon_name)
-        sleeps = [20, 20, 15, 10, 10, 5]
-        tries = 5
-        rlogger = logging.getLogger(host)
-        rconn = get_connection(host, username=args.username, logger=rlogger)
-        while tries:
-            status = mon_status_check(rconn, rlogger, host, args)
-            has_reached_quorum = status.get('state', '') in ['peon', 'leader']
-            if not has_reached_quorum:
-                LOG.warning('%s monitor is not yet in quorum, tries left: %s' % (mon_name, tries))
-                tries -= 1
-                sleep_seconds = sleeps.pop()
-                LOG.warning('waiting %s seconds before retrying', sleep_seconds)
-                time.sleep(sleep_seconds)  # Magic number
-            else:
-                mon_in_quorum.add(host)
-                LOG.info('%s monitor has reached quorum!', mon_name)
-                break
-        rconn.exit()
+    mon_in_quorum = wait_for_quorum(args, mon_initial_members, args.quorum_timeout)
 
     if mon_in_quorum == mon_members:
         LOG.info('all initial monitors are running and have formed quorum')
@@ -507,6 +541,13 @@ def make(parser):
         nargs='?',
         help='concatenate multiple keyrings to be seeded on new monitors',
     )
+    mon_create_initial.add_argument(
+        '--quorum-timeout',
+        metavar='SECONDS',
+        type=validate.positive_int,
+        default=120,
+        help='how long to wait for all monitors to form quorum. Defaults to 120',
+    )
 
     mon_destroy = mon_parser.add_parser(
         'destroy',
@@ -8,8 +8,8 @@ import base64
 import socket
 
 from ceph_deploy.cliutil import priority
-from ceph_deploy import conf, hosts, exc
-from ceph_deploy.util import arg_validators, ssh, net
+from ceph_deploy import conf, hosts, exc, validate
+from ceph_deploy.util import arg_validators, ssh, net, parallel
 from ceph_deploy.misc import mon_hosts
 from ceph_deploy.lib import remoto
 from ceph_deploy.connection import get_local_connection
@@ -36,7 +36,27 @@ def ssh_copy_keys(hostname, username=None):
         return
 
     LOG.warning('could not connect via SSH')
+    copy_keys(hostname, username)
 
+
+def ssh_copy_keys_many(hostnames, username=None, jobs=1):
+    """
+    Like :func:`ssh_copy_keys` for every host in ``hostnames``: the
+    passwordless check runs for all of them at the same time, then keys are
+    copied one host after the other since that may prompt for a password.
+    """
+    LOG.info('making sure passwordless SSH succeeds')
+    results = parallel.run(ssh.can_connect_passwordless, hostnames, jobs=jobs)
+    for result in results:
+        if not result.ok:
+            raise result.error
+        if result.value:
+            continue
+        LOG.warning('could not connect via SSH to %s', result.item)
+        copy_keys(result.item, username)
+
+
+def copy_keys(hostname, username=None):
     # Create the key if it doesn't exist:
     id_rsa_pub_file = os.path.expanduser(u'~/.ssh/id_rsa.pub')
     id_rsa_file = id_rsa_pub_file.split('.pub')[0]
@@ -114,6 +134,36 @@ def get_public_network_ip(ips, public_subnet):
     raise RuntimeError(msg)
 
 
+def probe_host(args, host):
+    """
+    Connect to a monitor host and pick the IP it will be reached at, safe to
+    be called concurrently for different hosts.
+    """
+    # Now get the non-local IPs from the remote node
+    distro = hosts.get(host, username=args.username)
+    remote_ips = net.ip_addresses(distro.conn)
+
+    # custom cluster names on sysvinit hosts won't work
+    if distro.init == 'sysvinit' and args.cluster != 'ceph':
+        LOG.error('custom cluster names are not supported on sysvinit hosts')
+        raise exc.ClusterNameError(
+            'host %s does not support custom cluster names' % host
+        )
+
+    distro.conn.exit()
+
+    # Validate subnets if we received any
+    if args.public_network or args.cluster_network:
+        validate_host_ip(remote_ips, [args.public_network, args.cluster_network])
+
+    # Pick the IP that matches the public cluster (if we were told to do
+    # so) otherwise pick the first, non-local IP
+    LOG.debug('Resolving host %s', host)
+    if args.public_network:
+        return get_public_network_ip(remote_ips, args.public_network)
+    return net.get_nonlocal_ip(host)
+
+
 def new(args):
     if args.ceph_conf:
         raise RuntimeError('will not create a ceph conf file if attemtping to re-use with `--ceph-conf` flag')
@@ -135,35 +185,28 @@ def new(args):
     mon_initial_members = []
     mon_host = []
 
-    for (name, host) in mon_hosts(args.mon):
-        # Try to ensure we can ssh in properly before anything else
-        if args.ssh_copykey:
-            ssh_copy_keys(host, args.username)
+    monitors = list(mon_hosts(args.mon))
+    mon_hostnames = [host for (name, host) in monitors]
 
-        # Now get the non-local IPs from the remote node
-        distro = hosts.get(host, username=args.username)
-        remote_ips = net.ip_addresses(distro.conn)
-
-        # custom cluster names on sysvinit hosts won't work
-        if distro.init == 'sysvinit' and args.cluster != 'ceph':
-            LOG.error('custom cluster names are not supported on sysvinit hosts')
-            raise exc.ClusterNameError(
-                'host %s does not support custom cluster names' % host
-            )
+    # Try to ensure we can ssh in properly before anything else
+    if args.ssh_copykey:
+        ssh_copy_keys_many(mon_hostnames, args.username, jobs=args.jobs)
 
-        distro.conn.exit()
-
-        # Validate subnets if we received any
-        if args.public_network or args.cluster_network:
-            validate_host_ip(remote_ips, [args.public_network, args.cluster_network])
-
-        # Pick the IP that matches the public cluster (if we were told to do
-        # so) otherwise pick the first, non-local IP
-        LOG.debug('Resolving host %s', host)
-        if args.public_network:
-            ip = get_public_network_ip(remote_ips, args.public_network)
-        else:
-            ip = net.get_nonlocal_ip(host)
+    results = parallel.run(
+        lambda host: probe_host(args, host),
+        mon_hostnames,
+        jobs=args.jobs,
+    )
+    failed = [result for result in results if not result.ok]
+    if failed:
+        for result in failed[1:]:
+            LOG.error('%s: %s', result.item, result.error)
+        raise failed[0].error
+
+    # results come back in the order monitors were given, regardless of
+    # which host answered first
+    for (name, host), result in zip(monitors, results):
+        ip = result.value
         LOG.debug('Monitor %s at %s', name, ip)
         mon_initial_members.append(name)
         try:
@@ -174,8 +217,6 @@ def new(args):
         except socket.error:
             mon_host.append(ip)
 
-
-
     LOG.debug('Monitor initial members are %s', mon_initial_members)
     LOG.debug('Monitor addrs are %s', mon_host)
 
@@ -274,6 +315,14 @@ def make(parser):
         type=arg_validators.Subnet(),
     )
 
+    parser.add_argument(
+        '--jobs', '-j',
+        metavar='N',
+        type=validate.positive_int,
+        default=10,
+        help='probe up to N monitor hosts at the same time (default: %(default)s)',
+    )
+
     parser.set_defaults(
         func=new,
         )
@@ -4,13 +4,10 @@ import logging
 import os
 import re
 import sys
-import time
 from textwrap import dedent
 
-from cStringIO import StringIO
-
-from ceph_deploy import conf, exc, hosts, mon
-from ceph_deploy.util import constants, system
+from ceph_deploy import conf, connection, exc, hosts, mon, validate
+from ceph_deploy.util import backoff, constants, parallel, system
 from ceph_deploy.cliutil import priority
 from ceph_deploy.lib import remoto
 
@@ -30,9 +27,13 @@ def get_bootstrap_osd_key(cluster):
         raise RuntimeError('bootstrap-osd keyring not found; run \'gatherkeys\'')
 
 
-def create_osd(conn, cluster, key):
+def create_osd(conn, cluster, key, trigger=True):
     """
     Run on osd node, writes the bootstrap key if not there yet.
+
+    Unless ``trigger`` is false udev is triggered afterwards, callers that
+    are about to prepare and activate disks can skip it and trigger once when
+    all the disks are done instead.
     """
     logger = conn.logger
     path = '/var/lib/ceph/bootstrap-osd/{cluster}.keyring'.format(
@@ -42,6 +43,15 @@ def create_osd(conn, cluster, key):
         logger.warning('osd keyring does not exist yet, creating one')
         conn.remote_module.write_keyring(path, key)
 
+    if trigger:
+        return udev_trigger(conn)
+
+
+def udev_trigger(conn):
+    """
+    Replay the ``add`` events for all block devices so that udev picks up
+    (and activates) newly prepared OSD disks.
+    """
     return remoto.process.run(
         conn,
         [
@@ -151,6 +161,88 @@ def osd_status_check(conn, cluster):
         return {}
 
 
+def osd_ids(conn, disks):
+    """
+    Map every disk in ``disks`` (a whole device, a partition or an OSD
+    directory) to the id of the OSD it holds, or to ``None`` when that is not
+    known yet, like for a disk that was prepared but not activated.
+    """
+    ceph_disk_executable = system.executable_path(conn, 'ceph-disk')
+    out, err, code = remoto.process.check(
+        conn,
+        [
+            ceph_disk_executable,
+            'list',
+        ],
+    )
+    index = ceph_disk_index(out)
+
+    ids = {}
+    for disk in disks:
+        name = index.get(disk)
+        if name is None:
+            # a whole device, the OSD is on one of its partitions
+            for partition in sorted(index):
+                if partition != disk and journal_device(partition) == disk:
+                    name = index[partition]
+                    break
+        if name is None and not disk.startswith('/dev/'):
+            whoami = os.path.join(disk, 'whoami')
+            if conn.remote_module.path_exists(whoami):
+                name = 'osd.%s' % conn.remote_module.readline(whoami)
+        ids[disk] = int(name.split('.')[-1]) if name else None
+    return ids
+
+
+def up_osds(conn, cluster):
+    """
+    The ids of the OSDs that are up, or ``None`` if the OSD tree could not be
+    retrieved.
+    """
+    tree = osd_tree(conn, cluster)
+    if not tree:
+        return None
+    return set(
+        node.get('id') for node in tree.get('nodes', [])
+        if node.get('type') == 'osd' and node.get('status') == 'up'
+    )
+
+
+def wait_for_osds(conn, cluster, disks, timeout):
+    """
+    Poll with an increasing delay until the OSDs held by ``disks`` are up or
+    ``timeout`` seconds have passed, and return the disks whose OSD is not up.
+    Disks that hold OSDs which are up already (re-running ``activate``) do not
+    wait at all, and OSDs coming and going elsewhere in the cluster make no
+    difference.
+    """
+    ids = dict((disk, None) for disk in disks)
+
+    def check():
+        unknown = [disk for disk in disks if ids[disk] is None]
+        if unknown:
+            ids.update(osd_ids(conn, unknown))
+        return up_osds(conn, cluster)
+
+    def ready(up):
+        if up is None:
+            # the OSD tree could not be retrieved, waiting longer will not help
+            return True
+        return all(ids[disk] in up for disk in disks)
+
+    conn.logger.info('waiting up to %s seconds for %d OSDs to be up', timeout, len(disks))
+    up = backoff.poll(check, ready=ready, timeout=timeout, host=conn.hostname)
+    if up is None:
+        return []
+    pending = [disk for disk in disks if ids[disk] not in up]
+    for disk in pending:
+        if ids[disk] is None:
+            conn.logger.warning('no OSD was activated on %s', disk)
+        else:
+            conn.logger.warning('osd.%s on %s is not up', ids[disk], disk)
+    return pending
+
+
 def catch_osd_errors(conn, logger, args):
     """
     Look for possible issues when checking the status of an OSD and
@@ -192,13 +284,13 @@ def prepare_disk(
         cluster,
         disk,
         journal,
-        activate_prepared_disk,
         zap,
         fs_type,
         dmcrypt,
         dmcrypt_dir):
     """
-    Run on osd node, prepares a data disk for use.
+    Run on osd node, prepares a data disk for use. Activating it is left to
+    udev, see :func:`udev_trigger`.
     """
     args = [
         'ceph-disk',
@@ -229,17 +321,6 @@ def prepare_disk(
         args
     )
 
-    if activate_prepared_disk:
-        return remoto.process.run(
-            conn,
-            [
-                'udevadm',
-                'trigger',
-                '--subsystem-match=block',
-                '--action=add',
-            ],
-        )
-
 
 def exceeds_max_osds(args, reasonable=20):
     """
@@ -266,6 +347,90 @@ def exceeds_max_osds(args, reasonable=20):
     return per_host_count
 
 
+def group_disks(disks):
+    """
+    Group the ``(hostname, disk, journal)`` tuples from ``args.disk`` by host,
+    keeping hosts in the order they were first given::
+
+        [
+            ('cephnode-01', [('/dev/sdb', '/dev/sda5'), ('/dev/sdc', '/dev/sda6')]),
+            ('cephnode-02', [('/dev/sdb', None)]),
+        ]
+    """
+    grouped = {}
+    hostnames = []
+    for hostname, disk, journal in disks:
+        if hostname not in grouped:
+            grouped[hostname] = []
+            hostnames.append(hostname)
+        grouped[hostname].append((disk, journal))
+    return [(hostname, grouped[hostname]) for hostname in hostnames]
+
+
+def journal_device(journal):
+    """
+    Return the device a journal lives on, ``/dev/sda`` for ``/dev/sda5`` or
+    ``/dev/nvme0n1`` for ``/dev/nvme0n1p2``. Anything that does not look like
+    a partition is returned as-is.
+    """
+    partitions = [
+        r'^(/dev/(?:nvme\d+n\d+|mmcblk\d+|loop\d+))(?:p\d+)?$',
+        r'^(/dev/[a-z]+)\d+$',
+        r'^(/dev/disk/by-[a-z]+/.+)-part\d+$',
+    ]
+    for partition in partitions:
+        match = re.match(partition, journal)
+        if match:
+            return match.group(1)
+    return journal
+
+
+def group_by_journal(disks):
+    """
+    Split the ``(disk, journal)`` pairs of a single host into lanes that can
+    be prepared at the same time. ``ceph-disk`` partitions the journal device
+    while preparing a disk, so disks that share a device with each other in
+    any way (journals on the same device, a journal on another data disk, or
+    a chain of those) end up in the same lane and are prepared one after the
+    other::
+
+        >>> group_by_journal([('/dev/sdb', '/dev/sda'), ('/dev/sdc', '/dev/sda'),
+        ...                   ('/dev/sdd', None)])
+        [[('/dev/sdb', '/dev/sda'), ('/dev/sdc', '/dev/sda')], [('/dev/sdd', None)]]
+
+    Note that ``ceph-disk prepare`` takes a lock for the whole host while it
+    runs (``/var/lib/ceph/tmp/ceph-disk.prepare.lock``), so lanes only overlap
+    the work around it and not the partitioning and ``mkfs`` themselves.
+    """
+    # devices that have to be prepared one after the other point (through
+    # ``parent``) to the same device, and that device names their lane
+    parent = {}
+
+    def find(device):
+        parent.setdefault(device, device)
+        while parent[device] != device:
+            device = parent[device]
+        return device
+
+    for disk, journal in disks:
+        devices = [journal_device(disk)]
+        if journal:
+            devices.append(journal_device(journal))
+        root = find(devices[0])
+        for device in devices[1:]:
+            parent[find(device)] = root
+
+    lanes = {}
+    roots = []
+    for disk, journal in disks:
+        root = find(journal_device(disk))
+        if root not in lanes:
+            lanes[root] = []
+            roots.append(root)
+        lanes[root].append((disk, journal))
+    return [lanes[lane] for lane in roots]
+
+
 def prepare(args, cfg, activate_prepared_disk):
     LOG.debug(
         'Preparing cluster %s disks %s',
@@ -281,15 +446,16 @@ def prepare(args, cfg, activate_prepared_disk):
         for host, count in hosts_in_danger.items():
             LOG.warning('Host: %8s, OSDs: %s' % (host, count))
 
+    for hostname, disk, journal in args.disk:
+        if disk is None:
+            raise exc.NeedDiskError(hostname)
+
     key = get_bootstrap_osd_key(cluster=args.cluster)
+    connection.start_masters([disk[0] for disk in args.disk], args.username)
 
-    bootstrapped = set()
     errors = 0
-    for hostname, disk, journal in args.disk:
+    for hostname, disks in group_disks(args.disk):
         try:
-            if disk is None:
-                raise exc.NeedDiskError(hostname)
-
             distro = hosts.get(hostname, username=args.username)
             LOG.info(
                 'Distro info: %s %s %s',
@@ -297,21 +463,35 @@ def prepare(args, cfg, activate_prepared_disk):
                 distro.release,
                 distro.codename
             )
+        except RuntimeError as e:
+            LOG.error(e)
+            errors += len(disks)
+            continue
 
-            if hostname not in bootstrapped:
-                bootstrapped.add(hostname)
-                LOG.debug('Deploying osd to %s', hostname)
-
-                conf_data = StringIO()
-                cfg.write(conf_data)
-                distro.conn.remote_module.write_conf(
-                    args.cluster,
-                    conf_data.getvalue(),
-                    args.overwrite_conf
-                )
+        LOG.debug('Deploying osd to %s', hostname)
+        try:
+            hosts.common.write_conf(
+                distro.conn,
+                args.cluster,
+                cfg.render(),
+                args.overwrite_conf,
+                checksum=cfg.checksum(),
+            )
 
-                create_osd(distro.conn, args.cluster, key)
+            create_osd(
+                distro.conn,
+                args.cluster,
+                key,
+                trigger=not activate_prepared_disk,
+            )
+        except RuntimeError as e:
+            LOG.error(e)
+            errors += len(disks)
+            distro.conn.exit()
+            continue
 
+        def prepare_one(item):
+            disk, journal = item
             LOG.debug('Preparing host %s disk %s journal %s activate %s',
                       hostname, disk, journal, activate_prepared_disk)
 
@@ -320,22 +500,53 @@ def prepare(args, cfg, activate_prepared_disk):
                 cluster=args.cluster,
                 disk=disk,
                 journal=journal,
-                activate_prepared_disk=activate_prepared_disk,
                 zap=args.zap_disk,
                 fs_type=args.fs_type,
                 dmcrypt=args.dmcrypt,
                 dmcrypt_dir=args.dmcrypt_key_dir,
             )
 
-            # give the OSD a few seconds to start
-            time.sleep(5)
-            catch_osd_errors(distro.conn, distro.conn.logger, args)
-            LOG.debug('Host %s is now ready for osd use.', hostname)
-            distro.conn.exit()
+        # disks in a lane are prepared one after the other, lanes run at the
+        # same time
+        lane_results = parallel.run(
+            lambda lane: parallel.run(prepare_one, lane),
+            group_by_journal(disks),
+            jobs=args.per_host_jobs,
+        )
+        results = []
+        for lane_result in lane_results:
+            results.extend(lane_result.value)
+        results.sort(key=lambda result: disks.index(result.item))
+        for result in results:
+            result.item = result.item[0]
+
+        failed = parallel.report(
+            results,
+            distro.conn.logger,
+            title='Prepared disks on %s' % hostname,
+        )
+        errors += failed
+        prepared = [result.item for result in results if result.ok]
 
+        try:
+            if activate_prepared_disk and prepared:
+                # a single trigger activates all the disks prepared on this
+                # host
+                udev_trigger(distro.conn)
+                wait_for_osds(
+                    distro.conn,
+                    args.cluster,
+                    prepared,
+                    args.ready_timeout,
+                )
+            catch_osd_errors(distro.conn, distro.conn.logger, args)
         except RuntimeError as e:
             LOG.error(e)
-            errors += 1
+            errors += len(prepared)
+            distro.conn.exit()
+            continue
+        LOG.debug('Host %s is now ready for osd use.', hostname)
+        distro.conn.exit()
 
     if errors:
         raise exc.GenericError('Failed to create %d OSDs' % errors)
@@ -350,7 +561,9 @@ def activate(args, cfg):
         ' '.join(':'.join((s or '') for s in t) for t in args.disk),
         )
 
-    for hostname, disk, journal in args.disk:
+    connection.start_masters([disk[0] for disk in args.disk], args.username)
+
+    for hostname, disks in group_disks(args.disk):
 
         distro = hosts.get(hostname, username=args.username)
         LOG.info(
@@ -359,24 +572,30 @@ def activate(args, cfg):
             distro.release,
             distro.codename
         )
-
-        LOG.debug('activating host %s disk %s', hostname, disk)
         LOG.debug('will use init type: %s', distro.init)
 
-        remoto.process.run(
+        for disk, journal in disks:
+            LOG.debug('activating host %s disk %s', hostname, disk)
+
+            remoto.process.run(
+                distro.conn,
+                [
+                    'ceph-disk',
+                    '-v',
+                    'activate',
+                    '--mark-init',
+                    distro.init,
+                    '--mount',
+                    disk,
+                ],
+            )
+
+        wait_for_osds(
             distro.conn,
-            [
-                'ceph-disk',
-                '-v',
-                'activate',
-                '--mark-init',
-                distro.init,
-                '--mount',
-                disk,
-            ],
+            args.cluster,
+            [disk for disk, journal in disks],
+            args.ready_timeout,
         )
-        # give the OSD a few seconds to start
-        time.sleep(5)
         catch_osd_errors(distro.conn, distro.conn.logger, args)
 
         if distro.is_el:
@@ -468,15 +687,14 @@ def osd_list(args, cfg):
     # get the osd tree from a monitor host
     mon_host = monitors[0]
     distro = hosts.get(mon_host, username=args.username)
-    tree = osd_tree(distro.conn, args.cluster)
+    nodes = osd_tree_index(osd_tree(distro.conn, args.cluster))
     distro.conn.exit()
 
     interesting_files = ['active', 'magic', 'whoami', 'journal_uuid']
 
     for hostname, disk, journal in args.disk:
         distro = hosts.get(hostname, username=args.username)
-        remote_module = distro.conn.remote_module
-        osds = distro.conn.remote_module.listdir(constants.osd_path)
+        inventory = distro.conn.remote_module.osd_inventory(constants.osd_path)
 
         ceph_disk_executable = system.executable_path(distro.conn, 'ceph-disk')
         output, err, exit_code = remoto.process.check(
@@ -487,33 +705,33 @@ def osd_list(args, cfg):
             ]
         )
 
-        for _osd in osds:
-            osd_path = os.path.join(constants.osd_path, _osd)
-            journal_path = os.path.join(osd_path, 'journal')
-            _id = int(_osd.split('-')[-1])  # split on dash, get the id
+        devices = {}
+        for device, name in ceph_disk_index(output).items():
+            devices.setdefault(name, device)
+
+        for record in inventory:
+            osd_path = record['path']
+            _id = int(record['name'].split('-')[-1])  # split on dash, get the id
             osd_name = 'osd.%s' % _id
             metadata = {}
-            json_blob = {}
 
-            # piggy back from ceph-disk and get the mount point
-            device = get_osd_mount_point(output, osd_name)
+            # piggy back from ceph-disk and get the mount point, fall back to
+            # the device mounted on the OSD path
+            device = devices.get(osd_name) or record.get('device')
             if device:
                 metadata['device'] = device
 
-            # read interesting metadata from files
+            # interesting metadata read from files
             for f in interesting_files:
-                osd_f_path = os.path.join(osd_path, f)
-                if remote_module.path_exists(osd_f_path):
-                    metadata[f] = remote_module.readline(osd_f_path)
+                if f in record:
+                    metadata[f] = record[f]
 
             # do we have a journal path?
-            if remote_module.path_exists(journal_path):
-                metadata['journal path'] = remote_module.get_realpath(journal_path)
+            if record.get('journal'):
+                metadata['journal path'] = record['journal']
 
             # is this OSD in osd tree?
-            for blob in tree['nodes']:
-                if blob.get('id') == _id:  # matches our OSD
-                    json_blob = blob
+            json_blob = nodes.get(_id, {})
 
             print_osd(
                 distro.conn.logger,
@@ -551,12 +769,37 @@ def get_osd_mount_point(output, osd_name):
     :param output: A list of lines from stdout
     :param osd_name: The actual osd name, like `osd.1`
     """
+    for device, name in ceph_disk_index(output).items():
+        if name == osd_name:
+            return device
+
+
+def ceph_disk_index(output):
+    """
+    Parse the output of `ceph-disk list` once and return a dictionary that maps
+    each partition to the OSD it holds, for the example output in
+    :func:`get_osd_mount_point` that would be::
+
+        {'/dev/sdb1': 'osd.1'}
+
+    :param output: A list of lines from stdout
+    """
+    index = {}
     for line in output:
         line_parts = re.split(r'[,\s]+', line)
         for part in line_parts:
-            mount_point = line_parts[1]
-            if osd_name == part:
-                return mount_point
+            if re.match(r'^osd\.\d+$', part):
+                index.setdefault(line_parts[1], part)
+                break
+    return index
+
+
+def osd_tree_index(tree):
+    """
+    Map the id of every node in the output of `ceph osd tree` to the node
+    itself, so that looking up an OSD does not need to go through all of them.
+    """
+    return dict((node.get('id'), node) for node in tree.get('nodes', []))
 
 
 def print_osd(logger, hostname, osd_path, json_blob, metadata, journal=None):
@@ -697,6 +940,22 @@ def make(parser):
         default='/etc/ceph/dmcrypt-keys',
         help='directory where dm-crypt keys are stored',
         )
+    osd_create.add_argument(
+        '--per-host-jobs',
+        metavar='N',
+        type=validate.positive_int,
+        default=1,
+        help='how many disks to prepare at the same time on each host. \
+                ceph-disk serializes prepares on a host with its own lock, so \
+                expect little or no speedup. Defaults to 1',
+        )
+    osd_create.add_argument(
+        '--ready-timeout',
+        metavar='SECONDS',
+        type=validate.positive_int,
+        default=120,
+        help='how long to wait for new OSDs to be up. Defaults to 120',
+        )
     osd_create.add_argument(
         'disk',
         nargs='+',
@@ -735,6 +994,15 @@ def make(parser):
         default='/etc/ceph/dmcrypt-keys',
         help='directory where dm-crypt keys are stored',
         )
+    osd_prepare.add_argument(
+        '--per-host-jobs',
+        metavar='N',
+        type=validate.positive_int,
+        default=1,
+        help='how many disks to prepare at the same time on each host. \
+                ceph-disk serializes prepares on a host with its own lock, so \
+                expect little or no speedup. Defaults to 1',
+        )
     osd_prepare.add_argument(
         'disk',
         nargs='+',
@@ -747,6 +1015,13 @@ def make(parser):
         'activate',
         help='Start (activate) Ceph OSD from disk that was previously prepared'
         )
+    osd_activate.add_argument(
+        '--ready-timeout',
+        metavar='SECONDS',
+        type=validate.positive_int,
+        default=120,
+        help='how long to wait for new OSDs to be up. Defaults to 120',
+        )
     osd_activate.add_argument(
         'disk',
         nargs='+',
@@ -820,6 +1095,15 @@ def make_disk(parser):
         default='/etc/ceph/dmcrypt-keys',
         help='directory where dm-crypt keys are stored',
         )
+    disk_prepare.add_argument(
+        '--per-host-jobs',
+        metavar='N',
+        type=validate.positive_int,
+        default=1,
+        help='how many disks to prepare at the same time on each host. \
+                ceph-disk serializes prepares on a host with its own lock, so \
+                expect little or no speedup. Defaults to 1',
+        )
     disk_prepare.add_argument(
         'disk',
         nargs='+',
@@ -832,6 +1116,13 @@ def make_disk(parser):
         'activate',
         help='Start (activate) Ceph OSD from disk that was previously prepared'
         )
+    disk_activate.add_argument(
+        '--ready-timeout',
+        metavar='SECONDS',
+        type=validate.positive_int,
+        default=120,
+        help='how long to wait for new OSDs to be up. Defaults to 120',
+        )
     disk_activate.add_argument(
         'disk',
         nargs='+',
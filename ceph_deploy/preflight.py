@@ -0,0 +1,212 @@
+"""
+Check that every host is ready for ceph-deploy before doing any real work on
+them: that it can be reached over SSH without a password, that ``sudo`` works
+without a password and without a tty (``requiretty``) and that it has a Python
+the remote end of the connection can run on.
+
+Every host is checked in a single SSH session, and all of the hosts at the
+same time, so a problem with any of them shows up in seconds instead of in
+the middle of a long run.
+"""
+import logging
+import re
+import subprocess
+
+from ceph_deploy import exc
+from ceph_deploy import validate
+from ceph_deploy.cliutil import priority
+from ceph_deploy.lib import remoto
+from ceph_deploy.util import parallel
+
+
+LOG = logging.getLogger(__name__)
+
+CHECKS = ('ssh', 'sudo', 'tty', 'python')
+
+# what the remote end of a connection can run on
+PYTHON_VERSIONS = ((2, 6), (2, 7))
+
+# fed to ``sh`` on the host, it has to be valid for any Bourne shell and to
+# always exit cleanly so that a non-zero status can only come from ssh itself
+SCRIPT = """\
+echo "uid=$(id -u)"
+if [ "$(id -u)" != "0" ]; then
+    sudo_out=$(sudo -n true 2>&1 < /dev/null)
+    sudo_status=$?
+    echo "sudo=$sudo_status $(echo $sudo_out)"
+fi
+python -c 'import sys; sys.stdout.write("python=%d.%d.%d\\n" % sys.version_info[:3])' 2>/dev/null || echo "python=missing"
+exit 0
+"""
+
+
+class Check(object):
+    """
+    The outcome of a single check on a host: ``ok`` is ``None`` when the
+    check could not be made because an earlier one failed.
+    """
+
+    __slots__ = ('ok', 'detail')
+
+    def __init__(self, ok=None, detail=''):
+        self.ok = ok
+        self.detail = detail
+
+    def __str__(self):
+        if self.ok is None:
+            return '-'
+        return 'ok' if self.ok else 'FAILED'
+
+    def __repr__(self):
+        return '<Check %s %s>' % (self, self.detail)
+
+
+def run_script(hostname, username=None, timeout=10):
+    """
+    Run :data:`SCRIPT` on ``hostname`` and return its stdout and stderr lines
+    and the exit status. ``BatchMode`` makes ssh fail instead of prompting for
+    a password.
+    """
+    if username:
+        hostname = '%s@%s' % (username, hostname)
+    if remoto.connection.needs_ssh(hostname):
+        command = [
+            'ssh', '-T',
+            '-o', 'BatchMode=yes',
+            '-o', 'ConnectTimeout=%d' % timeout,
+            hostname,
+            'sh',
+        ]
+    else:
+        command = ['sh']
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    out, err = process.communicate(SCRIPT)
+    return out.splitlines(), err.splitlines(), process.returncode
+
+
+def parse(out, err, code):
+    """
+    Turn the output of :data:`SCRIPT` into a :class:`Check` for every name in
+    :data:`CHECKS`.
+    """
+    checks = dict((name, Check()) for name in CHECKS)
+    values = dict(line.split('=', 1) for line in out if '=' in line)
+
+    if code or 'uid' not in values:
+        errors = [line.strip() for line in err if line.strip()]
+        checks['ssh'] = Check(False, errors[-1] if errors else 'exited with status %s' % code)
+        return checks
+    checks['ssh'] = Check(True)
+
+    if values['uid'] == '0':
+        checks['sudo'] = Check(True, 'connected as root')
+        checks['tty'] = Check(True, 'connected as root')
+    else:
+        status, _, message = values.get('sudo', '1').partition(' ')
+        if status == '0':
+            checks['sudo'] = Check(True)
+            checks['tty'] = Check(True)
+        elif 'must have a tty' in message:
+            # requiretty is checked before any password, so whether sudo
+            # would need one is unknown
+            checks['tty'] = Check(False, 'requiretty is set for sudo')
+        else:
+            # and a password error means requiretty did not get in the way
+            checks['sudo'] = Check(False, message or 'sudo failed')
+            checks['tty'] = Check(True)
+
+    version = values.get('python', 'missing')
+    if version == 'missing':
+        checks['python'] = Check(False, 'python not found')
+    else:
+        match = re.match(r'(\d+)\.(\d+)', version)
+        supported = match and tuple(int(part) for part in match.groups()) in PYTHON_VERSIONS
+        if supported:
+            checks['python'] = Check(True, version)
+        else:
+            checks['python'] = Check(False, 'python %s, 2.6 or 2.7 is needed' % version)
+    return checks
+
+
+def check_host(args, hostname):
+    out, err, code = run_script(hostname, args.username, args.timeout)
+    return parse(out, err, code)
+
+
+def report(results, logger=None):
+    """
+    Log the pass/fail matrix for every host, followed by the reason of every
+    failed check, and return the number of hosts that did not pass.
+    """
+    logger = logger or LOG
+    failures = 0
+    logger.info('Preflight summary:')
+    logger.info(('  %-30s %s' % ('host', ''.join('%-8s' % name for name in CHECKS))).rstrip())
+    for result in results:
+        if not result.ok:
+            failures += 1
+            logger.error('  %-30s %s' % (result.item, result.error))
+            continue
+        checks = result.value
+        logger.info(('  %-30s %s' % (
+            result.item,
+            ''.join('%-8s' % checks[name] for name in CHECKS),
+        )).rstrip())
+        if any(checks[name].ok is not True for name in CHECKS):
+            failures += 1
+
+    for result in results:
+        if not result.ok:
+            continue
+        for name in CHECKS:
+            check = result.value[name]
+            if check.ok is False:
+                logger.error('%s: %s: %s', result.item, name, check.detail)
+    return failures
+
+
+def preflight(args):
+    LOG.debug('Checking %d hosts, %d at a time', len(args.host), args.jobs)
+    results = parallel.run(
+        lambda hostname: check_host(args, hostname),
+        args.host,
+        jobs=args.jobs,
+    )
+    failures = report(results, LOG)
+    if failures:
+        raise exc.GenericError('%d of %d hosts failed preflight checks' % (failures, len(args.host)))
+
+
+@priority(15)
+def make(parser):
+    """
+    Check that hosts are reachable and ready for ceph-deploy.
+    """
+    parser.add_argument(
+        'host',
+        metavar='HOST',
+        nargs='+',
+        help='hosts to check',
+        )
+    parser.add_argument(
+        '--jobs', '-j',
+        metavar='N',
+        type=validate.positive_int,
+        default=32,
+        help='check up to N hosts at the same time (default: %(default)s)',
+        )
+    parser.add_argument(
+        '--timeout',
+        metavar='SECONDS',
+        type=validate.positive_int,
+        default=10,
+        help='give up connecting to a host after SECONDS (default: %(default)s)',
+        )
+    parser.set_defaults(
+        func=preflight,
+        )
@@ -1,4 +1,3 @@
-from cStringIO import StringIO
 import errno
 import logging
 import os
@@ -140,12 +139,12 @@ def rgw_create(args):
             if hostname not in bootstrapped:
                 bootstrapped.add(hostname)
                 LOG.debug('deploying rgw bootstrap to %s', hostname)
-                conf_data = StringIO()
-                cfg.write(conf_data)
-                distro.conn.remote_module.write_conf(
+                hosts.common.write_conf(
+                    distro.conn,
                     args.cluster,
-                    conf_data.getvalue(),
+                    cfg.render(),
                     args.overwrite_conf,
+                    checksum=cfg.checksum(),
                 )
 
                 path = '/var/lib/ceph/bootstrap-rgw/{cluster}.keyring'.format(
@@ -0,0 +1,22 @@
+"""
+Benchmarks that drive whole ceph-deploy commands against simulated hosts (see
+:mod:`ceph_deploy.tests.bench.standin`) and report, for every host, the wall
+time, the round trips and the connections it took.
+
+They run with the rest of the tests using two hosts and no latency, which is
+cheap and makes sure the per-host numbers do not change with the number of
+hosts. Bigger runs are set up with environment variables::
+
+    CEPH_DEPLOY_BENCH_HOSTS=20 \
+    CEPH_DEPLOY_BENCH_LATENCY=0.05 \
+    CEPH_DEPLOY_BENCH_COMMAND_LATENCY=0.5 \
+    CEPH_DEPLOY_BENCH_REPORT=bench.json \
+    py.test -s ceph_deploy/tests/bench
+
+``CEPH_DEPLOY_BENCH_DISKS`` sets the disks per host for ``osd create`` and
+``CEPH_DEPLOY_BENCH_JOBS`` the ``--jobs`` used for ``install``.
+
+``test_startup`` times ``ceph-deploy --help`` and an argument error in a new
+interpreter instead, the best of ``CEPH_DEPLOY_BENCH_RUNS`` runs has to stay
+under ``CEPH_DEPLOY_BENCH_STARTUP_LIMIT`` seconds.
+"""
@@ -0,0 +1,15 @@
+from ceph_deploy.tests.bench.standin import StandIns, setting
+
+
+def pytest_funcarg__standins(request):
+    """
+    Simulated hosts for a single benchmark, see
+    :mod:`ceph_deploy.tests.bench`.
+    """
+    tmpdir = request.getfuncargvalue('tmpdir')
+    return StandIns(
+        str(tmpdir),
+        setting('HOSTS', 2),
+        latency=setting('LATENCY', 0, float),
+        command_latency=setting('COMMAND_LATENCY', 0, float),
+    )
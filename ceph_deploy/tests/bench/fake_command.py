@@ -0,0 +1,213 @@
+"""
+Stand-in for the executables ceph-deploy runs on remote hosts (``ceph``,
+``ceph-disk``, ``ceph-mon``, the package managers, init systems...). Each of
+them is a small wrapper in the ``bin`` directory of the benchmark that runs::
+
+    python fake_command.py NAME [ARGS...]
+
+It runs in the root of the simulated host, sleeps for
+``CEPH_DEPLOY_BENCH_COMMAND_LATENCY`` seconds and keeps just enough state
+under ``bench/`` for the commands that ceph-deploy parses to make sense.
+"""
+import fcntl
+import json
+import os
+import sys
+import time
+
+
+COMMANDS = [
+    'apt-get', 'apt-key', 'dpkg-query', 'wget', 'yum', 'rpm', 'zypper',
+    'ceph', 'ceph-disk', 'ceph-mon', 'udevadm',
+    'initctl', 'service', 'start', 'systemctl',
+]
+
+
+def _path(root, path):
+    return os.path.join(root, path.lstrip('/'))
+
+
+def _write(root, path, content):
+    path = _path(root, path)
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def _count(root, kind):
+    path = _path(root, 'bench/%s' % kind)
+    if not os.path.isdir(path):
+        return 0
+    return len(os.listdir(path))
+
+
+def start_mon(root, hostname, cluster='ceph'):
+    """
+    What starting a monitor leaves behind on its host, including the keys
+    that ``ceph-create-keys`` would create.
+    """
+    _write(root, '/var/lib/ceph/mon/%s-%s/keyring' % (cluster, hostname), '[mon.]\n')
+    _write(root, '/etc/ceph/%s.client.admin.keyring' % cluster, '[client.admin]\n')
+    for what in ['osd', 'mds', 'rgw']:
+        _write(
+            root,
+            '/var/lib/ceph/bootstrap-%s/%s.keyring' % (what, cluster),
+            '[client.bootstrap-%s]\n' % what,
+        )
+    _write(root, 'bench/mon-running', '')
+
+
+# what every package installed with apt-get ends up at
+VERSION = '0.94.2-1trusty'
+
+
+def apt_get(root, hostname, args):
+    if 'install' in args:
+        for package in args[args.index('install') + 1:]:
+            if not package.startswith('-'):
+                _write(root, 'bench/packages/%s' % package, VERSION)
+    return 0
+
+
+def dpkg_query(root, hostname, args):
+    missing = 0
+    for package in args[args.index('-f') + 2:]:
+        path = _path(root, 'bench/packages/%s' % package)
+        if not os.path.exists(path):
+            sys.stderr.write('dpkg-query: no packages found matching %s\n' % package)
+            missing += 1
+            continue
+        with open(path) as f:
+            print('%s\tinstall ok installed\t%s' % (package, f.read()))
+    return 1 if missing else 0
+
+
+def ceph(root, hostname, args):
+    if '--version' in args:
+        print('ceph version 0.94.2 (5fb85614ca8f354284c713a2f9c610860720bbf3)')
+    elif 'mon_status' in args:
+        if not os.path.exists(_path(root, 'bench/mon-running')):
+            sys.stderr.write('admin_socket: exception getting command descriptions\n')
+            return 22
+        print(json.dumps({
+            'name': hostname,
+            'rank': 0,
+            'state': 'leader',
+            'monmap': {'mons': [{'name': hostname}]},
+        }))
+    elif 'stat' in args:
+        prepared = _count(root, 'osd-prepared')
+        up = _count(root, 'osd-up')
+        print(json.dumps({
+            'epoch': 1,
+            'num_osds': prepared,
+            'num_up_osds': up,
+            'num_in_osds': str(up),
+            'full': 'false',
+            'nearfull': 'false',
+        }))
+    elif 'tree' in args:
+        print(json.dumps({'nodes': [
+            {'id': osd_id, 'name': 'osd.%d' % osd_id, 'type': 'osd', 'status': 'up'}
+            for osd_id, name in _osds(root) if _is_up(root, name)
+        ]}))
+    return 0
+
+
+def _osds(root):
+    """
+    The ``(id, disk name)`` of every disk prepared on the host.
+    """
+    prepared = _path(root, 'bench/osd-prepared')
+    names = sorted(os.listdir(prepared)) if os.path.isdir(prepared) else []
+    return list(enumerate(names))
+
+
+def _is_up(root, name):
+    return os.path.exists(_path(root, 'bench/osd-up/%s' % name))
+
+
+def ceph_disk(root, hostname, args):
+    if 'prepare' in args:
+        disk = args[args.index('--') + 1]
+        _write(root, 'bench/osd-prepared/%s' % os.path.basename(disk), '')
+    elif 'list' in args:
+        for osd_id, name in _osds(root):
+            print('/dev/%s :' % name)
+            if _is_up(root, name):
+                print(' /dev/%s1 ceph data, active, cluster ceph, osd.%d, journal /dev/%s2' % (
+                    name, osd_id, name))
+            else:
+                print(' /dev/%s1 ceph data, prepared, cluster ceph, journal /dev/%s2' % (
+                    name, name))
+    return 0
+
+
+def ceph_mon(root, hostname, args):
+    if '--mkfs' in args:
+        cluster = args[args.index('--cluster') + 1]
+        mon_id = args[args.index('-i') + 1]
+        _write(root, '/var/lib/ceph/mon/%s-%s/done' % (cluster, mon_id), '')
+    return 0
+
+
+def udevadm(root, hostname, args):
+    if 'trigger' in args:
+        prepared = _path(root, 'bench/osd-prepared')
+        for name in os.listdir(prepared) if os.path.isdir(prepared) else []:
+            _write(root, 'bench/osd-up/%s' % name, '')
+    return 0
+
+
+def init(root, hostname, args):
+    if any('ceph-mon' in arg or arg.startswith('mon.') for arg in args):
+        start_mon(root, hostname)
+    return 0
+
+
+HANDLERS = {
+    'apt-get': apt_get,
+    'dpkg-query': dpkg_query,
+    'ceph': ceph,
+    'ceph-disk': ceph_disk,
+    'ceph-mon': ceph_mon,
+    'udevadm': udevadm,
+    'initctl': init,
+    'service': init,
+    'start': init,
+    'systemctl': init,
+}
+
+
+def prepare_lock(root):
+    """
+    ``ceph-disk prepare`` holds a lock for the whole host while it runs, so
+    that disks of a host are never prepared at the same time.
+    """
+    path = _path(root, 'var/lib/ceph/tmp/ceph-disk.prepare.lock')
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    lock = open(path, 'a')
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def main(argv):
+    name, args = os.path.basename(argv[0]), argv[1:]
+    lock = None
+    if name == 'ceph-disk' and 'prepare' in args:
+        lock = prepare_lock(os.getcwd())
+    try:
+        time.sleep(float(os.environ.get('CEPH_DEPLOY_BENCH_COMMAND_LATENCY', 0)))
+        handler = HANDLERS.get(name)
+        if handler is None:
+            return 0
+        return handler(os.getcwd(), os.environ.get('CEPH_DEPLOY_BENCH_HOSTNAME'), args)
+    finally:
+        if lock is not None:
+            lock.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
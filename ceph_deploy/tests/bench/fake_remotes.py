@@ -0,0 +1,161 @@
+"""
+Stand-in for :mod:`ceph_deploy.hosts.remotes` on the simulated hosts of the
+benchmarks. execnet sends the source of this module to the remote end, so it
+has to be self-contained.
+
+Every path is taken relative to the root of the simulated host, which is the
+working directory of its gateway, so nothing outside of it is ever touched.
+"""
+import glob
+import hashlib
+import os
+import time
+
+
+def _path(path):
+    return os.path.join(os.getcwd(), path.lstrip('/'))
+
+
+def _write(path, content):
+    path = _path(path)
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def platform_information(_linux_distribution=None):
+    return 'Ubuntu', '14.04', 'trusty'
+
+
+def machine_type():
+    return 'x86_64'
+
+
+def shortname():
+    return os.environ['CEPH_DEPLOY_BENCH_HOSTNAME']
+
+
+def which_service():
+    return '/usr/sbin/service'
+
+
+def which(executable):
+    # the fake commands are in the PATH of the gateway
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        path = os.path.join(directory, executable)
+        if os.path.exists(path):
+            return path
+    return '/usr/bin/%s' % executable
+
+
+def path_exists(path):
+    return os.path.exists(_path(path))
+
+
+def makedir(path, ignored=None):
+    if not os.path.isdir(_path(path)):
+        os.makedirs(_path(path))
+
+
+safe_makedirs = safe_mkdir = create_mon_path = makedir
+
+
+def touch_file(path):
+    _write(path, '')
+
+
+create_done_path = create_init_path = touch_file
+
+
+def unlink(_file):
+    os.unlink(_path(_file))
+
+
+def write_file(path, content, *a, **kw):
+    _write(path, content)
+
+
+write_keyring = write_monitor_keyring = write_file
+
+
+def conf_checksum(cluster):
+    content = get_file('/etc/ceph/%s.conf' % cluster)
+    if content is None:
+        return None
+    return hashlib.sha1(content).hexdigest()
+
+
+def write_conf(cluster, conf, overwrite):
+    _write('/etc/ceph/%s.conf' % cluster, conf)
+
+
+def write_sources_list(url, codename, filename='ceph.list'):
+    _write('/etc/apt/sources.list.d/%s' % filename, 'deb %s %s main\n' % (url, codename))
+
+
+def set_apt_priority(fqdn, path='/etc/apt/preferences.d/ceph.pref'):
+    _write(path, 'Package: *\nPin: origin %s\nPin-Priority: 1001\n' % fqdn)
+
+
+def readline(path):
+    with open(_path(path)) as f:
+        return f.readline().strip()
+
+
+def get_file(path):
+    try:
+        with open(_path(path), 'rb') as f:
+            return f.read()
+    except IOError:
+        return None
+
+
+def get_files(paths):
+    return dict((path, get_file(path)) for path in paths)
+
+
+def repo_fingerprint(patterns):
+    digest = hashlib.sha1()
+    for pattern in patterns:
+        for path in sorted(glob.glob(_path(pattern))):
+            digest.update(path)
+            digest.update(open(path).read())
+    return digest.hexdigest()
+
+
+def metadata_age(patterns):
+    mtimes = [
+        os.path.getmtime(path)
+        for pattern in patterns
+        for path in glob.glob(_path(pattern))
+    ]
+    if not mtimes:
+        return None
+    return time.time() - max(mtimes)
+
+
+def osd_inventory(path='/var/lib/ceph/osd'):
+    return []
+
+
+def zeroing(dev):
+    pass
+
+
+def run_batch(calls, stop_on_error=True):
+    results = []
+    for name, args in calls:
+        try:
+            results.append((True, globals()[name](*args)))
+        except Exception as error:
+            results.append((False, '%s: %s' % (error.__class__.__name__, error)))
+            if stop_on_error:
+                break
+    return results
+
+
+# remoto magic, needed to execute these functions remotely
+if __name__ == '__channelexec__':
+    for item in channel:  # noqa
+        channel.send(eval(item))  # noqa
@@ -0,0 +1,283 @@
+"""
+Simulated hosts for the benchmarks. Every host is an execnet popen gateway
+running in its own root directory, with :mod:`fake_remotes` in place of the
+real remote module and :mod:`fake_command` in place of every executable
+ceph-deploy runs there.
+
+Everything ceph-deploy does goes through its real connection code, only the
+remoto connection class is swapped, so the number of connections and round
+trips measured per host are the ones a real run would have. A configurable
+latency is added to every round trip to stand in for the network.
+"""
+import json
+import logging
+import os
+import sys
+from StringIO import StringIO
+import threading
+import time
+
+from ceph_deploy import cli, connection
+from ceph_deploy.hosts import remotes
+from ceph_deploy.lib import remoto
+from ceph_deploy.tests.bench import fake_command, fake_remotes
+from ceph_deploy.tests.directory import directory
+from ceph_deploy.util import gpg_keys, trace
+
+
+LOG = logging.getLogger(__name__)
+
+KEY = '-----BEGIN PGP PUBLIC KEY BLOCK-----\n'
+
+
+def setting(name, default, kind=int):
+    """
+    Read a benchmark setting from the ``CEPH_DEPLOY_BENCH_<NAME>``
+    environment variable.
+    """
+    return kind(os.environ.get('CEPH_DEPLOY_BENCH_%s' % name, default))
+
+
+class Counters(object):
+
+    def __init__(self):
+        self.connections = 0
+        self.round_trips = 0
+
+
+class StandInConnection(remoto.Connection):
+    """
+    A remoto connection to a simulated host, counting connections and round
+    trips as they happen.
+    """
+
+    def __init__(self, standins, hostname, logger=None, **kw):
+        self.standins = standins
+        super(StandInConnection, self).__init__(
+            hostname,
+            logger=logger,
+            detect_sudo=False,
+        )
+
+    def _make_connection_string(self, hostname, _needs_ssh=None, use_sudo=None):
+        return self.standins.spec(hostname)
+
+    def _make_gateway(self, hostname):
+        gateway = super(StandInConnection, self)._make_gateway(hostname)
+        self.standins.counters(hostname).connections += 1
+        remote_exec = gateway.remote_exec
+        standins = self.standins
+
+        def counted_remote_exec(*a, **kw):
+            standins.round_trip(hostname)
+            return remote_exec(*a, **kw)
+
+        gateway.remote_exec = counted_remote_exec
+        return gateway
+
+    def import_module(self, module):
+        if module is remotes:
+            module = fake_remotes
+        super(StandInConnection, self).import_module(module)
+        self.remote_module = CountedModule(
+            self.remote_module,
+            self.standins,
+            self.hostname,
+        )
+
+
+class CountedModule(object):
+    """
+    Counts every call to the remote module as a round trip.
+    """
+
+    def __init__(self, module, standins, hostname):
+        self._module = module
+        self._standins = standins
+        self._hostname = hostname
+        # the pool checks it to tell whether the module is still usable
+        self.channel = module.channel
+
+    def __getattr__(self, name):
+        func = getattr(self._module, name)
+
+        def counted(*args):
+            self._standins.round_trip(self._hostname)
+            return func(*args)
+        return counted
+
+
+class StandIns(object):
+    """
+    ``count`` simulated hosts (``bench1``, ``bench2``, ...) under ``path``,
+    plus a working directory for ceph-deploy itself.
+    """
+
+    def __init__(self, path, count, latency=0, command_latency=0):
+        self.path = path
+        self.hosts = ['bench%d' % (number + 1) for number in range(count)]
+        self.latency = latency
+        self.command_latency = command_latency
+        self.workdir = os.path.join(path, 'admin')
+        self.bindir = os.path.join(path, 'bin')
+        self._counters = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(self.workdir)
+        os.makedirs(self.bindir)
+        for host in self.hosts:
+            os.makedirs(self.root(host))
+        script = fake_command.__file__.replace('.pyc', '.py')
+        for name in fake_command.COMMANDS:
+            wrapper = os.path.join(self.bindir, name)
+            with open(wrapper, 'w') as f:
+                f.write('#!/bin/sh\nexec "%s" "%s" "%s" "$@"\n' % (
+                    sys.executable, script, name))
+            os.chmod(wrapper, 0755)
+
+    def root(self, host):
+        return os.path.join(self.path, 'hosts', host)
+
+    def spec(self, host):
+        return '//'.join([
+            'popen',
+            'python=%s' % sys.executable,
+            'chdir=%s' % self.root(host),
+            'env:PATH=%s:%s' % (self.bindir, os.environ.get('PATH', '')),
+            'env:CEPH_DEPLOY_BENCH_HOSTNAME=%s' % host,
+            'env:CEPH_DEPLOY_BENCH_COMMAND_LATENCY=%s' % self.command_latency,
+        ])
+
+    def counters(self, host):
+        with self._lock:
+            return self._counters.setdefault(host, Counters())
+
+    def round_trip(self, host):
+        counters = self.counters(host)
+        with self._lock:
+            counters.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def connect(self, hostname, logger=None, **kw):
+        return StandInConnection(self, hostname, logger=logger, **kw)
+
+    def write_admin_file(self, name, content):
+        with open(os.path.join(self.workdir, name), 'w') as f:
+            f.write(content)
+
+    def write_ceph_conf(self):
+        self.write_admin_file('ceph.conf', '\n'.join([
+            '[global]',
+            'fsid = 6a0c6f3e-94d6-4dc1-9d2e-8e6bd4e2f6bc',
+            'mon_initial_members = %s' % ', '.join(self.hosts),
+            'mon_host = %s' % ', '.join('127.0.0.1' for _ in self.hosts),
+            'public_network = 127.0.0.0/8',
+            '',
+        ]))
+        self.write_admin_file('ceph.mon.keyring', '[mon.]\nkey = AQ==\n')
+
+    def run(self, *argv):
+        """
+        Run ``ceph-deploy ARGV`` against the simulated hosts and return a
+        report with the wall time of the whole run and, for every host, its
+        wall time (first to last remote operation), round trips and
+        connections opened.
+        """
+        self._counters = {}
+        connection.close_all()
+        # every run adds its own log handlers
+        root_logger = logging.getLogger()
+        handlers = root_logger.handlers[:]
+        original = remoto.Connection
+        remoto.Connection = self.connect
+        original_keys = gpg_keys.cache
+        # keys are "downloaded" on the admin node, never from the internet
+        gpg_keys.cache = gpg_keys.KeyCache(
+            path=os.path.join(self.path, 'gpg-keys'),
+            _urlopen=lambda *a, **kw: StringIO(KEY),
+        )
+        trace.enable(None, subcommand=argv[0])
+        start = time.time()
+        try:
+            with directory(self.workdir):
+                cli._main(args=list(argv))
+            wall = time.time() - start
+            events = trace.events()
+        finally:
+            trace.disable()
+            connection.close_all()
+            remoto.Connection = original
+            gpg_keys.cache = original_keys
+            root_logger.handlers = handlers
+
+        per_host = {}
+        for host in self.hosts:
+            spans = [
+                event for event in events
+                if event.get('args', {}).get('host') == host and event['ph'] == 'X'
+            ]
+            first = min(span['ts'] for span in spans) if spans else 0
+            last = max(span['ts'] + span['dur'] for span in spans) if spans else 0
+            counters = self.counters(host)
+            per_host[host] = {
+                'wall': (last - first) / 1000000.0,
+                'round_trips': counters.round_trips,
+                'connections': counters.connections,
+            }
+        return Report(' '.join(argv), wall, per_host, self.latency, self.command_latency)
+
+
+class Report(object):
+
+    def __init__(self, command, wall, per_host, latency, command_latency):
+        self.command = command
+        self.wall = wall
+        self.per_host = per_host
+        self.latency = latency
+        self.command_latency = command_latency
+
+    def values(self, key):
+        return [host[key] for host in self.per_host.values()]
+
+    def as_dict(self):
+        return {
+            'command': self.command,
+            'hosts': len(self.per_host),
+            'latency': self.latency,
+            'command_latency': self.command_latency,
+            'wall': self.wall,
+            'per_host': self.per_host,
+        }
+
+    def __str__(self):
+        lines = [
+            '%s: %d hosts, %.3fs per round trip, %.3fs per command, %.3fs wall' % (
+                self.command.split()[0],
+                len(self.per_host),
+                self.latency,
+                self.command_latency,
+                self.wall,
+            ),
+            '  %-12s %10s %12s %12s' % ('host', 'wall', 'round trips', 'connections'),
+        ]
+        for host in sorted(self.per_host):
+            stats = self.per_host[host]
+            lines.append('  %-12s %9.3fs %12d %12d' % (
+                host,
+                stats['wall'],
+                stats['round_trips'],
+                stats['connections'],
+            ))
+        return '\n'.join(lines)
+
+    def save(self, path=None):
+        """
+        Print the report, and append it as a JSON line to ``path`` (or
+        ``CEPH_DEPLOY_BENCH_REPORT``) if set.
+        """
+        print('\n%s' % self)
+        path = path or os.environ.get('CEPH_DEPLOY_BENCH_REPORT')
+        if path:
+            with open(path, 'a') as f:
+                f.write(json.dumps(self.as_dict(), sort_keys=True) + '\n')
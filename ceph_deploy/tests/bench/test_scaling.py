@@ -0,0 +1,72 @@
+import os
+
+from ceph_deploy.tests.bench import fake_command
+from ceph_deploy.tests.bench.standin import setting
+
+
+def check(report):
+    """
+    Every host should be reached over a single connection, and take the same
+    number of round trips no matter how many other hosts there are.
+    """
+    report.save()
+    assert report.values('connections') == [1] * len(report.per_host)
+    assert len(set(report.values('round_trips'))) == 1
+
+
+class TestInstall(object):
+
+    def test_install(self, standins):
+        jobs = setting('JOBS', 1)
+        check(standins.run('install', '--jobs', str(jobs), *standins.hosts))
+
+    def test_install_again(self, standins):
+        jobs = setting('JOBS', 1)
+        first = standins.run('install', '--jobs', str(jobs), *standins.hosts)
+        again = standins.run('install', '--jobs', str(jobs), *standins.hosts)
+        check(again)
+        # every host already has the version, and is only checked
+        assert max(again.values('round_trips')) < min(first.values('round_trips'))
+
+
+class TestMonCreateInitial(object):
+
+    def test_mon_create_initial(self, standins):
+        standins.write_ceph_conf()
+        check(standins.run('mon', 'create-initial'))
+        assert os.path.exists(os.path.join(standins.workdir, 'ceph.client.admin.keyring'))
+
+
+class TestGatherkeys(object):
+
+    def test_gatherkeys(self, standins):
+        standins.write_ceph_conf()
+        for host in standins.hosts:
+            fake_command.start_mon(standins.root(host), host)
+        check(standins.run('gatherkeys', *standins.hosts))
+        assert os.path.exists(os.path.join(standins.workdir, 'ceph.bootstrap-osd.keyring'))
+
+
+class TestOsdCreate(object):
+
+    def test_osd_create(self, standins):
+        standins.write_ceph_conf()
+        standins.write_admin_file('ceph.bootstrap-osd.keyring', '[client.bootstrap-osd]\n')
+        disks = setting('DISKS', 2)
+        per_host_jobs = setting('PER_HOST_JOBS', 1)
+        check(standins.run('osd', 'create', '--per-host-jobs', str(per_host_jobs), *[
+            '%s:sd%s' % (host, chr(ord('b') + disk))
+            for host in standins.hosts
+            for disk in range(disks)
+        ]))
+
+
+class TestAdmin(object):
+
+    def test_admin(self, standins):
+        standins.write_ceph_conf()
+        standins.write_admin_file('ceph.client.admin.keyring', '[client.admin]\n')
+        jobs = setting('JOBS', 1)
+        check(standins.run('admin', '--jobs', str(jobs), *standins.hosts))
+        for host in standins.hosts:
+            assert os.path.exists(os.path.join(standins.root(host), 'etc/ceph/ceph.conf'))
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import time
+
+from ceph_deploy.tests.bench.standin import Report, setting
+
+
+# what scripts/ceph-deploy runs
+SCRIPT = 'import sys; from ceph_deploy.cli import main; sys.exit(main())'
+
+
+class StartupReport(Report):
+
+    def __init__(self, command, times):
+        self.command = command
+        self.times = times
+
+    def as_dict(self):
+        return {
+            'command': self.command,
+            'best': min(self.times),
+            'times': self.times,
+        }
+
+    def __str__(self):
+        return 'ceph-deploy %s: %.3fs best of %d runs (%s)' % (
+            self.command,
+            min(self.times),
+            len(self.times),
+            ' '.join('%.3f' % t for t in self.times),
+        )
+
+
+def startup(tmpdir, *argv):
+    """
+    Time ``ceph-deploy <argv>`` in a new interpreter, from the start of the
+    process to its exit, ``CEPH_DEPLOY_BENCH_RUNS`` times after a first run
+    that fills the subcommand help cache.
+    """
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmpdir))
+    command = [sys.executable, '-c', SCRIPT] + list(argv)
+
+    def run():
+        start = time.time()
+        process = subprocess.Popen(
+            command,
+            cwd=str(tmpdir),
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        process.communicate()
+        return time.time() - start
+
+    run()
+    report = StartupReport(
+        ' '.join(argv),
+        [run() for _ in range(setting('RUNS', 5))],
+    )
+    report.save()
+    return min(report.times)
+
+
+class TestStartup(object):
+
+    def test_help(self, tmpdir):
+        assert startup(tmpdir, '--help') < setting('STARTUP_LIMIT', 0.25, float)
+
+    def test_bad_arguments(self, tmpdir):
+        assert startup(tmpdir, '--cluster', '0-bad', 'osd') < setting('STARTUP_LIMIT', 0.25, float)
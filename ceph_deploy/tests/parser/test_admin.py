@@ -30,3 +30,7 @@ class TestParserAdmin(object):
         hostnames = ['host1', 'host2', 'host3']
         args = self.parser.parse_args(['admin'] + hostnames)
         assert args.client == hostnames
+
+    def test_admin_jobs_custom_value(self):
+        args = self.parser.parse_args('admin --jobs 50 host1'.split())
+        assert args.jobs == 50
@@ -59,3 +59,11 @@ class TestParserConfig(object):
         hostnames = ['host1', 'host2', 'host3']
         args = self.parser.parse_args('config pull'.split() + hostnames)
         assert args.client == hostnames
+
+    def test_config_push_jobs_default(self):
+        args = self.parser.parse_args('config push host1'.split())
+        assert args.jobs == 10
+
+    def test_config_pull_jobs_custom_value(self):
+        args = self.parser.parse_args('config pull --jobs 50 host1'.split())
+        assert args.jobs == 50
@@ -137,6 +137,14 @@ class TestParserDisk(object):
         hosts = [x[0] for x in args.disk]
         assert hosts == hostnames
 
+    def test_disk_prepare_per_host_jobs_default(self):
+        args = self.parser.parse_args('disk prepare host1:sdb'.split())
+        assert args.per_host_jobs == 1
+
+    def test_disk_activate_ready_timeout_default(self):
+        args = self.parser.parse_args('disk activate host1:sdb1'.split())
+        assert args.ready_timeout == 120
+
     def test_disk_zap_help(self, capsys):
         with pytest.raises(SystemExit):
             self.parser.parse_args('disk zap --help'.split())
@@ -157,3 +157,55 @@ class TestParserInstall(object):
     def test_install_gpg_url_custom_path(self):
         args = self.parser.parse_args('install --gpg-url https://ceph.com/key host1'.split())
         assert args.gpg_url == "https://ceph.com/key"
+
+    def test_install_jobs_default_is_one(self):
+        args = self.parser.parse_args('install host1'.split())
+        assert args.jobs == 1
+
+    def test_install_jobs_custom_value(self):
+        args = self.parser.parse_args('install --jobs 8 host1 host2'.split())
+        assert args.jobs == 8
+
+    def test_install_jobs_must_be_positive(self, capsys):
+        with pytest.raises(SystemExit):
+            self.parser.parse_args('install --jobs 0 host1'.split())
+        out, err = capsys.readouterr()
+        assert 'must be a positive integer' in err
+
+    def test_install_metadata_max_age_default_is_zero(self):
+        args = self.parser.parse_args('install host1'.split())
+        assert args.metadata_max_age == 0
+
+    def test_install_metadata_max_age_custom_value(self):
+        args = self.parser.parse_args('install --metadata-max-age 3600 host1'.split())
+        assert args.metadata_max_age == 3600
+
+    def test_install_metadata_max_age_must_not_be_negative(self, capsys):
+        with pytest.raises(SystemExit):
+            self.parser.parse_args('install --metadata-max-age -1 host1'.split())
+        out, err = capsys.readouterr()
+        assert 'must be a non-negative integer' in err
+
+    def test_install_reinstall_default_is_false(self):
+        args = self.parser.parse_args('install host1'.split())
+        assert args.reinstall is False
+
+    def test_install_reinstall_true(self):
+        args = self.parser.parse_args('install --reinstall host1'.split())
+        assert args.reinstall is True
+
+    def test_install_mirror_fanout_default_is_zero(self):
+        args = self.parser.parse_args('install host1'.split())
+        assert args.mirror_fanout == 0
+
+    def test_install_mirror_fanout_custom_value(self):
+        args = self.parser.parse_args('install --local-mirror /srv/mirror --mirror-fanout 2 host1'.split())
+        assert args.mirror_fanout == 2
+
+    def test_install_mirror_host_keys_are_checked_by_default(self):
+        args = self.parser.parse_args('install host1'.split())
+        assert args.mirror_skip_host_key_check is False
+
+    def test_install_mirror_skip_host_key_check(self):
+        args = self.parser.parse_args('install --mirror-skip-host-key-check host1'.split())
+        assert args.mirror_skip_host_key_check is True
@@ -5,7 +5,8 @@ from ceph_deploy.cli import get_parser
 
 SUBCMDS_WITH_ARGS = [
     'new', 'install', 'rgw', 'mds', 'mon', 'gatherkeys', 'disk', 'osd',
-    'admin', 'config', 'uninstall', 'purgedata', 'purge', 'pkg', 'calamari'
+    'admin', 'config', 'uninstall', 'purgedata', 'purge', 'pkg', 'calamari',
+    'preflight'
 ]
 SUBCMDS_WITHOUT_ARGS = ['forgetkeys']
 
@@ -107,3 +108,42 @@ class TestParserMain(object):
         assert 'usage: ceph-deploy' in out
         assert 'optional arguments:' in out
         assert 'commands:' in out
+
+    def test_facts_cache_default_is_false(self):
+        args = self.parser.parse_args('forgetkeys'.split())
+        assert not args.facts_cache
+        assert not args.refresh_facts
+
+    def test_facts_cache_true(self):
+        args = self.parser.parse_args('--facts-cache forgetkeys'.split())
+        assert args.facts_cache
+
+    def test_refresh_facts_true(self):
+        args = self.parser.parse_args('--refresh-facts forgetkeys'.split())
+        assert args.refresh_facts
+
+    def test_facts_ttl_default(self):
+        args = self.parser.parse_args('forgetkeys'.split())
+        assert args.facts_ttl == 86400
+
+    def test_facts_ttl_must_be_positive(self, capsys):
+        with pytest.raises(SystemExit):
+            self.parser.parse_args('--facts-ttl 0 forgetkeys'.split())
+        out, err = capsys.readouterr()
+        assert 'argument must be a positive integer' in err
+
+    def test_trace_default_is_none(self):
+        args = self.parser.parse_args('forgetkeys'.split())
+        assert args.trace is None
+
+    def test_trace_file(self):
+        args = self.parser.parse_args('--trace run.json forgetkeys'.split())
+        assert args.trace == 'run.json'
+
+    def test_ssh_multiplex_default_is_false(self):
+        args = self.parser.parse_args('forgetkeys'.split())
+        assert not args.ssh_multiplex
+
+    def test_ssh_multiplex_true(self):
+        args = self.parser.parse_args('--ssh-multiplex forgetkeys'.split())
+        assert args.ssh_multiplex
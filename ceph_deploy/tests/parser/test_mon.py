@@ -52,6 +52,14 @@ class TestParserMON(object):
         args = self.parser.parse_args('mon create-initial --keyrings /tmp/keys'.split())
         assert args.keyrings == "/tmp/keys"
 
+    def test_mon_create_initial_quorum_timeout_default(self):
+        args = self.parser.parse_args('mon create-initial'.split())
+        assert args.quorum_timeout == 120
+
+    def test_mon_create_initial_quorum_timeout_custom(self):
+        args = self.parser.parse_args('mon create-initial --quorum-timeout 30'.split())
+        assert args.quorum_timeout == 30
+
     def test_mon_create_initial_keyrings_host_raises_err(self):
         with pytest.raises(SystemExit):
             self.parser.parse_args('mon create-initial test1'.split())
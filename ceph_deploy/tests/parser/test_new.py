@@ -81,3 +81,11 @@ class TestParserNew(object):
         hostnames = ['test1', 'test2', 'test3']
         args = self.parser.parse_args(['new'] + hostnames)
         assert frozenset(args.mon) == frozenset(hostnames)
+
+    def test_new_jobs_default(self):
+        args = self.parser.parse_args('new test1'.split())
+        assert args.jobs == 10
+
+    def test_new_jobs_custom_value(self):
+        args = self.parser.parse_args('new --jobs 3 test1'.split())
+        assert args.jobs == 3
@@ -199,3 +199,25 @@ class TestParserOSD(object):
         # args.disk is a list of tuples, and tuple[0] is the hostname
         hosts = [x[0] for x in args.disk]
         assert hosts == hostnames
+
+    def test_osd_activate_ready_timeout_default(self):
+        args = self.parser.parse_args('osd activate host1:sdb1'.split())
+        assert args.ready_timeout == 120
+
+    def test_osd_create_ready_timeout_custom(self):
+        args = self.parser.parse_args('osd create --ready-timeout 30 host1:sdb'.split())
+        assert args.ready_timeout == 30
+
+    def test_osd_create_ready_timeout_must_be_positive(self, capsys):
+        with pytest.raises(SystemExit):
+            self.parser.parse_args('osd create --ready-timeout 0 host1:sdb'.split())
+        out, err = capsys.readouterr()
+        assert 'argument must be a positive integer' in err
+
+    def test_osd_create_per_host_jobs_default(self):
+        args = self.parser.parse_args('osd create host1:sdb'.split())
+        assert args.per_host_jobs == 1
+
+    def test_osd_prepare_per_host_jobs_custom(self):
+        args = self.parser.parse_args('osd prepare --per-host-jobs 4 host1:sdb'.split())
+        assert args.per_host_jobs == 4
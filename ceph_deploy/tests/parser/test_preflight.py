@@ -0,0 +1,42 @@
+import pytest
+
+from ceph_deploy.cli import get_parser
+
+
+class TestParserPreflight(object):
+
+    def setup(self):
+        self.parser = get_parser()
+
+    def test_preflight_help(self, capsys):
+        with pytest.raises(SystemExit):
+            self.parser.parse_args('preflight --help'.split())
+        out, err = capsys.readouterr()
+        assert 'usage: ceph-deploy preflight' in out
+        assert 'positional arguments:' in out
+        assert 'optional arguments:' in out
+
+    def test_preflight_host_required(self, capsys):
+        with pytest.raises(SystemExit):
+            self.parser.parse_args('preflight'.split())
+        out, err = capsys.readouterr()
+        assert "error: too few arguments" in err
+
+    def test_preflight_multiple_hosts(self):
+        hostnames = ['host1', 'host2', 'host3']
+        args = self.parser.parse_args(['preflight'] + hostnames)
+        assert args.host == hostnames
+
+    def test_preflight_jobs_default(self):
+        args = self.parser.parse_args('preflight host1'.split())
+        assert args.jobs == 32
+
+    def test_preflight_timeout_custom_value(self):
+        args = self.parser.parse_args('preflight --timeout 3 host1'.split())
+        assert args.timeout == 3
+
+    def test_preflight_timeout_must_be_positive(self, capsys):
+        with pytest.raises(SystemExit):
+            self.parser.parse_args('preflight --timeout 0 host1'.split())
+        out, err = capsys.readouterr()
+        assert 'must be a positive integer' in err
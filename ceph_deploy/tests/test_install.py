@@ -1,6 +1,7 @@
-from mock import Mock
+from mock import Mock, patch
+from pytest import raises
 
-from ceph_deploy import install
+from ceph_deploy import exc, install
 
 
 class TestSanitizeArgs(object):
@@ -111,3 +112,309 @@ class TestDetectComponents(object):
         assert result == sorted([
             'ceph-osd', 'ceph-mds', 'ceph-mon', 'ceph-radosgw'
         ])
+
+
+class TestInstallManyHosts(object):
+
+    def setup(self):
+        self.args = Mock()
+        self.args.repo = False
+        self.args.stable = None
+        self.args.release = 'hammer'
+        self.args.version_kind = 'stable'
+        self.args.local_mirror = None
+        self.args.jobs = 2
+
+    def test_every_host_is_attempted_when_one_fails(self):
+        seen = []
+
+        def install_host(args, hostname, version):
+            seen.append(hostname)
+            if hostname == 'node2':
+                raise RuntimeError('apt-get exploded')
+
+        self.args.host = ['node1', 'node2', 'node3']
+        with patch('ceph_deploy.install.install_host', install_host):
+            with raises(exc.GenericError) as error:
+                install.install(self.args)
+        assert sorted(seen) == ['node1', 'node2', 'node3']
+        assert 'Failed to install on 1 hosts' in str(error.value)
+
+    def test_single_host_error_is_not_wrapped(self):
+        def install_host(args, hostname, version):
+            raise RuntimeError('apt-get exploded')
+
+        self.args.host = ['node1']
+        with patch('ceph_deploy.install.install_host', install_host):
+            with raises(RuntimeError):
+                install.install(self.args)
+
+    def test_requested_version_is_passed_to_hosts(self):
+        install_host = Mock()
+        self.args.host = ['node1', 'node2']
+        with patch('ceph_deploy.install.install_host', install_host):
+            install.install(self.args)
+        assert install_host.call_count == 2
+        assert install_host.call_args[0][2] == 'hammer'
+
+    def test_sysvinit_hosts_with_custom_cluster_name_are_skipped(self):
+        distro = Mock()
+        distro.init = 'sysvinit'
+        self.args.cluster = 'backup'
+        with patch('ceph_deploy.install.hosts.get', Mock(return_value=distro)):
+            install.install_host(self.args, 'node1', 'hammer')
+        assert distro.install.called is False
+        assert distro.conn.exit.called is True
+
+
+class TestExpectedVersion(object):
+
+    def setup(self):
+        self.args = Mock()
+        self.args.version_kind = 'stable'
+        self.args.release = 'hammer'
+        self.args.local_mirror = None
+        self.args.repo_url = None
+        self.args.repo = False
+        self.args.cd_conf = None
+
+    def test_named_release(self):
+        assert install.expected_version(self.args) == '0.94'
+
+    def test_version_number(self):
+        self.args.release = '0.94.2'
+        assert install.expected_version(self.args) == '0.94.2'
+
+    def test_unknown_release(self):
+        self.args.release = 'kraken'
+        assert install.expected_version(self.args) is None
+
+    def test_dev_builds_are_unknown(self):
+        self.args.version_kind = 'dev'
+        assert install.expected_version(self.args) is None
+
+    def test_custom_repos_are_unknown(self):
+        self.args.repo_url = 'http://mirror.example.com/ceph'
+        assert install.expected_version(self.args) is None
+
+    def test_repos_from_cephdeploy_conf_are_unknown(self):
+        self.args.cd_conf = Mock()
+        self.args.cd_conf.has_repos = True
+        self.args.cd_conf.get_repos.return_value = ['hammer']
+        assert install.expected_version(self.args) is None
+
+    def test_unrelated_repos_from_cephdeploy_conf_are_ignored(self):
+        self.args.cd_conf = Mock()
+        self.args.cd_conf.has_repos = True
+        self.args.cd_conf.get_repos.return_value = ['firefly']
+        self.args.cd_conf.get_default_repo.return_value = False
+        assert install.expected_version(self.args) == '0.94'
+
+    def test_repo_only_is_unknown(self):
+        self.args.repo = True
+        assert install.expected_version(self.args) is None
+
+
+class TestInstalledCheck(object):
+
+    def setup(self):
+        self.args = Mock()
+        self.args.repo = False
+        self.args.install_all = False
+        self.args.install_osd = False
+        self.args.install_rgw = False
+        self.args.install_mds = False
+        self.args.install_mon = False
+        self.args.install_common = False
+        self.distro = Mock()
+        self.distro.is_rpm = False
+        self.versions = {}
+
+    def installed_check(self):
+        installed_versions = Mock(return_value=self.versions)
+        with patch('ceph_deploy.install.hosts.get', Mock(return_value=self.distro)):
+            with patch('ceph_deploy.install.pkg_managers.installed_versions', installed_versions):
+                result = install.installed_check(self.args, 'node1', '0.94')
+        return result, installed_versions.call_args[0][1]
+
+    def test_everything_is_checked_by_default(self):
+        self.args.install_all = True
+        result, packages = self.installed_check()
+        assert sorted(packages) == ['ceph', 'ceph-common', 'ceph-mds', 'radosgw']
+
+    def test_rpm_daemons_come_with_ceph(self):
+        self.distro.is_rpm = True
+        self.args.install_all = True
+        result, packages = self.installed_check()
+        assert sorted(packages) == ['ceph', 'ceph-common', 'ceph-radosgw']
+
+    def test_requested_component_is_checked(self):
+        self.args.install_rgw = True
+        self.versions = {'ceph': '0.94.2-1trusty', 'ceph-common': '0.94.2-1trusty'}
+        result, packages = self.installed_check()
+        assert 'radosgw' in packages
+        assert result is False
+
+    def test_requested_components_at_the_version(self):
+        self.args.install_common = True
+        self.versions = {'ceph': '0.94.2-1trusty', 'ceph-common': '0.94.2-1trusty'}
+        result, packages = self.installed_check()
+        assert result is True
+
+
+class TestVersionMatches(object):
+
+    def test_deb_version(self):
+        assert install.version_matches('0.94.2-1trusty', '0.94') is True
+
+    def test_rpm_version(self):
+        assert install.version_matches('0.94.2', '0.94') is True
+
+    def test_exact_version(self):
+        assert install.version_matches('0.94.2', '0.94.2') is True
+
+    def test_other_release(self):
+        assert install.version_matches('0.80.10-1trusty', '0.94') is False
+
+    def test_prefix_is_not_enough(self):
+        assert install.version_matches('0.941', '0.94') is False
+
+    def test_not_installed(self):
+        assert install.version_matches('', '0.94') is False
+
+
+class TestSkipInstalledHosts(object):
+
+    def setup(self):
+        self.args = Mock()
+        self.args.repo = False
+        self.args.stable = None
+        self.args.release = 'hammer'
+        self.args.version_kind = 'stable'
+        self.args.local_mirror = None
+        self.args.repo_url = None
+        self.args.reinstall = False
+        self.args.cd_conf = None
+        self.args.jobs = 1
+        self.args.host = ['node1', 'node2', 'node3']
+
+    def test_only_hosts_without_the_version_are_installed(self):
+        install_host = Mock()
+
+        def installed_check(args, hostname, expected):
+            return hostname == 'node2'
+
+        with patch('ceph_deploy.install.installed_check', installed_check):
+            with patch('ceph_deploy.install.install_host', install_host):
+                install.install(self.args)
+        assert [call[0][1] for call in install_host.call_args_list] == ['node1', 'node3']
+
+    def test_nothing_to_install(self):
+        install_host = Mock()
+        with patch('ceph_deploy.install.installed_check', Mock(return_value=True)):
+            with patch('ceph_deploy.install.install_host', install_host):
+                install.install(self.args)
+        assert install_host.called is False
+
+    def test_hosts_that_cannot_be_checked_are_installed(self):
+        install_host = Mock()
+        with patch('ceph_deploy.install.installed_check', Mock(side_effect=RuntimeError)):
+            with patch('ceph_deploy.install.install_host', install_host):
+                install.install(self.args)
+        assert install_host.call_count == 3
+
+    def test_reinstall_does_not_check(self):
+        installed_check = Mock(return_value=True)
+        install_host = Mock()
+        self.args.reinstall = True
+        with patch('ceph_deploy.install.installed_check', installed_check):
+            with patch('ceph_deploy.install.install_host', install_host):
+                install.install(self.args)
+        assert installed_check.called is False
+        assert install_host.call_count == 3
+
+
+class TestDistributeMirror(object):
+
+    def setup(self):
+        self.args = Mock()
+        self.args.local_mirror = '/srv/mirror'
+        self.args.mirror_fanout = 1
+
+    def test_every_host_gets_the_mirror(self):
+        copies = []
+
+        def copy_mirror(args, source, hostname):
+            copies.append((source, hostname))
+
+        with patch('ceph_deploy.install.copy_mirror', copy_mirror):
+            mirrored = install.distribute_mirror(self.args, ['node1', 'node2', 'node3'])
+        assert mirrored == set(['node1', 'node2', 'node3'])
+        assert sorted(copies) == [(None, 'node1'), (None, 'node2'), ('node1', 'node3')]
+
+    def test_failed_hosts_do_not_pass_it_on(self):
+        def copy_mirror(args, source, hostname):
+            if hostname == 'node1':
+                raise RuntimeError('rsync exploded')
+
+        with patch('ceph_deploy.install.copy_mirror', copy_mirror):
+            mirrored = install.distribute_mirror(self.args, ['node1', 'node2', 'node3'])
+        # node3 was to get it from node1
+        assert mirrored == set(['node2'])
+
+    def copy(self, sudo):
+        conns = {'node1': Mock(sudo=False), 'node2': Mock(sudo=sudo)}
+
+        def get_connection(hostname, username, logger, detect_sudo=True):
+            conns[hostname].detect_sudo = detect_sudo
+            return conns[hostname]
+
+        with patch('ceph_deploy.install.connection.get_connection', get_connection):
+            with patch('ceph_deploy.install.remoto.process.run') as run:
+                install.copy_mirror(self.args, 'node1', 'node2')
+        conn, command = run.call_args[0]
+        assert conn is conns['node1']
+        return conns, command
+
+    def test_host_to_host_copy_uses_sudo_rsync_on_the_target(self):
+        self.args.username = 'ceph'
+        self.args.mirror_skip_host_key_check = False
+        conns, command = self.copy(sudo=True)
+        # the source runs rsync as the connecting user, with its own keys
+        assert conns['node1'].detect_sudo is False
+        assert '--rsync-path=sudo rsync' in command
+        assert command[-1] == 'ceph@node2:/opt/ceph-deploy/repo'
+
+    def test_host_to_host_copy_as_root(self):
+        self.args.username = None
+        self.args.mirror_skip_host_key_check = False
+        conns, command = self.copy(sudo=False)
+        assert not [part for part in command if part.startswith('--rsync-path')]
+        assert command[-1] == 'node2:/opt/ceph-deploy/repo'
+
+    def test_host_keys_are_checked_by_default(self):
+        self.args.username = None
+        self.args.mirror_skip_host_key_check = False
+        conns, command = self.copy(sudo=False)
+        assert 'StrictHostKeyChecking' not in command[command.index('-e') + 1]
+
+    def test_host_key_check_can_be_skipped(self):
+        self.args.username = None
+        self.args.mirror_skip_host_key_check = True
+        conns, command = self.copy(sudo=False)
+        assert 'StrictHostKeyChecking=no' in command[command.index('-e') + 1]
+
+    def test_install_uses_the_fanout(self):
+        self.args.repo = False
+        self.args.stable = None
+        self.args.release = 'hammer'
+        self.args.version_kind = 'stable'
+        self.args.reinstall = True
+        self.args.jobs = 1
+        self.args.host = ['node1', 'node2']
+        distribute_mirror = Mock(return_value=set(['node1']))
+        with patch('ceph_deploy.install.distribute_mirror', distribute_mirror):
+            with patch('ceph_deploy.install.install_host'):
+                install.install(self.args)
+        assert distribute_mirror.call_args[0][1] == ['node1', 'node2']
+        assert self.args.mirrored_hosts == set(['node1'])
@@ -1,3 +1,5 @@
+from io import BytesIO
+
 from mock import patch
 from ceph_deploy.hosts import remotes
 from ceph_deploy.hosts.remotes import platform_information
@@ -83,3 +85,85 @@ class TestPlatformInformation(object):
         assert distro == 'Ubuntu'
         assert release == '12.04'
         assert codename == 'precise'
+
+
+class TestGetFiles(object):
+
+    def test_missing_files_are_none(self, tmpdir):
+        path = str(tmpdir.join('keyring'))
+        tmpdir.join('keyring').write('key')
+        missing = str(tmpdir.join('missing'))
+        result = remotes.get_files([path, missing])
+        assert result == {path: 'key', missing: None}
+
+
+class TestRunBatch(object):
+
+    def test_returns_every_result(self, tmpdir):
+        path = str(tmpdir.join('whoami'))
+        tmpdir.join('whoami').write('3\n')
+        result = remotes.run_batch([('path_exists', (path,)), ('readline', (path,))])
+        assert result == [(True, True), (True, '3')]
+
+    def test_stops_at_the_first_error(self, tmpdir):
+        missing = str(tmpdir.join('missing'))
+        result = remotes.run_batch([('readline', (missing,)), ('path_exists', (missing,))])
+        assert len(result) == 1
+        assert result[0][0] is False
+        assert result[0][1].startswith('IOError: ')
+
+    def test_keeps_going_after_errors(self, tmpdir):
+        missing = str(tmpdir.join('missing'))
+        result = remotes.run_batch(
+            [('readline', (missing,)), ('path_exists', (missing,))],
+            stop_on_error=False,
+        )
+        assert result[0][0] is False
+        assert result[1] == (True, False)
+
+
+class TestOsdInventory(object):
+
+    def make_osd(self, tmpdir, name, **files):
+        osd_dir = tmpdir.mkdir(name)
+        for filename, contents in files.items():
+            osd_dir.join(filename).write(contents)
+        return osd_dir
+
+    def test_missing_osd_path_is_empty(self, tmpdir):
+        assert remotes.osd_inventory(str(tmpdir.join('osd'))) == []
+
+    def test_reads_metadata_files(self, tmpdir):
+        self.make_osd(tmpdir, 'ceph-0', whoami='0\n', magic='ceph osd volume v026\n')
+        record = remotes.osd_inventory(str(tmpdir))[0]
+        assert record['name'] == 'ceph-0'
+        assert record['whoami'] == '0'
+        assert record['magic'] == 'ceph osd volume v026'
+        assert 'active' not in record
+
+    def test_resolves_the_journal(self, tmpdir):
+        osd_dir = self.make_osd(tmpdir, 'ceph-1')
+        tmpdir.join('journal-device').write('')
+        osd_dir.join('journal').mksymlinkto(tmpdir.join('journal-device'))
+        record = remotes.osd_inventory(str(tmpdir))[0]
+        assert record['journal'] == str(tmpdir.join('journal-device'))
+
+    def test_finds_the_backing_device(self, tmpdir):
+        osd_dir = self.make_osd(tmpdir, 'ceph-2')
+        mounts = '/dev/sdb1 %s xfs rw,noatime 0 0\n' % osd_dir.realpath()
+        real_open = open
+
+        def fake_open(path, *a):
+            if path == '/proc/mounts':
+                return BytesIO(mounts)
+            return real_open(path, *a)
+
+        with patch('ceph_deploy.hosts.remotes.open', fake_open, create=True):
+            record = remotes.osd_inventory(str(tmpdir))[0]
+        assert record['device'] == '/dev/sdb1'
+
+    def test_records_are_sorted(self, tmpdir):
+        self.make_osd(tmpdir, 'ceph-2')
+        self.make_osd(tmpdir, 'ceph-10')
+        names = [record['name'] for record in remotes.osd_inventory(str(tmpdir))]
+        assert names == ['ceph-10', 'ceph-2']
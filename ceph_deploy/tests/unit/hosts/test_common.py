@@ -0,0 +1,91 @@
+import hashlib
+
+from mock import Mock, patch
+
+from ceph_deploy.connection import Batch
+from ceph_deploy.hosts import common
+
+
+CONF = '[global]\nfsid = 6a0c6f3e-94d6-4dc1-9d2e-8e6bd4e2f6bc\n'
+
+
+class TestWriteConf(object):
+
+    def setup(self):
+        self.conn = Mock()
+
+    def test_unchanged_conf_is_not_sent(self):
+        self.conn.remote_module.conf_checksum.return_value = hashlib.sha1(CONF).hexdigest()
+        assert common.write_conf(self.conn, 'ceph', CONF, False) is False
+        assert self.conn.remote_module.write_conf.called is False
+
+    def test_changed_conf_is_sent(self):
+        self.conn.remote_module.conf_checksum.return_value = hashlib.sha1('[global]\n').hexdigest()
+        assert common.write_conf(self.conn, 'ceph', CONF, True) is True
+        self.conn.remote_module.write_conf.assert_called_once_with('ceph', CONF, True)
+
+    def test_missing_conf_is_sent(self):
+        self.conn.remote_module.conf_checksum.return_value = None
+        assert common.write_conf(self.conn, 'ceph', CONF, False) is True
+        assert self.conn.remote_module.write_conf.called is True
+
+
+class FakeRemoteModule(object):
+    """
+    Answers batches of remote calls, recording the name of every call in the
+    order they were made.
+    """
+
+    def __init__(self, checksum=None, existing=()):
+        self.checksum = checksum
+        self.existing = existing
+        self.calls = []
+
+    def run_batch(self, calls, stop_on_error):
+        results = []
+        for name, args in calls:
+            self.calls.append(name)
+            if name == 'conf_checksum':
+                results.append((True, self.checksum))
+            elif name == 'path_exists':
+                results.append((True, args[0] in self.existing))
+            else:
+                results.append((True, None))
+        return results
+
+
+class TestMonCreate(object):
+
+    def setup(self):
+        self.distro = Mock()
+        self.distro.init = 'sysvinit'
+        self.distro.conn.batch = lambda: Batch(self.distro.conn)
+        self.args = Mock()
+        self.args.cluster = 'ceph'
+        self.configuration = Mock()
+        self.configuration.render.return_value = CONF
+        self.configuration.checksum.return_value = hashlib.sha1(CONF).hexdigest()
+
+    def mon_create(self, remote_module):
+        self.distro.conn.remote_module = remote_module
+        with patch('ceph_deploy.hosts.common.conf.ceph.load', Mock(return_value=self.configuration)):
+            with patch('ceph_deploy.hosts.common.remoto.process.run'):
+                common.mon_create(self.distro, self.args, 'keyring', 'node1')
+
+    def test_unchanged_conf_is_not_sent(self):
+        remote_module = FakeRemoteModule(checksum=hashlib.sha1(CONF).hexdigest())
+        self.mon_create(remote_module)
+        assert 'write_conf' not in remote_module.calls
+
+    def test_changed_conf_is_sent_before_mkfs(self):
+        remote_module = FakeRemoteModule(checksum=None)
+        self.mon_create(remote_module)
+        assert remote_module.calls.index('write_conf') < remote_module.calls.index('write_monitor_keyring')
+
+    def test_changed_conf_is_sent_to_existing_monitors(self):
+        remote_module = FakeRemoteModule(
+            checksum=None,
+            existing=['/var/lib/ceph/mon/ceph-node1/done'],
+        )
+        self.mon_create(remote_module)
+        assert 'write_conf' in remote_module.calls
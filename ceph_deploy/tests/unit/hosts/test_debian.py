@@ -0,0 +1,32 @@
+import sys
+
+from mock import Mock, patch
+
+import ceph_deploy.hosts.debian.install  # noqa
+
+# the package exports an ``install`` function that hides the module
+install = sys.modules['ceph_deploy.hosts.debian.install']
+
+
+class TestRepoInstall(object):
+
+    def setup(self):
+        self.distro = Mock()
+        self.distro.codename = 'trusty'
+
+    def apt_key_calls(self, gpgkey):
+        with patch.object(install, 'pkg_managers'):
+            with patch.object(install.remoto.process, 'run') as run:
+                install.repo_install(self.distro, 'ceph', 'http://example.com/ceph', gpgkey)
+        return [call[0][1] for call in run.call_args_list if call[0][1][0] == 'apt-key']
+
+    def test_pushed_key_is_added(self):
+        with patch.object(install.gpg_keys, 'push', Mock(return_value='release.asc')):
+            assert self.apt_key_calls('https://example.com/release.asc') == [['apt-key', 'add', 'release.asc']]
+
+    def test_local_key_is_added_from_where_it_is(self):
+        calls = self.apt_key_calls('file:///opt/ceph-deploy/repo/release.asc')
+        assert calls == [['apt-key', 'add', '/opt/ceph-deploy/repo/release.asc']]
+
+    def test_no_key_nothing_is_added(self):
+        assert self.apt_key_calls('') == []
@@ -0,0 +1,125 @@
+import json
+import os
+
+from mock import Mock, patch
+
+from ceph_deploy import hosts
+from ceph_deploy.hosts import facts
+
+
+UBUNTU = dict(
+    distro_name='Ubuntu',
+    release='14.04',
+    codename='trusty',
+    machine_type='x86_64',
+)
+
+
+class FakeTime(object):
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestFactsCache(object):
+
+    def setup(self):
+        self.time = FakeTime()
+
+    def make_cache(self, tmpdir, **kw):
+        path = str(tmpdir.join('facts.json'))
+        return facts.FactsCache(path=path, _time=self.time, **kw)
+
+    def test_empty_cache_has_no_entries(self, tmpdir):
+        cache = self.make_cache(tmpdir)
+        assert cache.get('node1') is None
+
+    def test_stored_facts_are_returned(self, tmpdir):
+        cache = self.make_cache(tmpdir)
+        cache.set('node1', **UBUNTU)
+        assert cache.get('node1') == UBUNTU
+
+    def test_facts_are_persisted(self, tmpdir):
+        self.make_cache(tmpdir).set('node1', **UBUNTU)
+        assert self.make_cache(tmpdir).get('node1') == UBUNTU
+
+    def test_expired_entries_are_ignored(self, tmpdir):
+        cache = self.make_cache(tmpdir, ttl=60)
+        cache.set('node1', **UBUNTU)
+        self.time.now += 61
+        assert cache.get('node1') is None
+
+    def test_refresh_ignores_entries(self, tmpdir):
+        self.make_cache(tmpdir).set('node1', **UBUNTU)
+        cache = self.make_cache(tmpdir, refresh=True)
+        assert cache.get('node1') is None
+
+    def test_unreadable_file_is_ignored(self, tmpdir):
+        tmpdir.join('facts.json').write('{not json')
+        cache = self.make_cache(tmpdir)
+        assert cache.get('node1') is None
+
+    def test_incomplete_entries_are_ignored(self, tmpdir):
+        tmpdir.join('facts.json').write(
+            json.dumps({'node1': {'timestamp': 1000.0, 'release': '14.04'}})
+        )
+        cache = self.make_cache(tmpdir)
+        assert cache.get('node1') is None
+
+    def test_no_temporary_file_is_left_behind(self, tmpdir):
+        self.make_cache(tmpdir).set('node1', **UBUNTU)
+        assert os.listdir(str(tmpdir)) == ['facts.json']
+
+
+class TestConfigure(object):
+
+    def teardown(self):
+        facts.configure()
+
+    def test_disabled_by_default(self):
+        assert facts.configure() is None
+        assert facts.lookup('node1') is None
+
+    def test_refresh_enables_the_cache(self, tmpdir):
+        cache = facts.configure(refresh=True, path=str(tmpdir.join('f.json')))
+        assert cache is not None
+
+
+class TestHostGetWithFacts(object):
+
+    def setup(self):
+        self.conn = Mock()
+        self.conn.remote_module.platform_information = Mock(
+            return_value=('Ubuntu', '14.04', 'trusty'))
+        self.conn.remote_module.machine_type = Mock(return_value='x86_64')
+
+    def teardown(self):
+        facts.configure()
+
+    def get(self, hostname, **kw):
+        with patch('ceph_deploy.hosts.get_connection', Mock(return_value=self.conn)):
+            return hosts.get(hostname, **kw)
+
+    def test_facts_are_detected_without_a_cache(self):
+        self.get('node1')
+        self.get('node1')
+        assert self.conn.remote_module.platform_information.call_count == 2
+
+    def test_cached_facts_skip_detection(self, tmpdir):
+        facts.configure(enabled=True, path=str(tmpdir.join('f.json')))
+        self.get('node1')
+        distro = self.get('node1')
+        assert self.conn.remote_module.platform_information.call_count == 1
+        assert self.conn.remote_module.machine_type.call_count == 1
+        assert distro.codename == 'trusty'
+        assert distro.machine_type == 'x86_64'
+        assert distro.init == 'upstart'
+
+    def test_username_is_part_of_the_key(self, tmpdir):
+        facts.configure(enabled=True, path=str(tmpdir.join('f.json')))
+        self.get('node1')
+        self.get('node1', username='alfredo')
+        assert self.conn.remote_module.platform_information.call_count == 2
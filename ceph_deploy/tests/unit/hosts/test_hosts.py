@@ -370,6 +370,54 @@ class TestHostGet(object):
         assert error.value.__str__() == 'Platform is not supported: Solaris 12 Tijuana'
 
 
+class TestHostGetPerHost(object):
+
+    def make_fake_connection(self, platform_information):
+        conn = Mock()
+        conn.remote_module.platform_information = Mock(
+            return_value=platform_information)
+        conn.remote_module.machine_type = Mock(return_value='x86_64')
+        return conn
+
+    def get(self, hostname, platform_information):
+        conn = self.make_fake_connection(platform_information)
+        with patch('ceph_deploy.hosts.get_connection', Mock(return_value=conn)):
+            return hosts.get(hostname)
+
+    def test_hosts_with_same_distro_do_not_share_state(self):
+        node1 = self.get('node1', ('Ubuntu', '14.04', 'trusty'))
+        node2 = self.get('node2', ('Ubuntu', '12.04', 'precise'))
+        assert node1.conn is not node2.conn
+        assert node1.codename == 'trusty'
+        assert node2.codename == 'precise'
+
+    def test_distro_module_is_not_modified(self):
+        self.get('node1', ('Ubuntu', '14.04', 'trusty'))
+        assert not hasattr(hosts.debian, 'conn')
+        assert not hasattr(hosts.debian, 'codename')
+
+    def test_module_functions_are_reachable(self):
+        distro = self.get('node1', ('Ubuntu', '14.04', 'trusty'))
+        assert distro.install is hosts.debian.install
+        assert distro.mon is hosts.debian.mon
+
+    def test_init_is_chosen_from_host_facts(self):
+        ubuntu = self.get('node1', ('Ubuntu', '14.04', 'trusty'))
+        debian = self.get('node2', ('debian', '7.0', 'wheezy'))
+        assert ubuntu.init == 'upstart'
+        assert debian.init == 'sysvinit'
+
+    def test_unknown_attributes_raise(self):
+        distro = self.get('node1', ('Ubuntu', '14.04', 'trusty'))
+        with raises(AttributeError):
+            distro.not_a_thing
+
+    def test_only_host_facts_can_be_set(self):
+        distro = self.get('node1', ('Ubuntu', '14.04', 'trusty'))
+        with raises(AttributeError):
+            distro.install = Mock()
+
+
 class TestGetDistro(object):
 
     def test_get_debian(self):
@@ -1,3 +1,4 @@
+import time
 from cStringIO import StringIO
 
 from ceph_deploy.hosts import remotes
@@ -14,3 +15,38 @@ class TestObjectGrep(object):
 
     def test_does_not_find_anything(self):
         assert remotes.object_grep('bar', self.file_object) is False
+
+
+class TestRepoFingerprint(object):
+
+    def test_changes_with_the_content(self, tmpdir):
+        pattern = [str(tmpdir.join('*.repo'))]
+        tmpdir.join('ceph.repo').write('[Ceph]\n')
+        before = remotes.repo_fingerprint(pattern)
+        tmpdir.join('ceph.repo').write('[Ceph]\npriority=1\n')
+        assert remotes.repo_fingerprint(pattern) != before
+
+    def test_changes_with_new_files(self, tmpdir):
+        pattern = [str(tmpdir.join('*.repo'))]
+        tmpdir.join('ceph.repo').write('[Ceph]\n')
+        before = remotes.repo_fingerprint(pattern)
+        tmpdir.join('epel.repo').write('[epel]\n')
+        assert remotes.repo_fingerprint(pattern) != before
+
+    def test_stable_when_nothing_changes(self, tmpdir):
+        pattern = [str(tmpdir.join('*.repo'))]
+        tmpdir.join('ceph.repo').write('[Ceph]\n')
+        assert remotes.repo_fingerprint(pattern) == remotes.repo_fingerprint(pattern)
+
+
+class TestMetadataAge(object):
+
+    def test_no_files(self, tmpdir):
+        assert remotes.metadata_age([str(tmpdir.join('missing'))]) is None
+
+    def test_newest_file_wins(self, tmpdir):
+        tmpdir.join('old').write('')
+        tmpdir.join('old').setmtime(time.time() - 7200)
+        tmpdir.join('new').write('')
+        age = remotes.metadata_age([str(tmpdir.join('old')), str(tmpdir.join('new'))])
+        assert 0 <= age < 60
@@ -1,25 +1,22 @@
-from ceph_deploy.hosts import suse 
+from ceph_deploy.hosts import suse
+from ceph_deploy.tests.util import Empty
 
 class TestSuseInit(object):
     def setup(self):
         self.host = suse
 
     def test_choose_init_default(self):
-        self.host.release = None
-        init_type = self.host.choose_init()
+        init_type = self.host.choose_init(Empty(release=None))
         assert init_type == "sysvinit"
         
     def test_choose_init_SLE_11(self):
-        self.host.release = '11'
-        init_type = self.host.choose_init()
+        init_type = self.host.choose_init(Empty(release='11'))
         assert init_type == "sysvinit"
 
     def test_choose_init_SLE_12(self):
-        self.host.release = '12'
-        init_type = self.host.choose_init()
+        init_type = self.host.choose_init(Empty(release='12'))
         assert init_type == "systemd"
 
     def test_choose_init_openSUSE_13_1(self):
-        self.host.release = '13.1'
-        init_type = self.host.choose_init()
+        init_type = self.host.choose_init(Empty(release='13.1'))
         assert init_type == "systemd"
@@ -1,4 +1,11 @@
-from ceph_deploy import cli
+import json
+import os
+import subprocess
+import sys
+
+from mock import patch
+
+from ceph_deploy import cli, osd
 from ceph_deploy.tests import util
 
 
@@ -44,3 +51,136 @@ class TestLogFlags(object):
         cli.log_flags(args, logger=self.logger)
         result = self.logger._output()
         assert ' _private ' not in result
+
+
+class TestSubcommandInfo(object):
+
+    def test_reads_help_and_priority(self):
+        entry_point = util.Empty(module_name='ceph_deploy.osd', attrs=('make',))
+        assert cli.subcommand_info(entry_point) == (osd.make.__doc__, 50)
+
+    def test_default_priority(self):
+        entry_point = util.Empty(module_name='ceph_deploy.pkg', attrs=('make',))
+        assert cli.subcommand_info(entry_point)[1] == 100
+
+    def test_other_decorators_need_loading(self):
+        entry_point = util.Empty(module_name='ceph_deploy.cli', attrs=('_main',))
+        assert cli.subcommand_info(entry_point) is None
+
+    def test_missing_module(self):
+        entry_point = util.Empty(module_name='ceph_deploy.nope', attrs=('make',))
+        assert cli.subcommand_info(entry_point) is None
+
+    def test_missing_function(self):
+        entry_point = util.Empty(module_name='ceph_deploy.osd', attrs=('nope',))
+        assert cli.subcommand_info(entry_point) is None
+
+    def test_decorators_are_read_from_the_parsed_module(self, tmpdir, monkeypatch):
+        tmpdir.join('fancy_subcommand.py').write('\n'.join([
+            '# -*- coding: utf-8 -*-',
+            'from ceph_deploy.cliutil import priority',
+            '',
+            '',
+            '@priority(',
+            '    # split over several lines, with a comment',
+            '    20',
+            ')',
+            'def make(parser):',
+            '    "docs"',
+        ]))
+        monkeypatch.syspath_prepend(str(tmpdir))
+        entry_point = util.Empty(module_name='fancy_subcommand', attrs=('make',))
+        assert cli.subcommand_info(entry_point) == ('docs', 20)
+
+
+class TestInfoCache(object):
+
+    def write_module(self, tmpdir, monkeypatch, doc):
+        tmpdir.join('cached_subcommand.py').write('def make(parser):\n    "%s"\n' % doc)
+        monkeypatch.syspath_prepend(str(tmpdir))
+
+    def test_saved_between_runs(self, tmpdir, monkeypatch):
+        self.write_module(tmpdir, monkeypatch, 'docs')
+        path = str(tmpdir.join('cache', 'subcommands.json'))
+        cache = cli.InfoCache(path)
+        assert cache.functions('cached_subcommand')['make'] == ('docs', 100)
+        cache.save()
+        assert 'cached_subcommand' in json.load(open(path))
+
+        with patch('ceph_deploy.cli.ast.parse') as parse:
+            functions = cli.InfoCache(path).functions('cached_subcommand')
+        assert not parse.called
+        assert functions['make'] == ['docs', 100]
+
+    def test_changed_module_is_parsed_again(self, tmpdir, monkeypatch):
+        self.write_module(tmpdir, monkeypatch, 'docs')
+        path = str(tmpdir.join('subcommands.json'))
+        cache = cli.InfoCache(path)
+        cache.functions('cached_subcommand')
+        cache.save()
+
+        self.write_module(tmpdir, monkeypatch, 'new docs')
+        functions = cli.InfoCache(path).functions('cached_subcommand')
+        assert functions['make'] == ('new docs', 100)
+
+    def test_corrupt_cache_is_ignored(self, tmpdir, monkeypatch):
+        self.write_module(tmpdir, monkeypatch, 'docs')
+        path = tmpdir.join('subcommands.json')
+        path.write('{not json')
+        functions = cli.InfoCache(str(path)).functions('cached_subcommand')
+        assert functions['make'] == ('docs', 100)
+
+    def test_unwritable_cache_is_not_an_error(self, tmpdir, monkeypatch):
+        self.write_module(tmpdir, monkeypatch, 'docs')
+        tmpdir.join('file').write('')
+        path = str(tmpdir.join('file', 'subcommands.json'))
+        cache = cli.InfoCache(path)
+        cache.functions('cached_subcommand')
+        cache.save()
+        assert not os.path.exists(path)
+
+
+class TestLazySubcommands(object):
+
+    # modules that should not be imported just to show the help or to
+    # complain about the arguments
+    heavy = ['ceph_deploy.osd', 'ceph_deploy.install', 'ceph_deploy.connection', 'execnet']
+
+    def imported(self, *argv):
+        script = '; '.join([
+            'import sys',
+            'from ceph_deploy import cli',
+            'exec "try: cli._main()\\nexcept SystemExit: pass"',
+            'print " ".join(m for m in %r if m in sys.modules)' % self.heavy,
+        ])
+        process = subprocess.Popen(
+            [sys.executable, '-c', script] + list(argv),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        out, err = process.communicate()
+        return out.splitlines()[-1].split()
+
+    def test_help_does_not_import_subcommands(self):
+        assert self.imported('--help') == []
+
+    def test_bad_arguments_do_not_import_subcommands(self):
+        assert self.imported('--cluster', '0-bad', 'osd') == []
+
+    def test_entry_points_are_found_without_pkg_resources(self):
+        if [p for p in sys.path if p.endswith('.egg') and os.path.isfile(p)]:
+            # zipped eggs are read with pkg_resources
+            return
+        self.heavy = self.heavy + ['pkg_resources']
+        assert self.imported('--help') == []
+
+    def test_only_the_subcommand_used_is_imported(self):
+        imported = self.imported('osd', '--help')
+        assert 'ceph_deploy.osd' in imported
+        assert 'ceph_deploy.install' not in imported
+
+    def test_subcommand_arguments_are_added_when_used(self):
+        parser = cli.get_parser()
+        args = parser.parse_args('osd list node1'.split())
+        assert args.func.__name__ == 'osd'
+        assert args.subcommand == 'list'
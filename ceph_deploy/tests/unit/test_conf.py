@@ -1,3 +1,4 @@
+import hashlib
 from cStringIO import StringIO
 from textwrap import dedent
 import pytest
@@ -190,3 +191,68 @@ class TestSetOverrides(object):
         self.conf.items = Mock(return_value=(('bar', value),))
         arg_obj = conf.cephdeploy.set_overrides(self.args, self.conf)
         assert arg_obj.bar is False
+
+
+class TestCephConfLoad(object):
+
+    def setup(self):
+        self.args = Mock()
+        self.args.cluster = 'ceph'
+
+    def test_parsed_once(self, tmpdir):
+        path = tmpdir.join('ceph.conf')
+        path.write('[global]\nfsid = 1234\n')
+        self.args.ceph_conf = str(path)
+        assert conf.ceph.load(self.args) is conf.ceph.load(self.args)
+
+    def test_parsed_again_when_modified(self, tmpdir):
+        path = tmpdir.join('ceph.conf')
+        path.write('[global]\nfsid = 1234\n')
+        self.args.ceph_conf = str(path)
+        first = conf.ceph.load(self.args)
+        path.write('[global]\nfsid = 5678\n')
+        path.setmtime(path.mtime() + 10)
+        second = conf.ceph.load(self.args)
+        assert second is not first
+        assert second.get('global', 'fsid') == '5678'
+
+    def test_missing_file(self, tmpdir):
+        self.args.ceph_conf = str(tmpdir.join('ceph.conf'))
+        with pytest.raises(conf.ceph.exc.ConfigError):
+            conf.ceph.load(self.args)
+
+
+class TestCephConfRender(object):
+
+    def setup(self):
+        self.cfg = conf.ceph.parse(StringIO('[global]\nfsid = 1234\n'))
+
+    def test_render_is_what_write_writes(self):
+        data = StringIO()
+        self.cfg.write(data)
+        assert self.cfg.render() == data.getvalue()
+
+    def test_render_is_kept(self):
+        assert self.cfg.render() is self.cfg.render()
+
+    def test_changes_are_rendered(self):
+        first = self.cfg.render()
+        self.cfg.set('global', 'mon host', '10.0.0.1')
+        assert self.cfg.render() != first
+        assert 'mon_host = 10.0.0.1' in self.cfg.render()
+
+    def test_checksum_follows_the_content(self):
+        first = self.cfg.checksum()
+        self.cfg.add_section('mon')
+        assert self.cfg.checksum() != first
+
+    def test_checksum_is_kept(self):
+        first = self.cfg.checksum()
+        with patch('ceph_deploy.conf.ceph.hashlib.sha1') as sha1:
+            assert self.cfg.checksum() == first
+        assert not sha1.called
+
+    def test_checksum_is_dropped_with_the_rendered_copy(self):
+        self.cfg.checksum()
+        self.cfg.remove_option('global', 'fsid')
+        assert self.cfg.checksum() == hashlib.sha1(self.cfg.render()).hexdigest()
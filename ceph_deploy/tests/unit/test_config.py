@@ -0,0 +1,101 @@
+import hashlib
+
+from mock import Mock, patch
+from pytest import raises
+
+from ceph_deploy import config, exc
+from ceph_deploy.tests.directory import directory
+
+
+CONF = '[global]\nfsid = 6a0c6f3e-94d6-4dc1-9d2e-8e6bd4e2f6bc\n'
+OTHER = '[global]\nfsid = 00000000-0000-0000-0000-000000000000\n'
+
+
+def make_distro(content):
+    distro = Mock()
+    checksum = hashlib.sha1(content).hexdigest() if content else None
+    distro.conn.remote_module.conf_checksum.return_value = checksum
+    distro.conn.remote_module.get_file.return_value = content
+    return distro
+
+
+class TestConfigPush(object):
+
+    def setup(self):
+        self.args = Mock()
+        self.args.cluster = 'ceph'
+        self.args.username = None
+        self.args.overwrite_conf = False
+        self.args.jobs = 4
+
+    def test_only_changed_hosts_are_written(self, tmpdir):
+        tmpdir.join('ceph.conf').write(CONF)
+        self.args.ceph_conf = str(tmpdir.join('ceph.conf'))
+        self.args.client = ['node1', 'node2']
+        distros = {'node1': make_distro(CONF), 'node2': make_distro(OTHER)}
+        with patch('ceph_deploy.config.hosts.get', lambda hostname, **kw: distros[hostname]):
+            config.config_push(self.args)
+        assert distros['node1'].conn.remote_module.write_conf.called is False
+        assert distros['node2'].conn.remote_module.write_conf.called is True
+
+    def test_every_host_is_attempted_when_one_fails(self, tmpdir):
+        tmpdir.join('ceph.conf').write(CONF)
+        self.args.ceph_conf = str(tmpdir.join('ceph.conf'))
+        self.args.client = ['node1', 'node2', 'node3']
+        distros = dict((host, make_distro(None)) for host in self.args.client)
+        distros['node2'].conn.remote_module.write_conf.side_effect = RuntimeError('read only')
+        with patch('ceph_deploy.config.hosts.get', lambda hostname, **kw: distros[hostname]):
+            with raises(exc.GenericError) as error:
+                config.config_push(self.args)
+        assert 'Failed to config 1 hosts' in str(error.value)
+        assert distros['node3'].conn.remote_module.write_conf.called is True
+
+
+class TestConfigPull(object):
+
+    def setup(self):
+        self.args = Mock()
+        self.args.cluster = 'ceph'
+        self.args.username = None
+        self.args.overwrite_conf = False
+        self.args.jobs = 4
+
+    def test_pulls_from_the_first_host_that_has_it(self, tmpdir):
+        self.args.client = ['node1', 'node2']
+        distros = {'node1': make_distro(None), 'node2': make_distro(CONF)}
+        with patch('ceph_deploy.config.hosts.get', lambda hostname, **kw: distros[hostname]):
+            with directory(str(tmpdir)):
+                config.config_pull(self.args)
+        assert tmpdir.join('ceph.conf').read() == CONF
+
+    def test_differing_hosts_are_reported(self, tmpdir):
+        self.args.client = ['node1', 'node2', 'node3']
+        distros = {
+            'node1': make_distro(CONF),
+            'node2': make_distro(CONF),
+            'node3': make_distro(OTHER),
+        }
+        with patch('ceph_deploy.config.hosts.get', lambda hostname, **kw: distros[hostname]):
+            with patch('ceph_deploy.config.LOG') as log:
+                with directory(str(tmpdir)):
+                    config.config_pull(self.args)
+        warnings = ' '.join(str(call[0]) for call in log.warning.call_args_list)
+        assert 'differs between hosts' in warnings
+        assert 'node3' in warnings
+
+    def test_no_host_has_it(self, tmpdir):
+        self.args.client = ['node1', 'node2']
+        with patch('ceph_deploy.config.hosts.get', lambda hostname, **kw: make_distro(None)):
+            with directory(str(tmpdir)):
+                with raises(exc.GenericError) as error:
+                    config.config_pull(self.args)
+        assert 'Failed to fetch config from 2 hosts' in str(error.value)
+
+    def test_local_file_is_not_overwritten(self, tmpdir):
+        tmpdir.join('ceph.conf').write(OTHER)
+        self.args.client = ['node1']
+        with patch('ceph_deploy.config.hosts.get', lambda hostname, **kw: make_distro(CONF)):
+            with directory(str(tmpdir)):
+                with raises(exc.GenericError):
+                    config.config_pull(self.args)
+        assert tmpdir.join('ceph.conf').read() == OTHER
@@ -0,0 +1,263 @@
+import os
+import time
+
+from mock import Mock, patch
+from pytest import raises
+
+from ceph_deploy import connection, hosts
+from ceph_deploy.hosts import remotes
+
+
+class FakeModule(object):
+
+    def ping(self):
+        return 'pong'
+
+
+class TestGetConnection(object):
+
+    def setup(self):
+        connection.close_all()
+        self.logger = Mock()
+        self.patcher = patch('ceph_deploy.connection.remoto.Connection')
+        self.remoto_connection = self.patcher.start()
+        self.remoto_connection.side_effect = lambda *a, **kw: Mock()
+
+    def teardown(self):
+        connection.close_all()
+        self.patcher.stop()
+
+    def test_reuses_connection_for_same_host(self):
+        first = connection.get_connection('node1', None, self.logger)
+        second = connection.get_connection('node1', None, self.logger)
+        assert self.remoto_connection.call_count == 1
+        assert first.gateway is second.gateway
+
+    def test_new_connection_for_other_host(self):
+        connection.get_connection('node1', None, self.logger)
+        connection.get_connection('node2', None, self.logger)
+        assert self.remoto_connection.call_count == 2
+
+    def test_username_is_part_of_the_key(self):
+        connection.get_connection('node1', None, self.logger)
+        connection.get_connection('node1', 'alfredo', self.logger)
+        assert self.remoto_connection.call_count == 2
+
+    def test_exit_does_not_close(self):
+        conn = connection.get_connection('node1', None, self.logger)
+        conn.exit()
+        assert conn.gateway.exit.called is False
+
+    def test_exit_only_releases_once(self):
+        connection.get_connection('node1', None, self.logger)
+        conn = connection.get_connection('node1', None, self.logger)
+        conn.exit()
+        conn.exit()
+        assert connection._pool[('node1', True)].refs == 1
+
+    def test_close_all_closes_connections(self):
+        conn = connection.get_connection('node1', None, self.logger)
+        remoto_conn = conn._entry.conn
+        connection.close_all()
+        assert remoto_conn.exit.called is True
+        assert connection._pool == {}
+
+    def test_reconnects_when_gateway_died(self):
+        conn = connection.get_connection('node1', None, self.logger)
+        conn.gateway.hasreceiver.return_value = False
+        connection.get_connection('node1', None, self.logger)
+        assert self.remoto_connection.call_count == 2
+
+    def test_handle_uses_its_own_logger(self):
+        other = Mock()
+        connection.get_connection('node1', None, self.logger)
+        conn = connection.get_connection('node1', None, other)
+        assert conn.logger is other
+
+    def test_connection_errors_are_runtime_errors(self):
+        self.remoto_connection.side_effect = IOError('no route to host')
+        with raises(RuntimeError) as error:
+            connection.get_connection('node1', None, self.logger)
+        assert 'no route to host' in str(error)
+
+
+class TestImportModule(object):
+
+    def setup(self):
+        connection.close_all()
+        self.patcher = patch('ceph_deploy.connection.remoto.Connection')
+        self.remoto_connection = self.patcher.start()
+        self.remoto_connection.side_effect = lambda *a, **kw: Mock()
+
+    def teardown(self):
+        connection.close_all()
+        self.patcher.stop()
+
+    def test_module_is_imported_once_per_host(self):
+        module = FakeModule()
+        first = connection.get_connection('node1', None, Mock())
+        first.import_module(module)
+        second = connection.get_connection('node1', None, Mock())
+        second.import_module(module)
+        assert first._entry.conn.import_module.call_count == 1
+
+    def test_module_is_imported_again_once_its_channel_closed(self):
+        module = FakeModule()
+        first = connection.get_connection('node1', None, Mock())
+        first.import_module(module)
+        first._entry.conn.remote_module.channel.isclosed.return_value = True
+        second = connection.get_connection('node1', None, Mock())
+        second.import_module(module)
+        assert second._entry.conn.import_module.call_count == 1
+        assert second._entry is not first._entry
+
+    def test_remote_module_calls_go_through(self):
+        conn = connection.get_connection('node1', None, Mock())
+        conn._entry.conn.remote_module = FakeModule()
+        assert conn.remote_module.ping() == 'pong'
+
+    def test_no_remote_module(self):
+        conn = connection.get_connection('node1', None, Mock())
+        conn._entry.conn.remote_module = None
+        assert conn.remote_module is None
+
+
+class TestRemoteErrors(object):
+
+    # a real local connection, the remote end is this same host
+    facts = {
+        'distro_name': 'Ubuntu',
+        'release': '14.04',
+        'codename': 'trusty',
+        'machine_type': 'x86_64',
+    }
+
+    def setup(self):
+        connection.close_all()
+
+    def teardown(self):
+        connection.close_all()
+
+    def test_hosts_get_after_a_remote_error(self, tmpdir):
+        with patch('ceph_deploy.hosts.facts.lookup', Mock(return_value=self.facts)):
+            distro = hosts.get('localhost')
+            with raises(RuntimeError):
+                distro.conn.remote_module.readline(str(tmpdir.join('missing')))
+            distro.conn.exit()
+            distro = hosts.get('localhost')
+        assert distro.conn.remote_module.path_exists(str(tmpdir)) is True
+
+
+class TestMultiplexing(object):
+
+    def setup(self):
+        connection.close_all()
+
+    def teardown(self):
+        connection.close_all()
+
+    def test_no_ssh_options_by_default(self):
+        assert connection.ssh_options() == []
+
+    def test_ssh_options_use_the_control_dir(self):
+        control_dir = connection.enable_multiplexing()
+        options = ' '.join(connection.ssh_options())
+        assert 'ControlMaster=auto' in options
+        assert 'ControlPath=%s/' % control_dir in options
+
+    def test_close_all_removes_the_control_dir(self):
+        control_dir = connection.enable_multiplexing()
+        connection.close_all()
+        assert not os.path.exists(control_dir)
+        assert connection.ssh_options() == []
+
+    def test_ssh_connection_string_uses_the_master(self):
+        connection.enable_multiplexing()
+        conn = connection.MultiplexedConnection('node1', eager=False)
+        spec = conn._make_connection_string('node1', _needs_ssh=lambda h: True)
+        assert spec.startswith('ssh=-o ControlMaster=auto')
+        assert spec.endswith(' node1//python=python')
+
+    def test_local_connection_string_is_unchanged(self):
+        connection.enable_multiplexing()
+        conn = connection.MultiplexedConnection('node1', eager=False)
+        spec = conn._make_connection_string('node1', _needs_ssh=lambda h: False)
+        assert spec == 'popen//python=python'
+
+    def test_get_connection_is_multiplexed_when_enabled(self):
+        connection.enable_multiplexing()
+        with patch('ceph_deploy.connection.MultiplexedConnection') as multiplexed:
+            connection.get_connection('node1', None, Mock())
+        assert multiplexed.called is True
+
+    def test_start_masters_does_nothing_when_disabled(self):
+        with patch('ceph_deploy.connection.subprocess.Popen') as popen:
+            connection.start_masters(['node1', 'node2'])
+        assert popen.called is False
+
+    def test_start_masters_once_per_host(self):
+        connection.enable_multiplexing()
+        with patch('ceph_deploy.connection.remoto.connection.needs_ssh', Mock(return_value=True)):
+            with patch('ceph_deploy.connection.subprocess.Popen') as popen:
+                connection.start_masters(['node1', 'node2', 'node1'], username='ceph')
+                started = sorted(call[0][0][-2] for call in popen.call_args_list)
+                assert started == ['ceph@node1', 'ceph@node2']
+
+    def test_start_masters_does_not_wait_for_the_master(self, tmpdir, monkeypatch):
+        # an ssh that leaves a "master" in the background holding on to the
+        # output it inherited, like ControlPersist does
+        ssh = tmpdir.join('ssh')
+        ssh.write('#!/bin/sh\nfor last; do :; done\n[ "$last" = true ] && sleep 5 &\nexit 0\n')
+        ssh.chmod(0755)
+        monkeypatch.setenv('PATH', '%s:%s' % (tmpdir, os.environ['PATH']))
+        connection.enable_multiplexing()
+        start = time.time()
+        with patch('ceph_deploy.connection.remoto.connection.needs_ssh', Mock(return_value=True)):
+            connection.start_masters(['node1', 'node2'])
+        assert time.time() - start < 3
+
+
+class TestBatch(object):
+
+    def setup(self):
+        self.conn = Mock()
+        # run the batch locally as the remote end would
+        self.conn.remote_module.run_batch = remotes.run_batch
+
+    def test_runs_all_calls_in_one_go(self, tmpdir):
+        tmpdir.join('whoami').write('0\n')
+        path = str(tmpdir.join('whoami'))
+        batch = connection.Batch(self.conn)
+        batch.path_exists(path)
+        batch.readline(path)
+        assert batch.run() == [True, '0']
+
+    def test_calls_are_cleared_after_running(self):
+        batch = connection.Batch(self.conn)
+        batch.path_exists('/')
+        batch.run()
+        assert batch.run() == []
+
+    def test_raises_the_first_error(self, tmpdir):
+        batch = connection.Batch(self.conn)
+        batch.readline(str(tmpdir.join('missing')))
+        with raises(RuntimeError) as error:
+            batch.run()
+        assert 'IOError' in str(error.value)
+
+    def test_errors_are_returned_in_place(self, tmpdir):
+        batch = connection.Batch(self.conn, stop_on_error=False)
+        batch.readline(str(tmpdir.join('missing')))
+        batch.path_exists(str(tmpdir))
+        missing, exists = batch.run()
+        assert isinstance(missing, RuntimeError)
+        assert exists is True
+
+    def test_handle_returns_a_batch(self):
+        connection.close_all()
+        with patch('ceph_deploy.connection.remoto.Connection'):
+            conn = connection.get_connection('node1', None, Mock())
+            batch = conn.batch(stop_on_error=False)
+        connection.close_all()
+        assert isinstance(batch, connection.Batch)
+        assert batch.stop_on_error is False
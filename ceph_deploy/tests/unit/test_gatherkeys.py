@@ -0,0 +1,173 @@
+import time
+
+from mock import Mock, patch
+from pytest import raises
+
+from ceph_deploy import exc, gatherkeys
+from ceph_deploy.tests.util import Empty
+
+
+ALL_KEYS = {
+    '/etc/ceph/ceph.client.admin.keyring': 'admin',
+    '/var/lib/ceph/mon/ceph-{hostname}/keyring': 'mon',
+    '/var/lib/ceph/bootstrap-osd/ceph.keyring': 'osd',
+    '/var/lib/ceph/bootstrap-mds/ceph.keyring': 'mds',
+    '/var/lib/ceph/bootstrap-rgw/ceph.keyring': 'rgw',
+}
+
+
+def make_fake_get(keys_per_host):
+    """
+    Return a fake ``hosts.get`` where every host has the keys in
+    ``keys_per_host``, keyed by remote path (``{hostname}`` is expanded).
+    """
+    calls = []
+
+    def get(hostname, username=None):
+        distro = Mock()
+        keys = dict(
+            (path.format(hostname=hostname), key)
+            for path, key in keys_per_host.get(hostname, {}).items()
+        )
+
+        def get_files(paths):
+            calls.append((hostname, sorted(paths)))
+            return dict((path, keys.get(path)) for path in paths)
+        distro.conn.remote_module.get_files = get_files
+        return distro
+    get.calls = calls
+    return get
+
+
+class TestGatherkeys(object):
+
+    def setup(self):
+        self.args = Empty(cluster='ceph', username=None, mon=['mon1', 'mon2'])
+
+    def gather(self, keys_per_host):
+        fake_get = make_fake_get(keys_per_host)
+        with patch('ceph_deploy.gatherkeys.hosts.get', fake_get):
+            gatherkeys.gatherkeys(self.args)
+        return fake_get
+
+    def test_keys_are_written(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        self.gather({'mon1': ALL_KEYS, 'mon2': ALL_KEYS})
+        assert tmpdir.join('ceph.client.admin.keyring').read() == 'admin'
+        assert tmpdir.join('ceph.mon.keyring').read() == 'mon'
+        assert tmpdir.join('ceph.bootstrap-osd.keyring').read() == 'osd'
+        assert tmpdir.join('ceph.bootstrap-mds.keyring').read() == 'mds'
+        assert tmpdir.join('ceph.bootstrap-rgw.keyring').read() == 'rgw'
+
+    def test_one_call_per_monitor(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        fake_get = self.gather({'mon1': ALL_KEYS, 'mon2': ALL_KEYS})
+        assert len(fake_get.calls) <= 2
+        hostname, paths = fake_get.calls[0]
+        assert len(paths) == 5
+
+    def test_mon_keyring_path_is_per_host(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        self.args.mon = ['mon1']
+        fake_get = self.gather({'mon1': ALL_KEYS})
+        assert '/var/lib/ceph/mon/ceph-mon1/keyring' in fake_get.calls[0][1]
+
+    def test_existing_keys_are_not_fetched(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        tmpdir.join('ceph.client.admin.keyring').write('local admin')
+        fake_get = self.gather({'mon1': ALL_KEYS, 'mon2': ALL_KEYS})
+        assert tmpdir.join('ceph.client.admin.keyring').read() == 'local admin'
+        for hostname, paths in fake_get.calls:
+            assert '/etc/ceph/ceph.client.admin.keyring' not in paths
+
+    def test_nothing_to_fetch_does_not_connect(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        for name in ['client.admin', 'mon', 'bootstrap-osd', 'bootstrap-mds', 'bootstrap-rgw']:
+            tmpdir.join('ceph.%s.keyring' % name).write('')
+        fake_get = self.gather({})
+        assert fake_get.calls == []
+
+    def test_keys_are_combined_from_several_monitors(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        mon1 = dict(ALL_KEYS)
+        mon1.pop('/var/lib/ceph/bootstrap-osd/ceph.keyring')
+        mon2 = {'/var/lib/ceph/bootstrap-osd/ceph.keyring': 'osd from mon2'}
+        self.gather({'mon1': mon1, 'mon2': mon2})
+        assert tmpdir.join('ceph.client.admin.keyring').read() == 'admin'
+        assert tmpdir.join('ceph.bootstrap-osd.keyring').read() == 'osd from mon2'
+
+    def test_optional_keys_come_from_other_monitors(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        mon1 = dict(ALL_KEYS)
+        mon1.pop('/var/lib/ceph/bootstrap-rgw/ceph.keyring')
+        mon2 = dict(ALL_KEYS)
+        mon2['/etc/ceph/ceph.client.admin.keyring'] = 'admin from mon2'
+        mon2['/var/lib/ceph/bootstrap-rgw/ceph.keyring'] = 'rgw from mon2'
+        fake_get = make_fake_get({'mon1': mon1, 'mon2': mon2})
+
+        def get(hostname, username=None):
+            if hostname == 'mon2':
+                # mon1 is complete and answers first
+                time.sleep(0.1)
+            return fake_get(hostname, username)
+
+        with patch('ceph_deploy.gatherkeys.hosts.get', get):
+            gatherkeys.gatherkeys(self.args)
+        assert tmpdir.join('ceph.client.admin.keyring').read() == 'admin'
+        assert tmpdir.join('ceph.bootstrap-rgw.keyring').read() == 'rgw from mon2'
+
+    def test_slower_monitors_are_closed_before_returning(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        fake_get = make_fake_get({'mon1': ALL_KEYS, 'mon2': ALL_KEYS})
+        connections = {}
+
+        def get(hostname, username=None):
+            if hostname == 'mon2':
+                # mon1 has every key and answers first
+                time.sleep(0.1)
+            distro = fake_get(hostname, username)
+            connections[hostname] = distro.conn
+            return distro
+
+        with patch('ceph_deploy.gatherkeys.hosts.get', get):
+            gatherkeys.gatherkeys(self.args)
+        assert sorted(connections) == ['mon1', 'mon2']
+        assert connections['mon2'].exit.called
+
+    def test_complete_monitor_keys_win(self):
+        mon1 = {'admin': 'admin from mon1', 'osd': 'osd from mon1'}
+        mon2 = {'admin': 'admin from mon2', 'rgw': 'rgw from mon2'}
+        keys = gatherkeys.combine({'mon1': mon1, 'mon2': mon2}, ['mon2', 'mon1'], 'mon1')
+        assert keys == {
+            'admin': 'admin from mon1',
+            'osd': 'osd from mon1',
+            'rgw': 'rgw from mon2',
+        }
+
+    def test_missing_required_key_raises(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        keys = dict(ALL_KEYS)
+        keys.pop('/var/lib/ceph/bootstrap-mds/ceph.keyring')
+        with raises(exc.KeyNotFoundError) as error:
+            self.gather({'mon1': keys, 'mon2': keys})
+        assert 'bootstrap-mds' in str(error.value)
+
+    def test_missing_rgw_key_only_warns(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        keys = dict(ALL_KEYS)
+        keys.pop('/var/lib/ceph/bootstrap-rgw/ceph.keyring')
+        self.gather({'mon1': keys, 'mon2': keys})
+        assert not tmpdir.join('ceph.bootstrap-rgw.keyring').check()
+
+    def test_unreachable_monitor_is_skipped(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(str(tmpdir))
+        fake_get = make_fake_get({'mon2': ALL_KEYS})
+
+        def get(hostname, username=None):
+            if hostname == 'mon1':
+                raise RuntimeError('connecting to host: mon1 failed')
+            return fake_get(hostname, username)
+
+        with patch('ceph_deploy.gatherkeys.hosts.get', get):
+            gatherkeys.gatherkeys(self.args)
+        assert tmpdir.join('ceph.client.admin.keyring').read() == 'admin'
@@ -223,3 +223,58 @@ class TestConcatenateKeyrings(object):
 
         with py.test.raises(RuntimeError):
             mon.concatenate_keyrings(self.args)
+
+
+class TestWaitForQuorum(object):
+
+    def setup(self):
+        self.args = Mock(username=None, cluster='ceph')
+        self.patches = [
+            patch('ceph_deploy.mon.get_connection'),
+            patch('ceph_deploy.util.backoff.time.sleep'),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def teardown(self):
+        for p in self.patches:
+            p.stop()
+
+    def wait(self, states, members, timeout=60):
+        """
+        ``states`` maps each host to the list of states its monitor reports
+        on every check, the last one is repeated.
+        """
+        def status_check(conn, logger, host, args):
+            host_states = states[host]
+            state = host_states.pop(0) if len(host_states) > 1 else host_states[0]
+            return {'state': state}
+
+        with patch('ceph_deploy.mon.mon_status_check', status_check):
+            return mon.wait_for_quorum(self.args, members, timeout)
+
+    def test_all_monitors_reach_quorum(self):
+        states = {
+            'mon1': ['leader'],
+            'mon2': ['probing', 'electing', 'peon'],
+            'mon3': ['peon'],
+        }
+        result = self.wait(states, ['mon1', 'mon2', 'mon3'])
+        assert result == set(['mon1', 'mon2', 'mon3'])
+
+    def test_monitor_out_of_quorum_is_left_out(self):
+        states = {'mon1': ['leader'], 'mon2': ['probing']}
+        with patch('ceph_deploy.util.backoff.time.time', Mock(side_effect=range(0, 1000, 10))):
+            result = self.wait(states, ['mon1', 'mon2'], timeout=30)
+        assert result == set(['mon1'])
+
+    def test_failing_monitor_is_left_out(self):
+        def get_connection(host, **kw):
+            if host == 'mon2':
+                raise RuntimeError('connecting to host: mon2 failed')
+            return Mock()
+
+        states = {'mon1': ['leader']}
+        with patch('ceph_deploy.mon.get_connection', get_connection):
+            result = self.wait(states, ['mon1', 'mon2'])
+        assert result == set(['mon1'])
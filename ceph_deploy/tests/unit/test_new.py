@@ -1,5 +1,11 @@
-from ceph_deploy import new
+import time
+
+from mock import Mock, patch
+
+from ceph_deploy import conf, exc, new
 from ceph_deploy.tests import util
+from ceph_deploy.tests.directory import directory
+from ceph_deploy.util import net
 import pytest
 
 
@@ -26,3 +32,65 @@ class TestValidateHostIp(object):
         subnets = ["10.0.0.1/16", "10.1.1.1/16"]
         with pytest.raises(RuntimeError):
             new.validate_host_ip(ips, subnets)
+
+
+class TestNewProbesConcurrently(object):
+
+    def setup(self):
+        net._addresses.clear()
+        self.args = Mock()
+        self.args.ceph_conf = None
+        self.args.cluster = 'ceph'
+        self.args.fsid = None
+        self.args.username = None
+        self.args.public_network = None
+        self.args.cluster_network = None
+        self.args.ssh_copykey = False
+        self.args.jobs = 4
+
+    def teardown(self):
+        net._addresses.clear()
+
+    def run(self, tmpdir, mons, ips, get_nonlocal_ip=None):
+        self.args.mon = mons
+        get_nonlocal_ip = get_nonlocal_ip or (lambda host: ips[host])
+        with patch('ceph_deploy.new.hosts'):
+            with patch('ceph_deploy.new.net.ip_addresses', lambda conn: ['10.0.0.1']):
+                with patch('ceph_deploy.new.net.get_nonlocal_ip', get_nonlocal_ip):
+                    with directory(str(tmpdir)):
+                        new.new(self.args)
+        with tmpdir.join('ceph.conf').open() as f:
+            return conf.ceph.parse(f)
+
+    def test_order_does_not_depend_on_completion(self, tmpdir):
+        ips = {'node1': '10.0.0.1', 'node2': '10.0.0.2', 'node3': '10.0.0.3'}
+        delays = {'node1': 0.2, 'node2': 0.1, 'node3': 0}
+
+        def get_nonlocal_ip(host):
+            time.sleep(delays[host])
+            return ips[host]
+
+        cfg = self.run(tmpdir, ['node1', 'node2', 'node3'], ips, get_nonlocal_ip)
+        assert cfg.get('global', 'mon initial members') == 'node1, node2, node3'
+        assert cfg.get('global', 'mon host') == '10.0.0.1,10.0.0.2,10.0.0.3'
+
+    def test_first_failure_is_raised(self, tmpdir):
+        def get_nonlocal_ip(host):
+            if host == 'node1':
+                return '10.0.0.1'
+            raise exc.UnableToResolveError(host)
+
+        with pytest.raises(exc.UnableToResolveError) as error:
+            self.run(tmpdir, ['node1', 'node2', 'node3'], {}, get_nonlocal_ip)
+        assert 'node2' in str(error.value)
+        assert not tmpdir.join('ceph.conf').exists()
+
+
+class TestSshCopyKeysMany(object):
+
+    def test_keys_are_copied_only_to_failing_hosts(self):
+        reachable = {'node1': True, 'node2': False, 'node3': True}
+        with patch('ceph_deploy.new.ssh.can_connect_passwordless', reachable.get):
+            with patch('ceph_deploy.new.copy_keys') as copy_keys:
+                new.ssh_copy_keys_many(['node1', 'node2', 'node3'], 'ceph', jobs=3)
+        copy_keys.assert_called_once_with('node2', 'ceph')
@@ -1,6 +1,8 @@
-from mock import Mock
+from mock import Mock, patch
+from pytest import raises
 import string
 from ceph_deploy import osd
+from ceph_deploy.tests.util import Empty
 
 
 class TestMountPoint(object):
@@ -72,3 +74,411 @@ class TestOsdPerHostCheck(object):
     def test_exceeds_reasonable(self):
         self.args.disk = [('node1', disk) for disk in self.disks]
         assert osd.exceeds_max_osds(self.args) == {'node1': 26}
+
+
+class TestGroupDisks(object):
+
+    def test_groups_by_host_in_order(self):
+        disks = [
+            ('node2', '/dev/sdb', None),
+            ('node1', '/dev/sdb', '/dev/sda5'),
+            ('node2', '/dev/sdc', None),
+        ]
+        assert osd.group_disks(disks) == [
+            ('node2', [('/dev/sdb', None), ('/dev/sdc', None)]),
+            ('node1', [('/dev/sdb', '/dev/sda5')]),
+        ]
+
+
+def tree(*up):
+    return {'nodes': [{'id': osd_id, 'type': 'osd', 'status': 'up'} for osd_id in up]}
+
+
+class TestOsdIds(object):
+
+    def setup(self):
+        self.conn = Mock()
+        self.output = [
+            '/dev/sda :',
+            ' /dev/sda1 other, ext2, mounted on /boot',
+            '/dev/sdb :',
+            ' /dev/sdb1 ceph data, active, cluster ceph, osd.1, journal /dev/sdb2',
+            ' /dev/sdb2 ceph journal, for /dev/sdb1',
+            '/dev/sdc :',
+            ' /dev/sdc1 ceph data, prepared, cluster ceph, journal /dev/sdc2',
+        ]
+
+    def ids(self, disks):
+        with patch('ceph_deploy.osd.system.executable_path', Mock(return_value='ceph-disk')):
+            with patch('ceph_deploy.osd.remoto.process.check', Mock(return_value=(self.output, [], 0))):
+                return osd.osd_ids(self.conn, disks)
+
+    def test_whole_device(self):
+        assert self.ids(['/dev/sdb']) == {'/dev/sdb': 1}
+
+    def test_partition(self):
+        assert self.ids(['/dev/sdb1']) == {'/dev/sdb1': 1}
+
+    def test_prepared_but_not_active(self):
+        assert self.ids(['/dev/sdc']) == {'/dev/sdc': None}
+
+    def test_directory_uses_whoami(self):
+        self.conn.remote_module.path_exists.return_value = True
+        self.conn.remote_module.readline.return_value = '7'
+        assert self.ids(['/var/local/osd0']) == {'/var/local/osd0': 7}
+        self.conn.remote_module.readline.assert_called_with('/var/local/osd0/whoami')
+
+
+class TestWaitForOsds(object):
+
+    def setup(self):
+        self.conn = Mock()
+        self.sleep = patch('ceph_deploy.util.backoff.time.sleep')
+        self.sleep.start()
+
+    def teardown(self):
+        self.sleep.stop()
+
+    def wait(self, ids, trees, disks=('/dev/sdb', '/dev/sdc')):
+        with patch('ceph_deploy.osd.osd_ids', Mock(side_effect=ids)) as osd_ids:
+            with patch('ceph_deploy.osd.osd_tree', Mock(side_effect=trees)) as osd_tree:
+                pending = osd.wait_for_osds(self.conn, 'ceph', list(disks), timeout=60)
+        return pending, osd_ids, osd_tree
+
+    def test_returns_once_the_osds_of_the_disks_are_up(self):
+        pending, osd_ids, osd_tree = self.wait(
+            [{'/dev/sdb': 1, '/dev/sdc': None}, {'/dev/sdc': 2}],
+            [tree(0), tree(0, 1), tree(0, 1, 2)],
+        )
+        assert pending == []
+        assert osd_tree.call_count == 3
+        # ids that are known already are not looked up again
+        assert osd_ids.call_args_list[-1][0][1] == ['/dev/sdc']
+
+    def test_osds_that_are_up_already_do_not_wait(self):
+        pending, osd_ids, osd_tree = self.wait(
+            [{'/dev/sdb': 1, '/dev/sdc': 2}],
+            [tree(1, 2)],
+        )
+        assert pending == []
+        assert osd_tree.call_count == 1
+
+    def test_other_osds_coming_up_do_not_count(self):
+        trees = [tree(5, 6, 7)] * 100
+        with patch('ceph_deploy.util.backoff.time.time', Mock(side_effect=range(0, 1000, 10))):
+            pending, osd_ids, osd_tree = self.wait(
+                [{'/dev/sdb': 1, '/dev/sdc': 2}] + [{}] * 100,
+                trees,
+            )
+        assert pending == ['/dev/sdb', '/dev/sdc']
+
+    def test_gives_up_without_a_tree(self):
+        pending, osd_ids, osd_tree = self.wait([{'/dev/sdb': 1, '/dev/sdc': 2}], [{}])
+        assert pending == []
+        assert osd_tree.call_count == 1
+
+
+class TestPrepare(object):
+
+    def setup(self):
+        self.args = Empty(
+            cluster='ceph',
+            username=None,
+            overwrite_conf=False,
+            zap_disk=False,
+            fs_type='xfs',
+            dmcrypt=False,
+            dmcrypt_key_dir=None,
+            ready_timeout=120,
+            per_host_jobs=1,
+            disk=[
+                ('node1', '/dev/sdb', None),
+                ('node1', '/dev/sdc', None),
+                ('node2', '/dev/sdb', None),
+            ],
+        )
+        self.patches = [
+            patch('ceph_deploy.osd.get_bootstrap_osd_key', Mock(return_value='key')),
+            patch('ceph_deploy.osd.create_osd'),
+            patch('ceph_deploy.osd.prepare_disk'),
+            patch('ceph_deploy.osd.catch_osd_errors'),
+            patch('ceph_deploy.osd.udev_trigger'),
+            patch('ceph_deploy.osd.hosts.get'),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def teardown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_status_is_checked_once_per_host(self):
+        osd.prepare(self.args, Mock(), activate_prepared_disk=False)
+        assert osd.catch_osd_errors.call_count == 2
+        assert osd.prepare_disk.call_count == 3
+
+    def test_waits_once_per_host_for_prepared_disks(self):
+        with patch('ceph_deploy.osd.wait_for_osds') as wait:
+            osd.prepare(self.args, Mock(), activate_prepared_disk=True)
+        assert wait.call_count == 2
+        assert wait.call_args_list[0][0][2] == ['/dev/sdb', '/dev/sdc']
+        assert wait.call_args_list[1][0][2] == ['/dev/sdb']
+
+    def test_only_prepared_disks_are_waited_for(self):
+        def prepare_disk(conn, **kw):
+            if kw['disk'] == '/dev/sdc':
+                raise RuntimeError('mkfs failed')
+        osd.prepare_disk.side_effect = prepare_disk
+        with patch('ceph_deploy.osd.wait_for_osds') as wait:
+            with raises(osd.exc.GenericError):
+                osd.prepare(self.args, Mock(), activate_prepared_disk=True)
+        assert wait.call_args_list[0][0][2] == ['/dev/sdb']
+
+    def test_status_errors_do_not_stop_other_hosts(self):
+        osd.catch_osd_errors.side_effect = [RuntimeError('ceph osd stat failed'), None]
+        with patch('ceph_deploy.osd.wait_for_osds'):
+            with raises(osd.exc.GenericError) as error:
+                osd.prepare(self.args, Mock(), activate_prepared_disk=True)
+        assert osd.catch_osd_errors.call_count == 2
+        assert 'Failed to create 2 OSDs' in str(error.value)
+
+    def test_wait_errors_do_not_stop_other_hosts(self):
+        with patch('ceph_deploy.osd.wait_for_osds', Mock(side_effect=[RuntimeError('timed out'), []])) as wait:
+            with raises(osd.exc.GenericError):
+                osd.prepare(self.args, Mock(), activate_prepared_disk=True)
+        assert wait.call_count == 2
+
+    def test_does_not_wait_when_not_activating(self):
+        with patch('ceph_deploy.osd.wait_for_osds') as wait:
+            osd.prepare(self.args, Mock(), activate_prepared_disk=False)
+        assert wait.called is False
+
+    def test_udev_is_triggered_once_per_host(self):
+        with patch('ceph_deploy.osd.wait_for_osds'):
+            osd.prepare(self.args, Mock(), activate_prepared_disk=True)
+        assert osd.udev_trigger.call_count == 2
+        for call in osd.create_osd.call_args_list:
+            assert call[1]['trigger'] is False
+
+    def test_udev_is_not_triggered_after_prepare_only(self):
+        osd.prepare(self.args, Mock(), activate_prepared_disk=False)
+        assert osd.udev_trigger.called is False
+        for call in osd.create_osd.call_args_list:
+            assert call[1]['trigger'] is True
+
+    def test_no_trigger_when_no_disk_was_prepared(self):
+        osd.prepare_disk.side_effect = RuntimeError('ceph-disk failed')
+        with patch('ceph_deploy.osd.wait_for_osds'):
+            with raises(osd.exc.GenericError) as error:
+                osd.prepare(self.args, Mock(), activate_prepared_disk=True)
+        assert 'Failed to create 3 OSDs' in str(error.value)
+        assert osd.udev_trigger.called is False
+
+
+    def test_missing_disk_fails_before_connecting(self):
+        self.args.disk.append(('node3', None, None))
+        with raises(osd.exc.NeedDiskError):
+            osd.prepare(self.args, Mock(), activate_prepared_disk=False)
+        assert osd.hosts.get.called is False
+
+    def test_disks_are_prepared_concurrently(self):
+        self.args.per_host_jobs = 2
+        osd.prepare(self.args, Mock(), activate_prepared_disk=False)
+        prepared = sorted(
+            (call[1]['disk']) for call in osd.prepare_disk.call_args_list
+        )
+        assert prepared == ['/dev/sdb', '/dev/sdb', '/dev/sdc']
+
+    def test_failed_disks_are_counted(self):
+        def prepare_disk(conn, **kw):
+            if kw['disk'] == '/dev/sdc':
+                raise RuntimeError('mkfs failed')
+        osd.prepare_disk.side_effect = prepare_disk
+        self.args.per_host_jobs = 2
+        with raises(osd.exc.GenericError) as error:
+            osd.prepare(self.args, Mock(), activate_prepared_disk=False)
+        assert 'Failed to create 1 OSDs' in str(error.value)
+
+
+class TestJournalDevice(object):
+
+    def test_partition(self):
+        assert osd.journal_device('/dev/sda5') == '/dev/sda'
+
+    def test_whole_device(self):
+        assert osd.journal_device('/dev/sda') == '/dev/sda'
+
+    def test_nvme_partition(self):
+        assert osd.journal_device('/dev/nvme0n1p2') == '/dev/nvme0n1'
+
+    def test_by_id_partition(self):
+        assert osd.journal_device('/dev/disk/by-id/wwn-0x50-part2') == '/dev/disk/by-id/wwn-0x50'
+
+    def test_unknown_paths_are_kept(self):
+        assert osd.journal_device('/var/lib/ceph/journal') == '/var/lib/ceph/journal'
+
+
+class TestGroupByJournal(object):
+
+    def test_disks_without_journal_get_their_own_lane(self):
+        lanes = osd.group_by_journal([('/dev/sdb', None), ('/dev/sdc', None)])
+        assert lanes == [[('/dev/sdb', None)], [('/dev/sdc', None)]]
+
+    def test_shared_journal_device_shares_a_lane(self):
+        lanes = osd.group_by_journal([
+            ('/dev/sdb', '/dev/sda5'),
+            ('/dev/sdc', '/dev/sdd'),
+            ('/dev/sde', '/dev/sda'),
+        ])
+        assert lanes == [
+            [('/dev/sdb', '/dev/sda5'), ('/dev/sde', '/dev/sda')],
+            [('/dev/sdc', '/dev/sdd')],
+        ]
+
+    def test_journal_on_another_data_disk_shares_its_lane(self):
+        lanes = osd.group_by_journal([('/dev/sdb', None), ('/dev/sdc', '/dev/sdb2')])
+        assert lanes == [[('/dev/sdb', None), ('/dev/sdc', '/dev/sdb2')]]
+
+    def test_chained_devices_share_a_lane(self):
+        lanes = osd.group_by_journal([
+            ('/dev/sdb', '/dev/sdc'),
+            ('/dev/sde', None),
+            ('/dev/sdc', '/dev/sdd'),
+        ])
+        assert lanes == [
+            [('/dev/sdb', '/dev/sdc'), ('/dev/sdc', '/dev/sdd')],
+            [('/dev/sde', None)],
+        ]
+
+    def test_lanes_joined_by_a_later_disk_are_merged(self):
+        lanes = osd.group_by_journal([
+            ('/dev/sdb', '/dev/sda1'),
+            ('/dev/sdc', '/dev/sdf1'),
+            ('/dev/sdd', None),
+            ('/dev/sde', '/dev/sda2'),
+            ('/dev/sdf', '/dev/sda3'),
+        ])
+        assert lanes == [
+            [('/dev/sdb', '/dev/sda1'), ('/dev/sdc', '/dev/sdf1'),
+             ('/dev/sde', '/dev/sda2'), ('/dev/sdf', '/dev/sda3')],
+            [('/dev/sdd', None)],
+        ]
+
+
+class TestCreateOsd(object):
+
+    def setup(self):
+        self.conn = Mock()
+        self.conn.remote_module.path_exists.return_value = True
+
+    def test_triggers_udev_by_default(self):
+        with patch('ceph_deploy.osd.udev_trigger') as trigger:
+            osd.create_osd(self.conn, 'ceph', 'key')
+        assert trigger.called is True
+
+    def test_trigger_can_be_skipped(self):
+        with patch('ceph_deploy.osd.udev_trigger') as trigger:
+            osd.create_osd(self.conn, 'ceph', 'key', trigger=False)
+        assert trigger.called is False
+
+
+class TestOsdList(object):
+
+    def setup(self):
+        self.args = Empty(cluster='ceph', username=None, disk=[('node1', None, None)])
+        self.distro = Mock()
+        self.distro.conn.remote_module.osd_inventory.return_value = [
+            {
+                'name': 'ceph-0',
+                'path': '/var/lib/ceph/osd/ceph-0',
+                'device': '/dev/sdb1',
+                'whoami': '0',
+                'journal': '/dev/sdb2',
+            },
+            {
+                'name': 'ceph-1',
+                'path': '/var/lib/ceph/osd/ceph-1',
+                'device': '/dev/dm-0',
+            },
+        ]
+        ceph_disk_list = [
+            '/dev/sdc :',
+            ' /dev/sdc1 ceph data, active, cluster ceph, osd.1, journal /dev/sdc2',
+        ]
+        tree = {'nodes': [{'id': 0, 'name': 'osd.0'}, {'id': 1, 'name': 'osd.1'}]}
+        self.patches = [
+            patch('ceph_deploy.osd.mon.get_mon_initial_members', Mock(return_value=['mon1'])),
+            patch('ceph_deploy.osd.hosts.get', Mock(return_value=self.distro)),
+            patch('ceph_deploy.osd.osd_tree', Mock(return_value=tree)),
+            patch('ceph_deploy.osd.system.executable_path', Mock(return_value='ceph-disk')),
+            patch('ceph_deploy.osd.remoto.process.check', Mock(return_value=(ceph_disk_list, [], 0))),
+            patch('ceph_deploy.osd.print_osd'),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def teardown(self):
+        for p in self.patches:
+            p.stop()
+
+    def listed(self):
+        osd.osd_list(self.args, Mock())
+        return [call[0] for call in osd.print_osd.call_args_list]
+
+    def test_one_remote_call_per_host(self):
+        self.listed()
+        assert self.distro.conn.remote_module.osd_inventory.call_count == 1
+
+    def test_metadata_comes_from_the_inventory(self):
+        logger, hostname, osd_path, json_blob, metadata = self.listed()[0]
+        assert osd_path == '/var/lib/ceph/osd/ceph-0'
+        assert json_blob == {'id': 0, 'name': 'osd.0'}
+        assert metadata == {
+            'device': '/dev/sdb1',
+            'whoami': '0',
+            'journal path': '/dev/sdb2',
+        }
+
+    def test_ceph_disk_device_is_preferred(self):
+        metadata = self.listed()[1][4]
+        assert metadata == {'device': '/dev/sdc1'}
+
+
+class TestCephDiskIndex(object):
+
+    def test_maps_partitions_to_osds(self):
+        output = [
+            '/dev/sda :',
+            ' /dev/sda1 other, ext2, mounted on /boot',
+            '/dev/sdb :',
+            ' /dev/sdb1 ceph data, active, cluster ceph, osd.1, journal /dev/sdb2',
+            ' /dev/sdb2 ceph journal, for /dev/sdb1',
+            '/dev/sdc :',
+            ' /dev/sdc1 ceph data, active, cluster ceph, osd.12, journal /dev/sdc2',
+        ]
+        assert osd.ceph_disk_index(output) == {
+            '/dev/sdb1': 'osd.1',
+            '/dev/sdc1': 'osd.12',
+        }
+
+    def test_partial_names_are_not_osds(self):
+        output = [' /dev/sda1 otherosd.1, ext2, mounted on /boot']
+        assert osd.ceph_disk_index(output) == {}
+
+    def test_empty_lines_are_skipped(self):
+        assert osd.ceph_disk_index(['', '/dev/sr0 other, unknown']) == {}
+
+
+class TestOsdTreeIndex(object):
+
+    def test_maps_ids_to_nodes(self):
+        tree = {'nodes': [
+            {'id': -1, 'name': 'default', 'type': 'root'},
+            {'id': 3, 'name': 'osd.3', 'type': 'osd'},
+        ]}
+        index = osd.osd_tree_index(tree)
+        assert index[3]['name'] == 'osd.3'
+        assert index[-1]['type'] == 'root'
+
+    def test_empty_tree(self):
+        assert osd.osd_tree_index({}) == {}
@@ -0,0 +1,131 @@
+import logging
+
+from mock import Mock, patch
+from pytest import raises
+
+from ceph_deploy import exc, preflight
+
+
+PYTHON = 'python=2.7.5'
+
+
+def checks(out, err=None, code=0):
+    values = preflight.parse(out, err or [], code)
+    return dict((name, (check.ok, check.detail)) for name, check in values.items())
+
+
+class TestParse(object):
+
+    def test_everything_passes_as_root(self):
+        result = checks(['uid=0', PYTHON])
+        assert result['ssh'] == (True, '')
+        assert result['sudo'] == (True, 'connected as root')
+        assert result['tty'] == (True, 'connected as root')
+        assert result['python'] == (True, '2.7.5')
+
+    def test_everything_passes_with_sudo(self):
+        result = checks(['uid=1000', 'sudo=0 ', PYTHON])
+        assert result['sudo'][0] is True
+        assert result['tty'][0] is True
+
+    def test_ssh_failure_skips_the_other_checks(self):
+        result = checks([], ['Permission denied (publickey,password).'], 255)
+        assert result['ssh'] == (False, 'Permission denied (publickey,password).')
+        assert result['sudo'] == (None, '')
+        assert result['tty'] == (None, '')
+        assert result['python'] == (None, '')
+
+    def test_ssh_failure_without_output(self):
+        result = checks([], [], 255)
+        assert result['ssh'] == (False, 'exited with status 255')
+
+    def test_sudo_needs_a_password(self):
+        result = checks(['uid=1000', 'sudo=1 sudo: a password is required', PYTHON])
+        assert result['sudo'] == (False, 'sudo: a password is required')
+        assert result['tty'][0] is True
+
+    def test_requiretty(self):
+        result = checks([
+            'uid=1000',
+            'sudo=1 sorry, you must have a tty to run sudo',
+            PYTHON,
+        ])
+        assert result['sudo'] == (None, '')
+        assert result['tty'] == (False, 'requiretty is set for sudo')
+
+    def test_python_missing(self):
+        result = checks(['uid=0', 'python=missing'])
+        assert result['python'] == (False, 'python not found')
+
+    def test_python_2_6_is_supported(self):
+        result = checks(['uid=0', 'python=2.6.6'])
+        assert result['python'] == (True, '2.6.6')
+
+    def test_python_3_is_not_supported(self):
+        result = checks(['uid=0', 'python=3.4.3'])
+        assert result['python'][0] is False
+        assert '3.4.3' in result['python'][1]
+
+
+class TestPreflight(object):
+
+    def setup(self):
+        self.args = Mock()
+        self.args.username = None
+        self.args.timeout = 10
+        self.args.jobs = 4
+
+    def run(self, outputs):
+        def run_script(hostname, username, timeout):
+            output = outputs[hostname]
+            if isinstance(output, Exception):
+                raise output
+            return output
+        with patch('ceph_deploy.preflight.run_script', run_script):
+            return preflight.preflight(self.args)
+
+    def test_all_hosts_pass(self):
+        self.args.host = ['node1', 'node2']
+        self.run({
+            'node1': (['uid=0', PYTHON], [], 0),
+            'node2': (['uid=0', PYTHON], [], 0),
+        })
+
+    def test_every_host_is_checked_when_some_fail(self, caplog):
+        caplog.set_level(logging.INFO)
+        self.args.host = ['node1', 'node2', 'node3']
+        with raises(exc.GenericError) as error:
+            self.run({
+                'node1': ([], ['Host key verification failed.'], 255),
+                'node2': (['uid=0', PYTHON], [], 0),
+                'node3': OSError('No such file or directory'),
+            })
+        assert '2 of 3 hosts failed preflight checks' in str(error.value)
+        assert 'node1: ssh: Host key verification failed.' in caplog.text
+        assert 'node3' in caplog.text
+
+    def test_hosts_are_checked_up_to_jobs_at_a_time(self):
+        self.args.host = ['node%d' % number for number in range(4)]
+        seen = []
+
+        def run_script(hostname, username, timeout):
+            seen.append(hostname)
+            return ['uid=0', PYTHON], [], 0
+
+        with patch('ceph_deploy.preflight.run_script', run_script):
+            with patch('ceph_deploy.preflight.parallel.run') as run:
+                run.side_effect = lambda func, items, jobs: [
+                    Mock(ok=True, item=item, value=func(item)) for item in items
+                ]
+                preflight.preflight(self.args)
+        assert run.call_args[1]['jobs'] == 4
+        assert sorted(seen) == self.args.host
+
+
+class TestRunScript(object):
+
+    def test_local_host_runs_the_script_locally(self):
+        with patch('ceph_deploy.preflight.remoto.connection.needs_ssh', lambda hostname: False):
+            out, err, code = preflight.run_script('localhost')
+        assert code == 0
+        assert out[0].startswith('uid=')
@@ -0,0 +1,88 @@
+from ceph_deploy.util import backoff, trace
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeCheck(object):
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if len(self.values) > 1:
+            return self.values.pop(0)
+        return self.values[0]
+
+
+class TestDelays(object):
+
+    def test_grows_exponentially(self):
+        delays = backoff.delays(initial=1, factor=2, maximum=100)
+        assert [next(delays) for _ in range(4)] == [1, 2, 4, 8]
+
+    def test_is_capped(self):
+        delays = backoff.delays(initial=1, factor=2, maximum=5)
+        assert [next(delays) for _ in range(5)] == [1, 2, 4, 5, 5]
+
+
+class TestPoll(object):
+
+    def setup(self):
+        self.clock = FakeClock()
+
+    def poll(self, check, **kw):
+        return backoff.poll(
+            check, _sleep=self.clock.sleep, _time=self.clock.time, **kw)
+
+    def test_returns_right_away_when_ready(self):
+        check = FakeCheck([True])
+        assert self.poll(check) is True
+        assert self.clock.sleeps == []
+
+    def test_backs_off_until_ready(self):
+        check = FakeCheck([False, False, False, True])
+        assert self.poll(check, timeout=60) is True
+        assert check.calls == 4
+        assert self.clock.sleeps == [1, 2, 4]
+
+    def test_gives_up_at_the_deadline(self):
+        check = FakeCheck([False])
+        assert self.poll(check, timeout=10) is False
+        assert self.clock.now == 10
+
+    def test_does_not_sleep_past_the_deadline(self):
+        check = FakeCheck([False])
+        self.poll(check, timeout=5)
+        assert self.clock.sleeps == [1, 2, 2]
+
+    def test_custom_ready(self):
+        check = FakeCheck([1, 2, 3])
+        assert self.poll(check, ready=lambda value: value >= 3) == 3
+
+
+class TestPollTrace(object):
+
+    def setup(self):
+        trace.enable('trace.json')
+
+    def teardown(self):
+        trace.disable()
+
+    def test_sleeps_are_traced_under_the_host(self):
+        backoff.poll(FakeCheck([False, True]), initial=0, host='node1')
+        sleep, = [event for event in trace.events() if event['name'] == 'sleep']
+        assert sleep['args']['host'] == 'node1'
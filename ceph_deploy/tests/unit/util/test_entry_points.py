@@ -0,0 +1,95 @@
+import pkg_resources
+from mock import patch
+
+from ceph_deploy.util import entry_points
+
+
+ENTRY_POINTS = '\n'.join([
+    '[console_scripts]',
+    'ceph-deploy = ceph_deploy.cli:main',
+    '',
+    '[ceph_deploy.cli]',
+    '# a comment',
+    'new = ceph_deploy.new:make',
+    'osd = ceph_deploy.osd : make [extra]',
+    'nested = ceph_deploy.cli:Outer.inner',
+])
+
+
+def install(path, dist_dir, content=None):
+    metadata = path.mkdir(dist_dir)
+    if content is not None:
+        metadata.join('entry_points.txt').write(content)
+
+
+class TestParse(object):
+
+    def test_only_the_group_in_order(self):
+        found = entry_points.parse(ENTRY_POINTS, 'ceph_deploy.cli')
+        assert [ep.name for ep in found] == ['new', 'osd', 'nested']
+
+    def test_module_and_attributes(self):
+        found = entry_points.parse(ENTRY_POINTS, 'ceph_deploy.cli')
+        assert [(ep.module_name, ep.attrs) for ep in found] == [
+            ('ceph_deploy.new', ('make',)),
+            ('ceph_deploy.osd', ('make',)),
+            ('ceph_deploy.cli', ('Outer', 'inner')),
+        ]
+
+    def test_missing_group(self):
+        assert entry_points.parse(ENTRY_POINTS, 'nope') == []
+
+    def test_load(self):
+        found = entry_points.parse(ENTRY_POINTS, 'console_scripts')
+        from ceph_deploy import cli
+        assert found[0].load() is cli.main
+
+
+class TestIterEntryPoints(object):
+
+    def test_reads_egg_info_and_dist_info(self, tmpdir):
+        install(tmpdir, 'ceph_deploy-1.5.25-py2.7.egg-info', ENTRY_POINTS)
+        install(tmpdir, 'plugin-0.1.dist-info', '[ceph_deploy.cli]\nplug = plugin:make\n')
+        found = entry_points.iter_entry_points('ceph_deploy.cli', [str(tmpdir)])
+        assert sorted(ep.name for ep in found) == ['nested', 'new', 'osd', 'plug']
+
+    def test_unzipped_egg(self, tmpdir):
+        install(tmpdir.mkdir('plugin-0.1-py2.7.egg'), 'EGG-INFO', '[ceph_deploy.cli]\nplug = plugin:make\n')
+        path = str(tmpdir.join('plugin-0.1-py2.7.egg'))
+        found = entry_points.iter_entry_points('ceph_deploy.cli', [path])
+        assert [ep.name for ep in found] == ['plug']
+
+    def test_first_distribution_of_a_project_wins(self, tmpdir):
+        first = tmpdir.mkdir('first')
+        second = tmpdir.mkdir('second')
+        install(first, 'ceph_deploy.egg-info', '[ceph_deploy.cli]\nnew = ceph_deploy.new:make\n')
+        install(second, 'ceph_deploy-1.5.25.dist-info', ENTRY_POINTS)
+        found = entry_points.iter_entry_points('ceph_deploy.cli', [str(first), str(second)])
+        assert [ep.name for ep in found] == ['new']
+
+    def test_a_project_without_entry_points_hides_later_ones(self, tmpdir):
+        first = tmpdir.mkdir('first')
+        second = tmpdir.mkdir('second')
+        install(first, 'ceph_deploy.egg-info')
+        install(second, 'ceph_deploy.egg-info', ENTRY_POINTS)
+        found = entry_points.iter_entry_points('ceph_deploy.cli', [str(first), str(second)])
+        assert found == []
+
+    def test_missing_path(self, tmpdir):
+        path = str(tmpdir.join('nope'))
+        assert entry_points.iter_entry_points('ceph_deploy.cli', [path]) == []
+
+    def test_zipped_egg_falls_back_to_pkg_resources(self, tmpdir):
+        egg = tmpdir.join('plugin-0.1-py2.7.egg')
+        egg.write('')
+        with patch.object(pkg_resources, 'iter_entry_points') as iter_entry_points:
+            iter_entry_points.return_value = iter(['plug'])
+            found = entry_points.iter_entry_points('ceph_deploy.cli', [str(egg)])
+        assert found == ['plug']
+        iter_entry_points.assert_called_once_with('ceph_deploy.cli')
+
+    def test_same_as_pkg_resources(self):
+        found = entry_points.iter_entry_points('ceph_deploy.cli')
+        expected = pkg_resources.iter_entry_points('ceph_deploy.cli')
+        assert sorted((ep.name, ep.module_name, tuple(ep.attrs)) for ep in found) == \
+            sorted((ep.name, ep.module_name, tuple(ep.attrs)) for ep in expected)
@@ -0,0 +1,113 @@
+from StringIO import StringIO
+
+from mock import Mock, patch
+
+from ceph_deploy.util import gpg_keys
+
+
+KEY = '-----BEGIN PGP PUBLIC KEY BLOCK-----\nmQINBFX4hgkBEADLqn6O+UFp\n'
+URL = 'https://git.ceph.com/?p=ceph.git;a=blob_plain;f=keys/release.asc'
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestKeyCache(object):
+
+    def setup(self):
+        self.clock = FakeClock()
+        self.urlopen = Mock(side_effect=lambda *a, **kw: StringIO(KEY))
+
+    def make_cache(self, tmpdir, ttl=60):
+        return gpg_keys.KeyCache(
+            path=str(tmpdir.join('keys')),
+            ttl=ttl,
+            _time=self.clock,
+            _urlopen=self.urlopen,
+        )
+
+    def test_downloads_once(self, tmpdir):
+        cache = self.make_cache(tmpdir)
+        assert cache.get(URL) == KEY
+        assert cache.get(URL) == KEY
+        assert self.urlopen.call_count == 1
+
+    def test_cache_is_shared_between_runs(self, tmpdir):
+        self.make_cache(tmpdir).get(URL)
+        assert self.make_cache(tmpdir).get(URL) == KEY
+        assert self.urlopen.call_count == 1
+
+    def test_keys_are_stored_by_content(self, tmpdir):
+        self.make_cache(tmpdir).get(URL)
+        self.make_cache(tmpdir).get('http://mirror.example.com/release.asc')
+        keys = [name for name in tmpdir.join('keys').listdir() if name.ext == '.asc']
+        assert len(keys) == 1
+
+    def test_expired_keys_are_downloaded_again(self, tmpdir):
+        cache = self.make_cache(tmpdir)
+        cache.get(URL)
+        self.clock.now += 61
+        cache.get(URL)
+        assert self.urlopen.call_count == 2
+
+    def test_expired_key_is_used_when_download_fails(self, tmpdir):
+        cache = self.make_cache(tmpdir)
+        cache.get(URL)
+        self.clock.now += 61
+        self.urlopen.side_effect = IOError('network is unreachable')
+        assert cache.get(URL) == KEY
+
+    def test_download_fails(self, tmpdir):
+        self.urlopen.side_effect = IOError('network is unreachable')
+        assert self.make_cache(tmpdir).get(URL) is None
+
+    def test_not_a_key(self, tmpdir):
+        self.urlopen.side_effect = lambda *a, **kw: StringIO('<html>proxy login</html>')
+        assert self.make_cache(tmpdir).get(URL) is None
+
+
+class TestPush(object):
+
+    def setup(self):
+        self.conn = Mock()
+
+    def test_key_is_written_to_the_host(self):
+        with patch('ceph_deploy.util.gpg_keys.cache') as cache:
+            cache.get.return_value = KEY
+            path = gpg_keys.push(self.conn, URL, 'release.asc')
+        assert path == 'release.asc'
+        self.conn.remote_module.write_file.assert_called_once_with('release.asc', KEY)
+
+    def test_host_downloads_when_the_admin_node_cannot(self):
+        with patch('ceph_deploy.util.gpg_keys.cache') as cache:
+            cache.get.return_value = None
+            with patch('ceph_deploy.util.gpg_keys.remoto.process.run') as run:
+                gpg_keys.push(self.conn, URL, 'release.asc')
+        assert run.call_args[0][1] == ['wget', '-O', 'release.asc', URL]
+        assert self.conn.remote_module.write_file.called is False
+
+    def test_url_is_returned_for_tools_that_download(self):
+        with patch('ceph_deploy.util.gpg_keys.cache') as cache:
+            cache.get.return_value = None
+            with patch('ceph_deploy.util.gpg_keys.remoto.process.run') as run:
+                path = gpg_keys.push(self.conn, URL, 'release.asc', fallback_url=True)
+        assert path == URL
+        assert run.called is False
+
+    def test_cached_key_is_pushed_with_fallback_url(self):
+        with patch('ceph_deploy.util.gpg_keys.cache') as cache:
+            cache.get.return_value = KEY
+            path = gpg_keys.push(self.conn, URL, 'release.asc', fallback_url=True)
+        assert path == 'release.asc'
+
+    def test_local_keys_are_left_alone(self):
+        with patch('ceph_deploy.util.gpg_keys.cache') as cache:
+            path = gpg_keys.push(self.conn, 'file:///opt/ceph-deploy/repo/release.asc', 'release.asc')
+        assert path == '/opt/ceph-deploy/repo/release.asc'
+        assert cache.get.called is False
@@ -1,3 +1,8 @@
+import socket
+
+from mock import Mock, patch
+
+from ceph_deploy import exc
 from ceph_deploy.util import net
 from ceph_deploy.tests import util
 import pytest
@@ -30,3 +35,35 @@ class TestIpInSubnet(object):
     @pytest.mark.parametrize('ip', util.generate_ips("10.9.8.0", "10.9.8.255"))
     def test_false_for_24_subnets(self, ip):
         assert net.ip_in_subnet(ip, "10.9.1.0/24") is False
+
+
+class TestResolve(object):
+
+    def setup(self):
+        net._addresses.clear()
+
+    def teardown(self):
+        net._addresses.clear()
+
+    def test_lookups_are_cached(self):
+        getaddrinfo = Mock(return_value=[(2, 1, 6, '', ('10.0.0.1', 0))])
+        with patch('ceph_deploy.util.net.socket.getaddrinfo', getaddrinfo):
+            assert net.get_nonlocal_ip('node1') == '10.0.0.1'
+            assert net.get_nonlocal_ip('node1') == '10.0.0.1'
+        assert getaddrinfo.call_count == 1
+
+    def test_failures_are_not_cached(self):
+        getaddrinfo = Mock(side_effect=socket.gaierror('Name or service not known'))
+        with patch('ceph_deploy.util.net.socket.getaddrinfo', getaddrinfo):
+            for _ in range(2):
+                with pytest.raises(exc.UnableToResolveError):
+                    net.resolve('node1')
+        assert getaddrinfo.call_count == 2
+
+    def test_loopback_addresses_are_skipped(self):
+        ailist = [
+            (2, 1, 6, '', ('127.0.1.1', 0)),
+            (2, 1, 6, '', ('10.0.0.1', 0)),
+        ]
+        with patch('ceph_deploy.util.net.socket.getaddrinfo', Mock(return_value=ailist)):
+            assert net.get_nonlocal_ip('node1') == '10.0.0.1'
@@ -0,0 +1,140 @@
+import threading
+import time
+
+from mock import Mock
+
+from ceph_deploy.util import parallel
+
+
+class TestRun(object):
+
+    def test_results_keep_the_order_of_items(self):
+        def slow_for_first(item):
+            if item == 'a':
+                time.sleep(0.1)
+            return item.upper()
+
+        results = parallel.run(slow_for_first, ['a', 'b', 'c'], jobs=3)
+        assert [r.value for r in results] == ['A', 'B', 'C']
+
+    def test_errors_are_captured_per_item(self):
+        def fails_on_b(item):
+            if item == 'b':
+                raise RuntimeError('boom')
+            return item
+
+        results = parallel.run(fails_on_b, ['a', 'b', 'c'], jobs=2)
+        assert [r.ok for r in results] == [True, False, True]
+        assert str(results[1].error) == 'boom'
+
+    def test_system_exit_is_captured(self):
+        def exits(item):
+            raise SystemExit(1)
+
+        results = parallel.run(exits, ['a'])
+        assert isinstance(results[0].error, SystemExit)
+
+    def test_single_job_runs_in_calling_thread(self):
+        seen = []
+        parallel.run(lambda item: seen.append(threading.current_thread()), ['a', 'b'])
+        assert set(seen) == set([threading.current_thread()])
+
+    def test_jobs_are_bounded(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'max': 0}
+
+        def track(item):
+            with lock:
+                state['running'] += 1
+                state['max'] = max(state['max'], state['running'])
+            time.sleep(0.05)
+            with lock:
+                state['running'] -= 1
+
+        parallel.run(track, range(8), jobs=3)
+        assert state['max'] <= 3
+
+    def test_no_items(self):
+        assert parallel.run(lambda item: item, [], jobs=4) == []
+
+
+class TestAsCompleted(object):
+
+    def test_fast_items_come_first(self):
+        def wait(seconds):
+            time.sleep(seconds)
+            return seconds
+
+        results = list(parallel.as_completed(wait, [0.2, 0], jobs=2))
+        assert [r.value for r in results] == [0, 0.2]
+
+    def test_closing_early_waits_for_running_calls(self):
+        started = []
+        finished = []
+
+        def wait(seconds):
+            started.append(seconds)
+            time.sleep(seconds)
+            finished.append(seconds)
+
+        results = parallel.as_completed(wait, [0, 0.2, 0.2, 0.2], jobs=2)
+        assert next(results).item == 0
+        results.close()
+        assert sorted(finished) == sorted(started)
+        # the last call is dropped before a worker is free to start it
+        assert len(started) < 4
+
+
+class TestReport(object):
+
+    def test_counts_failures(self):
+        logger = Mock()
+        results = [
+            parallel.Result('node1', value=1),
+            parallel.Result('node2', error=RuntimeError('boom')),
+        ]
+        assert parallel.report(results, logger) == 1
+
+    def test_failure_message_is_logged(self):
+        logger = Mock()
+        results = [parallel.Result('node2', error=RuntimeError('boom'))]
+        parallel.report(results, logger)
+        message = logger.error.call_args[0][0]
+        assert 'node2' in message
+        assert 'RuntimeError: boom' in message
+
+    def test_string_values_are_logged(self):
+        logger = Mock()
+        parallel.report([parallel.Result('node1', value='unchanged')], logger)
+        message = logger.info.call_args[0][0]
+        assert 'node1' in message
+        assert 'unchanged' in message
+
+
+class TestFanoutWaves(object):
+
+    def test_no_items(self):
+        assert parallel.fanout_waves([], 2) == []
+
+    def test_binary_fanout(self):
+        waves = parallel.fanout_waves(['a', 'b', 'c', 'd', 'e', 'f', 'g'], 1)
+        assert waves == [
+            [(None, 'a')],
+            [(None, 'b'), ('a', 'c')],
+            [(None, 'd'), ('a', 'e'), ('b', 'f'), ('c', 'g')],
+        ]
+
+    def test_every_item_once(self):
+        waves = parallel.fanout_waves(range(100), 3)
+        items = [item for wave in waves for _, item in wave]
+        assert sorted(items) == range(100)
+
+    def test_sources_are_reached_in_an_earlier_wave(self):
+        reached = set([None])
+        for wave in parallel.fanout_waves(range(50), 2):
+            assert all(source in reached for source, _ in wave)
+            reached.update(item for _, item in wave)
+
+    def test_waves_grow_with_the_log_of_items(self):
+        assert len(parallel.fanout_waves(range(200), 1)) == 8
+        assert len(parallel.fanout_waves(range(200), 3)) == 4
@@ -1,4 +1,9 @@
+import time
+
 from mock import patch, Mock
+
+from ceph_deploy import connection
+from ceph_deploy.hosts import remotes
 from ceph_deploy.util import pkg_managers
 
 
@@ -137,3 +142,79 @@ class TestZypper(object):
         assert 'remove' in result[0][-1]
         assert result[0][-1][-2:] == ['vim', 'zsh']
 
+
+
+class TestMetadataRefresh(object):
+
+    def setup(self):
+        self.conn = Mock()
+        # run the remote calls locally as the remote end would
+        self.conn.remote_module.repo_fingerprint = remotes.repo_fingerprint
+        self.conn.remote_module.run_batch = remotes.run_batch
+        self.conn.batch = lambda: connection.Batch(self.conn)
+
+    def refresh(self, tmpdir, max_age):
+        return pkg_managers.MetadataRefresh(
+            self.conn,
+            [str(tmpdir.join('*.list'))],
+            [str(tmpdir.join('stamp'))],
+            max_age=max_age,
+        )
+
+    def test_always_needed_without_max_age(self, tmpdir):
+        refresh = self.refresh(tmpdir, 0)
+        assert refresh.needed() is True
+        assert self.conn.remote_module.metadata_age.called is False
+
+    def test_not_needed_when_unchanged_and_fresh(self, tmpdir):
+        tmpdir.join('ceph.list').write('deb http://ceph.com/debian-hammer/ trusty main\n')
+        tmpdir.join('stamp').write('')
+        refresh = self.refresh(tmpdir, 3600)
+        assert refresh.needed() is False
+
+    def test_needed_when_a_repo_changed(self, tmpdir):
+        tmpdir.join('stamp').write('')
+        refresh = self.refresh(tmpdir, 3600)
+        tmpdir.join('ceph.list').write('deb http://ceph.com/debian-hammer/ trusty main\n')
+        assert refresh.needed() is True
+
+    def test_needed_when_metadata_is_old(self, tmpdir):
+        tmpdir.join('stamp').write('')
+        tmpdir.join('stamp').setmtime(time.time() - 7200)
+        refresh = self.refresh(tmpdir, 3600)
+        assert refresh.needed() is True
+
+    def test_needed_when_there_is_no_metadata(self, tmpdir):
+        refresh = self.refresh(tmpdir, 3600)
+        assert refresh.needed() is True
+
+
+class TestInstalledVersions(object):
+
+    def setup(self):
+        self.to_patch = 'ceph_deploy.util.pkg_managers.remoto.process.check'
+
+    def test_dpkg_query(self):
+        out = [
+            'ceph\tinstall ok installed\t0.94.2-1trusty',
+            'ceph-common\tinstall ok installed\t1:0.94.2-1trusty',
+            'radosgw\tdeinstall ok config-files\t0.80.9-1trusty',
+        ]
+        fake_check = Mock(return_value=(out, [], 1))
+        with patch(self.to_patch, fake_check):
+            versions = pkg_managers.installed_versions(
+                Mock(), ['ceph', 'ceph-common', 'ceph-mds', 'radosgw'])
+        assert fake_check.call_count == 1
+        assert versions == {'ceph': '0.94.2-1trusty', 'ceph-common': '0.94.2-1trusty'}
+
+    def test_rpm(self):
+        out = [
+            'ceph\t0.94.2',
+            'package ceph-radosgw is not installed',
+        ]
+        fake_check = Mock(return_value=(out, [], 1))
+        with patch(self.to_patch, fake_check):
+            versions = pkg_managers.installed_versions(
+                Mock(), ['ceph', 'ceph-radosgw'], rpm=True)
+        assert fake_check.call_args[0][1][:2] == ['rpm', '-q']
+        assert versions == {'ceph': '0.94.2'}
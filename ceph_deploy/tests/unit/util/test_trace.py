@@ -0,0 +1,127 @@
+import json
+
+from mock import Mock
+from pytest import raises
+
+from ceph_deploy.lib import remoto
+from ceph_deploy.util import trace
+
+
+class TestSpan(object):
+
+    def setup(self):
+        trace.enable('trace.json', subcommand='osd')
+
+    def teardown(self):
+        trace.disable()
+
+    def spans(self):
+        return [event for event in trace.events() if event['ph'] == 'X']
+
+    def test_records_a_complete_event(self):
+        with trace.span('hosts.get', host='node1'):
+            pass
+        span, = self.spans()
+        assert span['name'] == 'hosts.get'
+        assert span['cat'] == 'hosts'
+        assert span['args'] == {'host': 'node1', 'subcommand': 'osd'}
+        assert span['dur'] >= 0
+
+    def test_each_host_gets_its_own_lane(self):
+        for host in ['node1', 'node2', 'node1', None]:
+            with trace.span('step', host=host):
+                pass
+        pids = [span['pid'] for span in self.spans()]
+        assert pids[0] == pids[2]
+        assert len(set(pids)) == 3
+
+    def test_usernames_share_the_host_lane(self):
+        for host in ['node1', 'ceph@node1']:
+            with trace.span('step', host=host):
+                pass
+        first, second = self.spans()
+        assert first['pid'] == second['pid']
+        assert second['args']['host'] == 'node1'
+
+    def test_lanes_are_named_after_hosts(self):
+        with trace.span('step', host='node1'):
+            pass
+        names = [
+            event['args']['name'] for event in trace.events()
+            if event['ph'] == 'M'
+        ]
+        assert names == ['ceph-deploy', 'node1']
+
+    def test_errors_are_recorded(self):
+        with raises(RuntimeError):
+            with trace.span('step'):
+                raise RuntimeError('boom')
+        assert self.spans()[0]['args']['error'] == 'RuntimeError'
+
+    def test_nothing_is_recorded_when_disabled(self):
+        trace.disable()
+        with trace.span('step'):
+            pass
+        assert self.spans() == []
+
+    def test_sleep_is_traced(self):
+        trace.sleep(0, host='node1')
+        span, = self.spans()
+        assert span['name'] == 'sleep'
+        assert span['args']['seconds'] == 0
+
+
+class TestRemotoInstrumentation(object):
+
+    def setup(self):
+        self.run = remoto.process.run
+        trace.enable('trace.json')
+
+    def teardown(self):
+        trace.disable()
+
+    def test_process_calls_are_traced(self):
+        def run(conn, command):
+            return 0
+        traced = trace._traced_process(run, 'process.run')
+        assert traced(Mock(hostname='node1'), ['ceph-disk', 'list']) == 0
+        span = trace.events()[-1]
+        assert span['name'] == 'process.run'
+        assert span['args']['command'] == 'ceph-disk list'
+        assert span['args']['host'] == 'node1'
+
+    def test_enabling_twice_wraps_once(self):
+        trace.enable('other.json')
+        assert len(trace._originals) == 2
+
+    def test_disable_restores_remoto(self):
+        assert remoto.process.run is not self.run
+        trace.disable()
+        assert remoto.process.run is self.run
+
+
+class TestWrite(object):
+
+    def teardown(self):
+        trace.disable()
+
+    def test_writes_chrome_trace_json(self, tmpdir):
+        path = str(tmpdir.join('trace.json'))
+        trace.enable(path)
+        with trace.span('step', host='node1'):
+            pass
+        trace.write()
+        with open(path) as f:
+            data = json.load(f)
+        assert [event['name'] for event in data['traceEvents']] == [
+            'process_name', 'process_name', 'step'
+        ]
+
+    def test_does_nothing_when_disabled(self, tmpdir):
+        path = tmpdir.join('trace.json')
+        trace.write(str(path))
+        assert not path.check()
+
+    def test_unwritable_path_is_not_fatal(self, tmpdir):
+        trace.enable(str(tmpdir.join('missing', 'trace.json')))
+        trace.write()
@@ -0,0 +1,49 @@
+"""
+Wait for something to happen on a remote host without hard-coding sleeps.
+
+:func:`poll` calls a check repeatedly, sleeping a little longer after each
+attempt, until the check is satisfied or a deadline passes::
+
+    >>> status = backoff.poll(lambda: osd_status_check(conn, 'ceph'),
+    ...                       ready=lambda status: status['num_up_osds'] >= 3,
+    ...                       timeout=120)
+"""
+import functools
+import time
+
+from ceph_deploy.util import trace
+
+
+def delays(initial=1, factor=2, maximum=10):
+    """
+    An endless generator of exponentially growing delays, capped at
+    ``maximum`` seconds.
+    """
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+
+def poll(check, ready=bool, timeout=60, initial=1, factor=2, maximum=10,
+         host=None, _sleep=None, _time=None):
+    """
+    Call ``check()`` until ``ready(value)`` is true for the value it returns,
+    or until ``timeout`` seconds have passed. The last value returned by
+    ``check`` is returned either way, so callers can report on it.
+
+    Sleeps never go past the deadline, and ``check`` is always called at least
+    once. They show up in the trace under ``host``, the host being waited on.
+    """
+    _sleep = _sleep or functools.partial(trace.sleep, host=host)
+    _time = _time or time.time
+    deadline = _time() + timeout
+
+    for delay in delays(initial, factor, maximum):
+        value = check()
+        if ready(value):
+            return value
+        remaining = deadline - _time()
+        if remaining <= 0:
+            return value
+        _sleep(min(delay, remaining))
@@ -29,4 +29,44 @@ default_components = namedtuple('DefaultComponents', ['rpm', 'deb'])
 default_components.rpm = tuple(_base_components + ['ceph-radosgw'])
 default_components.deb = tuple(_base_components + ['radosgw'])
 
+# The package that provides every component, which has to be at the requested
+# version for ``install`` to skip a host. Until the package split the daemons
+# come with ``ceph`` (and ``ceph-mds`` on DEBs), again named differently for
+# RPMs and DEBs
+component_packages = namedtuple('ComponentPackages', ['rpm', 'deb'])
+component_packages.rpm = {
+    'ceph-osd': 'ceph',
+    'ceph-mon': 'ceph',
+    'ceph-mds': 'ceph',
+    'ceph-common': 'ceph-common',
+    'ceph-radosgw': 'ceph-radosgw',
+}
+component_packages.deb = {
+    'ceph-osd': 'ceph',
+    'ceph-mon': 'ceph',
+    'ceph-mds': 'ceph-mds',
+    'ceph-common': 'ceph-common',
+    'radosgw': 'radosgw',
+}
+
+# Version of every named Ceph release
+release_versions = {
+    'argonaut': '0.48',
+    'bobtail': '0.56',
+    'cuttlefish': '0.61',
+    'dumpling': '0.67',
+    'emperor': '0.72',
+    'firefly': '0.80',
+    'giant': '0.87',
+    'hammer': '0.94',
+    'infernalis': '9.2',
+    'jewel': '10.2',
+}
+
+# How long (in seconds) the cached facts of a host are valid for
+facts_ttl = 86400
+
 gpg_key_base_url = "git.ceph.com/?p=ceph.git;a=blob_plain;f=keys/"
+
+# How long (in seconds) downloaded GPG keys are cached on the admin node for
+gpg_key_ttl = 86400
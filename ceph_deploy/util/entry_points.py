@@ -0,0 +1,120 @@
+"""
+Find the entry points of a group (like ``ceph_deploy.cli``) by reading the
+``entry_points.txt`` metadata of the installed distributions directly.
+
+Importing ``pkg_resources`` to do the same takes longer than everything else
+``ceph-deploy --help`` does, because it builds the working set of every
+distribution on ``sys.path`` up front. Reading the metadata files is enough
+for distributions installed as directories (``.egg-info``, ``.dist-info`` and
+unzipped eggs), with a zipped egg on ``sys.path`` this falls back to
+``pkg_resources``.
+"""
+import os
+import sys
+
+
+class EntryPoint(object):
+    """
+    The part of ``pkg_resources.EntryPoint`` that ceph-deploy uses.
+    """
+
+    def __init__(self, name, module_name, attrs):
+        self.name = name
+        self.module_name = module_name
+        self.attrs = attrs
+
+    def load(self):
+        obj = __import__(self.module_name, fromlist=['__name__'])
+        for attr in self.attrs:
+            obj = getattr(obj, attr)
+        return obj
+
+    def __repr__(self):
+        return '<EntryPoint %s = %s:%s>' % (self.name, self.module_name, '.'.join(self.attrs))
+
+
+def parse(content, group):
+    """
+    The entry points of ``group`` in the ``content`` of an
+    ``entry_points.txt`` file, in the order they are listed.
+    """
+    found = []
+    section = None
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith(('#', ';')):
+            continue
+        if line.startswith('['):
+            section = line.strip('[]').strip()
+            continue
+        if section != group or '=' not in line:
+            continue
+        name, value = [part.strip() for part in line.split('=', 1)]
+        # extras (``module:attr [extra]``) are not honored, just like
+        # ceph-deploy never asked pkg_resources to
+        value = value.split('[', 1)[0].strip()
+        module_name, _, attrs = value.partition(':')
+        found.append(EntryPoint(
+            name,
+            module_name.strip(),
+            tuple(attr for attr in attrs.strip().split('.') if attr),
+        ))
+    return found
+
+
+def _project(name):
+    # ``ceph_deploy-1.5.25-py2.7.egg-info`` and ``ceph_deploy.egg-info`` are
+    # the same project, installers write ``-`` in names as ``_``
+    for suffix in ('.egg-info', '.dist-info', '.egg'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name.split('-', 1)[0].lower().replace('_', '-')
+
+
+def _metadata_dirs(path):
+    """
+    The metadata directories of the distributions installed in the
+    ``sys.path`` entry ``path``, as ``(project, directory)`` tuples.
+    """
+    if path.endswith('.egg'):
+        yield _project(os.path.basename(path)), os.path.join(path, 'EGG-INFO')
+        return
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return
+    for name in names:
+        if name.endswith(('.egg-info', '.dist-info')):
+            yield _project(name), os.path.join(path, name)
+
+
+def iter_entry_points(group, _path=None):
+    """
+    Every entry point of ``group``, from the first distribution of each
+    project found on ``sys.path``, like ``pkg_resources`` would pick.
+    """
+    paths = sys.path if _path is None else _path
+    if any(path.endswith('.egg') and os.path.isfile(path) for path in paths):
+        # zipped eggs need pkg_resources
+        import pkg_resources
+        return list(pkg_resources.iter_entry_points(group))
+
+    found = []
+    seen = set()
+    for path in paths:
+        for project, metadata in _metadata_dirs(os.path.abspath(path or os.curdir)):
+            if project in seen:
+                continue
+            try:
+                with open(os.path.join(metadata, 'entry_points.txt')) as f:
+                    content = f.read()
+            except IOError:
+                # a distribution without entry points, or a metadata file
+                # instead of a directory
+                if os.path.isdir(metadata):
+                    seen.add(project)
+                continue
+            seen.add(project)
+            found.extend(parse(content, group))
+    return found
@@ -0,0 +1,171 @@
+"""
+GPG keys for the Ceph repositories are downloaded once, on the admin node, and
+pushed to every host over its existing connection instead of having each host
+fetch the very same key from the internet.
+
+Downloaded keys are kept in a small content addressed cache, every key is
+stored in a file named after its SHA-256 and an index maps URLs to them::
+
+    ~/.cache/ceph-deploy/gpg-keys/
+        index.json        {"https://...release.asc": {"digest": "...", "timestamp": ...}}
+        9c3e...0b1.asc
+
+Keys older than the TTL are downloaded again. If the admin node cannot get a
+key (no network, a proxy in the way) hosts go back to downloading it
+themselves: ``rpm --import`` is given the URL, just like before, and other
+hosts fetch it with ``wget``.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib2
+
+from ceph_deploy.lib import remoto
+from ceph_deploy.util import constants
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'ceph-deploy',
+    'gpg-keys',
+)
+DEFAULT_TTL = constants.gpg_key_ttl
+
+# how long to wait on the key server before giving up
+TIMEOUT = 30
+
+KEY_MARKER = '-----BEGIN PGP PUBLIC KEY BLOCK-----'
+
+
+class KeyCache(object):
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, _time=None, _urlopen=None):
+        self.path = path
+        self.ttl = ttl
+        self._time = _time or time.time
+        self._urlopen = _urlopen or urllib2.urlopen
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.path, 'index.json')
+
+    def key_path(self, digest):
+        return os.path.join(self.path, '%s.asc' % digest)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            if isinstance(index, dict):
+                return index
+        except (IOError, ValueError):
+            pass
+        return {}
+
+    def _write(self, path, content):
+        # write to a temporary file first so that other runs never read
+        # half written keys or indexes
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.rename(tmp_path, path)
+
+    def _read(self, entry):
+        try:
+            with open(self.key_path(entry['digest'])) as f:
+                return f.read()
+        except (IOError, KeyError, TypeError):
+            return None
+
+    def _download(self, url):
+        response = self._urlopen(url, timeout=TIMEOUT)
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        if KEY_MARKER not in content:
+            raise ValueError('%s is not a GPG public key' % url)
+        return content
+
+    def _store(self, url, content):
+        digest = hashlib.sha256(content).hexdigest()
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        if not os.path.exists(self.key_path(digest)):
+            self._write(self.key_path(digest), content)
+        index = self._load_index()
+        index[url] = {'digest': digest, 'timestamp': self._time()}
+        self._write(self.index_path, json.dumps(index, indent=2, sort_keys=True))
+
+    def get(self, url):
+        """
+        The content of the key at ``url``, from the cache while it is fresh
+        and downloaded otherwise. ``None`` if it could not be downloaded and
+        there is no copy of it at all.
+        """
+        # one download per key, even with many hosts installing at once
+        with self._lock:
+            entry = self._load_index().get(url)
+            content = self._read(entry) if entry else None
+            if content is not None and self._time() - entry.get('timestamp', 0) < self.ttl:
+                return content
+
+            try:
+                downloaded = self._download(url)
+            except (IOError, ValueError) as error:
+                if content is not None:
+                    LOG.warning('could not download %s (%s), using the cached copy', url, error)
+                    return content
+                LOG.warning('could not download %s: %s', url, error)
+                return None
+
+            try:
+                self._store(url, downloaded)
+            except (IOError, OSError) as error:
+                LOG.warning('unable to cache %s in %s: %s', url, self.path, error)
+            return downloaded
+
+
+cache = KeyCache()
+
+
+def push(conn, url, path, fallback_url=False):
+    """
+    Make the key at ``url`` available at ``path`` on the remote host: written
+    from the admin node cache, or downloaded by the host itself when the admin
+    node could not get it. Returns the path of the key on the host, which for
+    ``file://`` URLs is where the key already is.
+
+    With ``fallback_url`` the ``url`` itself is returned when the admin node
+    could not get the key, for tools that fetch keys on their own (``rpm
+    --import``), so that hosts do not need ``wget``.
+    """
+    if '://' not in url or url.startswith('file://'):
+        return url.split('file://')[-1]
+
+    content = cache.get(url)
+    if content is None and fallback_url:
+        conn.logger.info('the host will download %s', url)
+        return url
+    if content is None:
+        conn.logger.info('downloading %s on the host', url)
+        remoto.process.run(
+            conn,
+            [
+                'wget',
+                '-O',
+                path,
+                url,
+            ],
+            stop_on_nonzero=False,
+        )
+    else:
+        conn.logger.info('pushing key %s to %s', url, path)
+        conn.remote_module.write_file(path, content)
+    return path
@@ -2,11 +2,38 @@ from ceph_deploy import exc
 import logging
 import re
 import socket
+import threading
 from ceph_deploy.lib import remoto
 
 
 LOG = logging.getLogger(__name__)
 
+# getaddrinfo() results for the rest of the run, keyed by host. Lookups can
+# take a while when DNS is slow, and the same monitors get resolved more than
+# once (by ``new`` and ``mon`` for example).
+_addresses = {}
+_addresses_lock = threading.Lock()
+
+
+def resolve(host):
+    """
+    Return the ``getaddrinfo()`` entries for ``host``, looking them up only
+    the first time a host is asked for. Failed lookups are not cached. Safe
+    to be called concurrently, lookups for different hosts do not wait on
+    each other.
+    """
+    with _addresses_lock:
+        ailist = _addresses.get(host)
+    if ailist is not None:
+        return ailist
+    try:
+        ailist = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        raise exc.UnableToResolveError(host)
+    with _addresses_lock:
+        _addresses[host] = ailist
+    return ailist
+
 
 # TODO: at some point, it might be way more accurate to do this in the actual
 # host where we need to get IPs from. SaltStack does this by calling `ip` and
@@ -16,11 +43,7 @@ def get_nonlocal_ip(host, subnet=None):
     """
     Search result of getaddrinfo() for a non-localhost-net address
     """
-    try:
-        ailist = socket.getaddrinfo(host, None)
-    except socket.gaierror:
-        raise exc.UnableToResolveError(host)
-    for ai in ailist:
+    for ai in resolve(host):
         # an ai is a 5-tuple; the last element is (ip, port)
         ip = ai[4][0]
         if subnet and ip_in_subnet(ip, subnet):
@@ -0,0 +1,195 @@
+"""
+Run the same function against many items (usually hostnames) using a bounded
+pool of worker threads.
+
+Each item gets its own :class:`Result` so that callers can report per-host
+success or failure at the end of a run instead of stopping at the first
+error::
+
+    >>> results = parallel.run(install_host, ['node1', 'node2'], jobs=2)
+    >>> failed = parallel.report(results, LOG)
+
+With ``jobs`` set to 1 (or with a single item) everything runs in the calling
+thread, in order, which is exactly how ceph-deploy behaved before.
+"""
+import logging
+import threading
+import Queue
+
+from ceph_deploy.util.decorators import make_exception_message
+
+
+LOG = logging.getLogger(__name__)
+
+# how long the main thread blocks on the result queue before checking again,
+# needed so that a KeyboardInterrupt can still reach the main thread
+_POLL_INTERVAL = 0.2
+
+
+class Result(object):
+    """
+    The outcome of calling a function for a single item. ``error`` is ``None``
+    when the call succeeded, otherwise it holds the exception raised.
+    """
+
+    __slots__ = ('item', 'value', 'error', 'index')
+
+    def __init__(self, item, value=None, error=None, index=None):
+        self.item = item
+        self.value = value
+        self.error = error
+        self.index = index
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return '<Result %s: %s>' % (self.item, 'ok' if self.ok else 'failed')
+
+
+def _call(func, item, index):
+    try:
+        return Result(item, value=func(item), index=index)
+    except KeyboardInterrupt:
+        raise
+    except (Exception, SystemExit) as error:
+        return Result(item, error=error, index=index)
+
+
+def _worker(func, tasks, results):
+    while True:
+        try:
+            index, item = tasks.get_nowait()
+        except Queue.Empty:
+            return
+        results.put(_call(func, item, index))
+
+
+def as_completed(func, items, jobs=1):
+    """
+    Call ``func(item)`` for every item in ``items`` using at most ``jobs``
+    threads, yielding a :class:`Result` as soon as each call finishes.
+
+    Closing the generator before it is exhausted drops the calls that did not
+    start yet and waits for the running ones, so no thread is left using a
+    connection once the caller moves on.
+    """
+    items = list(items)
+    jobs = max(1, min(jobs or 1, len(items)))
+
+    if jobs == 1:
+        for index, item in enumerate(items):
+            yield _call(func, item, index)
+        return
+
+    tasks = Queue.Queue()
+    results = Queue.Queue()
+    for index, item in enumerate(items):
+        tasks.put((index, item))
+
+    threads = []
+    for _ in range(jobs):
+        thread = threading.Thread(target=_worker, args=(func, tasks, results))
+        # do not hold the process hostage if the user interrupts us
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    pending = len(items)
+    try:
+        while pending:
+            try:
+                result = results.get(timeout=_POLL_INTERVAL)
+            except Queue.Empty:
+                continue
+            pending -= 1
+            yield result
+    finally:
+        if pending:
+            _cancel(tasks, threads)
+
+
+def _cancel(tasks, threads):
+    """
+    Drop the tasks no worker picked up yet and wait for the workers to finish
+    the calls they are in.
+    """
+    while True:
+        try:
+            tasks.get_nowait()
+        except Queue.Empty:
+            break
+    for thread in threads:
+        # joined in steps so that a KeyboardInterrupt can still get through
+        while thread.is_alive():
+            thread.join(_POLL_INTERVAL)
+
+
+def run(func, items, jobs=1):
+    """
+    Like :func:`as_completed` but wait for every call to finish and return
+    the results in the same order as ``items``.
+    """
+    results = list(as_completed(func, items, jobs=jobs))
+    return sorted(results, key=lambda result: result.index)
+
+
+def fanout_waves(items, width):
+    """
+    Plan how to spread something to every item in ``items`` when every item
+    that already has it can pass it on: in each wave the origin (``None``) and
+    every item reached so far hand it to ``width`` new items each. Returns
+    the waves as lists of ``(source, item)`` pairs::
+
+        >>> fanout_waves(['a', 'b', 'c', 'd', 'e'], 1)
+        [[(None, 'a')], [(None, 'b'), ('a', 'c')], [(None, 'd'), ('a', 'e')]]
+
+    Every wave multiplies the number of sources by ``width + 1``, so the
+    number of waves grows with the logarithm of the number of items.
+    """
+    width = max(1, width)
+    pending = list(items)
+    sources = [None]
+    waves = []
+    while pending:
+        wave = []
+        for source in sources:
+            for _ in range(width):
+                if not pending:
+                    break
+                wave.append((source, pending.pop(0)))
+        sources.extend(item for _, item in wave)
+        waves.append(wave)
+    return waves
+
+
+def report(results, logger=None, title='Summary'):
+    """
+    Log a small per-item table with the status of every result and return the
+    number of failures. Results whose value is a string get it shown next to
+    their status, for example::
+
+        Summary:
+          node1                          ok
+          node2                          ok      unchanged
+          node3                          failed  RuntimeError: boom
+    """
+    logger = logger or LOG
+    failures = 0
+    logger.info('%s:' % title)
+    for result in results:
+        if result.ok and isinstance(result.value, basestring) and result.value:
+            logger.info('  %-30s ok      %s' % (result.item, result.value))
+        elif result.ok:
+            logger.info('  %-30s ok' % result.item)
+        else:
+            failures += 1
+            logger.error(
+                '  %-30s failed  %s' % (
+                    result.item,
+                    make_exception_message(result.error).strip()
+                )
+            )
+    return failures
+
@@ -57,6 +57,33 @@ def apt_update(conn):
     )
 
 
+def installed_versions(conn, packages, rpm=False):
+    """
+    The version of every package in ``packages`` that is installed, asking
+    ``rpm`` or ``dpkg-query`` once for all of them. Packages that are not
+    installed are left out.
+    """
+    if rpm:
+        cmd = ['rpm', '-q', '--queryformat', '%{NAME}\t%{VERSION}\n']
+    else:
+        cmd = ['dpkg-query', '-W', '-f', '${Package}\t${Status}\t${Version}\n']
+    cmd.extend(packages)
+    out, err, code = remoto.process.check(conn, cmd)
+
+    versions = {}
+    for line in out:
+        fields = line.strip().split('\t')
+        if len(fields) < 2 or not fields[-1]:
+            # "package foo is not installed"
+            continue
+        if not rpm and not fields[1].endswith(' installed'):
+            # removed, but its configuration is still around
+            continue
+        # drop the epoch, if any
+        versions[fields[0]] = fields[-1].split(':', 1)[-1]
+    return versions
+
+
 def yum(conn, packages, *a, **kw):
     if isinstance(packages, str):
         packages = [packages]
@@ -108,6 +135,76 @@ def yum_clean(conn, item=None):
     )
 
 
+# where the repository definitions are, and what a metadata refresh leaves
+# behind, for every package manager whose metadata ceph-deploy refreshes
+APT_REPOS = [
+    '/etc/apt/sources.list',
+    '/etc/apt/sources.list.d/*.list',
+    '/etc/apt/preferences.d/*',
+]
+APT_METADATA = [
+    '/var/lib/apt/periodic/update-success-stamp',
+    '/var/lib/apt/lists/partial',
+]
+YUM_REPOS = [
+    '/etc/yum.repos.d/*.repo',
+]
+YUM_METADATA = [
+    '/var/cache/yum/*/repomd.xml',
+    '/var/cache/yum/*/*/*/repomd.xml',
+]
+
+
+class MetadataRefresh(object):
+    """
+    Tells whether the package manager metadata of a host has to be refreshed
+    after the repositories were set up: only when a repository definition
+    changed since this object was created or when the metadata is older than
+    ``max_age`` seconds. Without a ``max_age`` it is always refreshed::
+
+        refresh = MetadataRefresh(conn, APT_REPOS, APT_METADATA, max_age=3600)
+        conn.remote_module.write_sources_list(url, codename)
+        if refresh.needed():
+            apt_update(conn)
+    """
+
+    def __init__(self, conn, repos, metadata, max_age=0):
+        self.conn = conn
+        self.repos = repos
+        self.metadata = metadata
+        self.max_age = max_age or 0
+        self.fingerprint = None
+        if self.max_age:
+            self.fingerprint = conn.remote_module.repo_fingerprint(repos)
+
+    def needed(self):
+        if not self.max_age:
+            return True
+        batch = self.conn.batch()
+        batch.repo_fingerprint(self.repos)
+        batch.metadata_age(self.metadata)
+        fingerprint, age = batch.run()
+        if fingerprint != self.fingerprint:
+            self.conn.logger.info('repositories changed, refreshing package metadata')
+            return True
+        if age is None or age > self.max_age:
+            self.conn.logger.info('package metadata is older than %ss, refreshing it', self.max_age)
+            return True
+        self.conn.logger.info(
+            'repositories unchanged and package metadata is %ds old, skipping refresh',
+            age,
+        )
+        return False
+
+
+def apt_metadata(conn, max_age=0):
+    return MetadataRefresh(conn, APT_REPOS, APT_METADATA, max_age)
+
+
+def yum_metadata(conn, max_age=0):
+    return MetadataRefresh(conn, YUM_REPOS, YUM_METADATA, max_age)
+
+
 def rpm(conn, rpm_args=None, *a, **kw):
     """
     A minimal front end for ``rpm`. Extra flags can be passed in via
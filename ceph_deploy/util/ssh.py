@@ -1,5 +1,6 @@
 import logging
 from ceph_deploy.lib import remoto
+from ceph_deploy import connection
 from ceph_deploy.connection import get_local_connection
 
 
@@ -10,6 +11,9 @@ def can_connect_passwordless(hostname):
 
     That attempt will error with an exit status of 255 and a ``Permission
     denied`` message or a``Host key verification failed`` message.
+
+    When SSH multiplexing is enabled a successful check leaves the master
+    connection to the host running, ready for the next connections.
     """
     # Ensure we are not doing this for local hosts
     if not remoto.connection.needs_ssh(hostname):
@@ -18,7 +22,7 @@ def can_connect_passwordless(hostname):
     logger = logging.getLogger(hostname)
     with get_local_connection(logger) as conn:
         # Check to see if we can login, disabling password prompts
-        command = ['ssh', '-CT', '-o', 'BatchMode=yes', hostname]
+        command = ['ssh', '-CT', '-o', 'BatchMode=yes'] + connection.ssh_options() + [hostname]
         out, err, retval = remoto.process.check(conn, command, stop_on_error=False)
         permission_denied_error = 'Permission denied '
         host_key_verify_error = 'Host key verification failed.'
@@ -0,0 +1,197 @@
+"""
+Record where the time of a run goes, as spans written in the Chrome trace
+event format (see "Trace Event Format" in the Chromium docs). The file can be
+opened with ``chrome://tracing`` or any viewer that understands the format.
+
+Tracing is off unless :func:`enable` is called (``ceph-deploy --trace FILE``),
+and :func:`span` is a no-op then::
+
+    with trace.span('hosts.get', host='node1'):
+        ...
+
+Every host gets its own process lane in the viewer, with a thread lane for
+each ceph-deploy thread that worked on it, so per-host critical paths are
+easy to follow. Spans that are not about a single host go in the
+``ceph-deploy`` lane.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+LOG = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+# None while tracing is disabled
+_events = None
+_path = None
+_subcommand = None
+_start = 0
+
+# lane (pid) for every host seen, 0 is for ceph-deploy itself
+_pids = {None: 0}
+
+# functions replaced by traced versions, to put back by disable()
+_originals = []
+
+
+def enable(path, subcommand=None):
+    """
+    Start recording spans, tagged with ``subcommand``, to be written to
+    ``path`` by :func:`write`.
+    """
+    global _events, _path, _subcommand, _start
+    with _lock:
+        _events = []
+        _path = path
+        _subcommand = subcommand
+        _start = time.time()
+    if not _originals:
+        _instrument_remoto()
+
+
+def disable():
+    global _events, _path, _subcommand
+    with _lock:
+        _events = None
+        _path = None
+        _subcommand = None
+        _pids.clear()
+        _pids[None] = 0
+    while _originals:
+        module, name, func = _originals.pop()
+        setattr(module, name, func)
+
+
+def enabled():
+    return _events is not None
+
+
+def _pid(host):
+    pid = _pids.get(host)
+    if pid is None:
+        pid = _pids[host] = len(_pids)
+    return pid
+
+
+def record(name, start, end, host=None, **args):
+    """
+    Record a span for ``name`` that went from ``start`` to ``end`` (as
+    returned by ``time.time()``). A ``user@host`` is recorded as just the
+    host, so a host gets the same lane whether or not a username was given.
+    """
+    if _subcommand:
+        args['subcommand'] = _subcommand
+    if host:
+        host = host.rpartition('@')[2]
+        args['host'] = host
+    with _lock:
+        if _events is None:
+            return
+        _events.append({
+            'name': name,
+            'cat': name.split('.')[0],
+            'ph': 'X',
+            'ts': int((start - _start) * 1000000),
+            'dur': int((end - start) * 1000000),
+            'pid': _pid(host),
+            'tid': threading.current_thread().ident,
+            'args': args,
+        })
+
+
+@contextmanager
+def span(name, host=None, **args):
+    """
+    Record a span for the time spent in the ``with`` block. If the block
+    raises, the name of the exception is added to the span.
+    """
+    if _events is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    except BaseException as error:
+        args['error'] = error.__class__.__name__
+        raise
+    finally:
+        record(name, start, time.time(), host=host, **args)
+
+
+def sleep(seconds, host=None):
+    """
+    ``time.sleep`` that shows up in the trace.
+    """
+    with span('sleep', host=host, seconds=seconds):
+        time.sleep(seconds)
+
+
+def _command_name(command):
+    if isinstance(command, (list, tuple)):
+        return ' '.join(command)
+    return str(command)
+
+
+def _traced_process(func, name):
+    @wraps(func)
+    def wrapper(conn, command, *a, **kw):
+        with span(name, host=getattr(conn, 'hostname', None), command=_command_name(command)):
+            return func(conn, command, *a, **kw)
+    return wrapper
+
+
+def _instrument_remoto():
+    """
+    Every command run remotely goes through ``remoto.process.run`` or
+    ``remoto.process.check``, trace them in place for this run.
+    """
+    from ceph_deploy.lib import remoto
+    for name in ('run', 'check'):
+        func = getattr(remoto.process, name)
+        _originals.append((remoto.process, name, func))
+        setattr(remoto.process, name, _traced_process(func, 'process.%s' % name))
+
+
+def events():
+    """
+    All the events recorded so far, including the metadata events that name
+    the lane of every host.
+    """
+    with _lock:
+        recorded = list(_events or [])
+        pids = dict(_pids)
+    metadata = [
+        {
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': pid,
+            'args': {'name': host or 'ceph-deploy'},
+        }
+        for host, pid in sorted(pids.items(), key=lambda item: item[1])
+    ]
+    return metadata + recorded
+
+
+def write(path=None):
+    """
+    Write the recorded events to ``path`` (the one given to :func:`enable` by
+    default). Does nothing when tracing is not enabled.
+    """
+    path = path or _path
+    if _events is None or not path:
+        return
+    tmp_path = '%s.tmp' % path
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'traceEvents': events(), 'displayTimeUnit': 'ms'}, f)
+        os.rename(tmp_path, path)
+    except (IOError, OSError) as error:
+        LOG.error('unable to write trace to %s: %s', path, error)
+        return
+    LOG.info('trace written to %s', path)
@@ -14,3 +14,33 @@ def alphanumeric(s):
             'argument must start with a letter and contain only letters and numbers',
             )
     return s
+
+
+def positive_int(s):
+    """
+    Enforces string to be an integer greater than zero.
+    """
+    try:
+        value = int(s)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError(
+            'argument must be a positive integer, got: %s' % s,
+            )
+    return value
+
+
+def non_negative_int(s):
+    """
+    Enforces string to be an integer greater than or equal to zero.
+    """
+    try:
+        value = int(s)
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise argparse.ArgumentTypeError(
+            'argument must be a non-negative integer, got: %s' % s,
+            )
+    return value
@@ -73,6 +73,7 @@ setup(
             'pkg = ceph_deploy.pkg:make',
             'calamari = ceph_deploy.calamari:make',
             'rgw = ceph_deploy.rgw:make',
+            'preflight = ceph_deploy.preflight:make',
             ],
 
         },